@@ -3,12 +3,22 @@ MVC FLASK API - Employee Attrition Prediction
 Architecture: Model-View-Controller pattern for better code organization
 """
 
+import os
+
 from flask import Flask
 from flask_cors import CORS
 
+import metrics
 from config import Config
-from models import ModelManager, ResultsManager, VisualizationManager
+from cache import PredictionCache
+from derivatives import DerivativeStore
+from jobs import JobQueue
+from models import ModelManager, ModelRegistry, ResultsManager, VisualizationManager
+from profiler import SamplingProfiler
+from reloader import ModelReloader
 from routes import register_routes
+from schema import FeatureSchema
+from threads import ThreadBudget
 
 
 def create_app():
@@ -21,9 +31,37 @@ def create_app():
     # Enable CORS
     CORS(app, origins=Config.CORS_ORIGINS)
     
+    # Request counts and latency for /metrics
+    metrics.install(app)
+    
     return app
 
 
+# Shared by every model manager in this process
+thread_budget = ThreadBudget(
+    workers=Config.SERVING_WORKERS,
+    threads_per_worker=Config.SERVING_THREADS,
+    threads=Config.INFERENCE_THREADS,
+    max_threads=Config.INFERENCE_MAX_THREADS,
+    large_batch_rows=Config.LARGE_BATCH_ROWS
+)
+
+
+def create_model_manager(model_path):
+    """Model manager with its own prediction cache"""
+    cache = None
+    if Config.PREDICTION_CACHE_SIZE > 0:
+        cache = PredictionCache(Config.PREDICTION_CACHE_SIZE, Config.PREDICTION_CACHE_TTL)
+    return ModelManager(
+        model_path,
+        backend=Config.INFERENCE_BACKEND,
+        numpy_max_rows=Config.NUMPY_BACKEND_MAX_ROWS,
+        cache=cache,
+        cache_binning=Config.PREDICTION_CACHE_BINNING,
+        thread_budget=thread_budget
+    )
+
+
 def initialize_managers():
     """Initialize all managers (models)"""
     print("="*80)
@@ -42,10 +80,13 @@ def initialize_managers():
     
     # Initialize Model Manager
     print("\n🤖 Loading ML Model...")
-    model_manager = ModelManager(Config.MODEL_PATH)
+    model_manager = create_model_manager(Config.MODEL_PATH)
     if not model_manager.load_model():
         return None, None, None
-    print(f"✅ Model loaded: {Config.MODEL_PATH}")
+    print(f"✅ Model loaded: {Config.MODEL_PATH} (backend: {model_manager.active_backend})")
+    print(f"🧵 Inference threads: {thread_budget.default} per call, up to {thread_budget.max_threads} "
+          f"({thread_budget.cores} cores, {thread_budget.workers} workers x "
+          f"{thread_budget.threads_per_worker} threads)")
     
     # Initialize Results Manager
     print("\n📊 Loading Training Results...")
@@ -71,29 +112,132 @@ def initialize_managers():
     # Initialize Visualization Manager
     print("\n🎨 Loading Visualizations...")
     viz_manager = VisualizationManager(Config.IMG_BASE_PATH)
-    viz_list = viz_manager.list_all()
-    total_viz = sum(len(files) for files in viz_list.values())
-    print(f"✅ Found {total_viz} visualizations in {len(viz_list)} categories")
+    viz_manager.build_index()
     
     print("="*80)
     
     return model_manager, results_manager, viz_manager
 
 
-def main():
-    """Main application entry point"""
-    # Create Flask app
+def initialize_registry(model_manager, results_manager):
+    """Register the default model and discover the other variants (loaded lazily)"""
+    registry = ModelRegistry(Config.MODEL_MEMORY_BUDGET_MB)
+    feature_sets = results_manager.results.get('feature_sets', {})
+    
+    registry.register(
+        Config.DEFAULT_MODEL_VARIANT,
+        model_manager,
+        feature_sets.get(Config.DEFAULT_MODEL_VARIANT, model_manager.feature_names),
+        pinned=True
+    )
+    
+    # Prefer the memory-mapped artifact where the numpy backend can use it
+    extensions = ('.pkl',)
+    if Config.INFERENCE_BACKEND == 'numpy':
+        extensions = (ModelManager.ARTIFACT_EXTENSION, '.pkl')
+    registry.discover(feature_sets, Config.MODEL_DIR, create_model_manager, extensions)
+    
+    print(f"🗂️  Model variants: {', '.join(registry.names)} "
+          f"(budget {Config.MODEL_MEMORY_BUDGET_MB:.0f} MB)")
+    return registry
+
+
+def initialize_job_queue():
+    """Job queue on JOB_DIR (jobs run in the process started by start_job_runner)"""
+    return JobQueue(
+        Config.JOB_DIR,
+        workers=Config.JOB_WORKERS,
+        retention_hours=Config.JOB_RETENTION_HOURS,
+        worker_options={
+            'backend': Config.INFERENCE_BACKEND,
+            'numpy_max_rows': Config.NUMPY_BACKEND_MAX_ROWS,
+            'schema_path': Config.FEATURE_SCHEMA_PATH,
+            'range_margin': Config.SCHEMA_RANGE_MARGIN,
+            'chunk_rows': Config.CSV_CHUNK_ROWS
+        }
+    )
+
+
+def start_job_runner():
+    """Start the single process that runs /jobs (gunicorn master or dev server)"""
+    return initialize_job_queue().start_runner()
+
+
+def build_app():
+    """Build a fully wired app (gunicorn entry point: app_mvc:build_app())"""
     app = create_app()
     
-    # Initialize managers
     model_manager, results_manager, viz_manager = initialize_managers()
-    
     if not all([model_manager, results_manager, viz_manager]):
+        raise RuntimeError("Application initialization failed")
+    
+    model_registry = initialize_registry(model_manager, results_manager)
+    
+    golden_set = ModelReloader.load_golden_set(Config.GOLDEN_SET_PATH)
+    if golden_set is None:
+        print(f"⚠️  No golden set at {Config.GOLDEN_SET_PATH}, reloads are checked on probe rows only")
+    model_reloader = ModelReloader(
+        model_manager,
+        golden_set=golden_set,
+        min_auc=Config.GOLDEN_MIN_AUC if golden_set else 0.0,
+        watch_interval=Config.MODEL_WATCH_INTERVAL,
+        warmup_rows=Config.WARMUP_ROWS,
+        generation_path=Config.MODEL_GENERATION_PATH,
+        generation_interval=Config.MODEL_GENERATION_INTERVAL
+    )
+    
+    feature_schema = FeatureSchema.load(Config.FEATURE_SCHEMA_PATH, Config.SCHEMA_RANGE_MARGIN)
+    if feature_schema is None:
+        print(f"⚠️  No feature schema at {Config.FEATURE_SCHEMA_PATH}, only categories are validated")
+    else:
+        print(f"📐 Feature schema: {len(feature_schema.rules)} features ({Config.FEATURE_SCHEMA_PATH})")
+    
+    profiler = None
+    if Config.PROFILER_ENABLED:
+        profiler = SamplingProfiler(Config.PROFILE_DIR, Config.PROFILER_MAX_SECONDS)
+    
+    derivatives = DerivativeStore(viz_manager, Config.DERIVATIVE_DIR, Config.DERIVATIVE_WIDTHS,
+                                  Config.DERIVATIVE_CACHE_MB * 1024 * 1024)
+    if not derivatives.enabled:
+        print("⚠️  Pillow not installed, ?w= / ?format= serve the original images")
+    
+    job_queue = initialize_job_queue()
+    
+    register_routes(app, model_manager, results_manager, viz_manager, model_registry, model_reloader,
+                    profiler, derivatives, feature_schema, job_queue)
+    
+    # Exposed for gunicorn hooks (per-worker warm-up)
+    app.extensions['model_manager'] = model_manager
+    app.extensions['model_reloader'] = model_reloader
+    
+    return app
+
+
+def warm_up(app):
+    """Bring the model of this process up to date, warm it up and start its watcher"""
+    model_manager = app.extensions['model_manager']
+    model_reloader = app.extensions['model_reloader']
+    # A worker forked from the preloaded master may predate a reload
+    model_reloader.catch_up()
+    if model_manager.warm_up(Config.WARMUP_ROWS):
+        print(f"🔥 Model warmed up ({Config.WARMUP_ROWS} rows)")
+    
+    model_reloader.start()
+
+
+def main():
+    """Main application entry point"""
+    try:
+        app = build_app()
+    except RuntimeError:
         print("\n❌ Application initialization failed!")
         return
     
-    # Register routes
-    register_routes(app, model_manager, results_manager, viz_manager)
+    warm_up(app)
+    
+    # Only in the outer process when the debug reloader restarts the server
+    if not os.environ.get('WERKZEUG_RUN_MAIN'):
+        start_job_runner()
     
     # Start server
     print("\n🌐 Starting API Server...")
@@ -102,13 +246,25 @@ def main():
     print(f"🎯 Model Type: {Config.MODEL_TYPE}")
     print("\n💡 Endpoints:")
     print("   GET  /health")
+    print("   GET  /ready")
     print("   GET  /features")
     print("   POST /predict")
+    print("   POST /predict/batch")
+    print("   POST /predict/csv")
+    print("   POST /predict/sweep")
+    print("   POST /predict/<model_type>")
+    print("   POST /jobs")
+    print("   GET  /jobs/<job_id>[/events|/result]")
+    print("   GET  /models")
+    print("   GET  /metrics")
+    print("   POST /admin/reload")
+    print("   POST /admin/profile")
     print("   GET  /api/results")
     print("   GET  /api/results/summary")
     print("   GET  /api/results/model/<type>")
     print("   GET  /api/visualizations/list")
     print("   GET  /api/visualizations/<category>/<filename>")
+    print("   GET  /api/assets/<hashed_name>")
     print("\n" + "="*80)
     
     app.run(
@@ -0,0 +1,187 @@
+"""
+Batching Layer - Adaptive micro-batching of concurrent single predictions
+"""
+
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+
+class _Request:
+    """A single record waiting for its share of a batch result"""
+
+    def __init__(self, record):
+        self.record = record
+        self.arrived = time.monotonic()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        # Guarded by MicroBatcher._lock: a timed-out caller cancels a request
+        # that no batch has claimed yet, so it is never scored twice
+        self.claimed = False
+        self.cancelled = False
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-record predictions into vectorized calls
+
+    Callers block in ``submit()`` while a background thread collects
+    requests for up to ``max_wait_ms`` (or ``max_batch_size`` rows) and
+    scores them with one ``predict_fn(records)`` call. The window is
+    adaptive: when the previous batch held a single request and nothing
+    else is queued, the request is dispatched immediately, so light traffic
+    pays no extra latency. If its request is still queued after
+    ``timeout_ms`` the caller cancels it and scores its own record directly
+    (latency cap); a request already taken into a running batch is waited
+    for instead, so no record is scored twice.
+
+    Only useful when a worker serves requests concurrently (gunicorn
+    ``gthread`` workers); the thread is started lazily so it survives
+    gunicorn's preload-and-fork.
+    """
+
+    # Upper bounds of the batch-size histogram buckets
+    SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, timeout_ms=100.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_batch_size = 1
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.batches = 0
+        self.rows = 0
+        self.timeouts = 0
+        self.max_queue_wait = 0.0
+        self.total_queue_wait = 0.0
+        self.size_histogram = {bucket: 0 for bucket in self.SIZE_BUCKETS + ['+Inf']}
+
+    def _ensure_worker(self):
+        """Start the batching thread in this process (again after a fork)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, record):
+        """Score one record as part of the next batch"""
+        self._ensure_worker()
+        request = _Request(record)
+        self._queue.put(request)
+
+        if not request.event.wait(self.timeout):
+            with self._lock:
+                request.cancelled = not request.claimed
+                if request.cancelled:
+                    self.timeouts += 1
+            if request.cancelled:
+                return self.predict_fn([record])[0]
+            request.event.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        """Block for the first request, then gather more within the window"""
+        batch = [self._queue.get()]
+        deadline = batch[0].arrived + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+                if not request.cancelled:
+                    batch.append(request)
+                continue
+            except queue.Empty:
+                pass
+
+            # Light load: do not hold a lone request open
+            if len(batch) == 1 and self._last_batch_size == 1:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _claim(self, batch):
+        """Requests of a batch their callers have not cancelled, marked as taken"""
+        with self._lock:
+            batch = [request for request in batch if not request.cancelled]
+            for request in batch:
+                request.claimed = True
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._claim(self._collect())
+            if not batch:
+                continue
+            self._last_batch_size = len(batch)
+            self._record(batch)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        """Score a batch; on failure score rows one by one to isolate bad records"""
+        try:
+            results = self.predict_fn([request.record for request in batch])
+            for request, result in zip(batch, results):
+                request.result = result
+        except Exception:
+            for request in batch:
+                try:
+                    request.result = self.predict_fn([request.record])[0]
+                except Exception as e:
+                    request.error = e
+        for request in batch:
+            request.event.set()
+
+    def _record(self, batch):
+        """Update batch-size and queue-wait metrics"""
+        now = time.monotonic()
+        size = len(batch)
+        bucket = next((b for b in self.SIZE_BUCKETS if size <= b), '+Inf')
+        wait = now - batch[0].arrived
+        metrics.observe_batch('micro_batch', size)
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            self.size_histogram[bucket] += 1
+            self.total_queue_wait += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+
+    def stats(self):
+        """Achieved batch sizes and queueing delay"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'timeout_ms': self.timeout * 1000,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in self.size_histogram.items()},
+                'mean_queue_wait_ms': round(self.total_queue_wait / self.batches * 1000, 3) if self.batches else 0.0,
+                'max_queue_wait_ms': round(self.max_queue_wait * 1000, 3),
+                'timeouts': self.timeouts
+            }
@@ -0,0 +1,88 @@
+"""
+Benchmark - Cold-start time and memory of pickle vs memory-mapped .forest artifacts
+
+Each measurement runs in a fresh interpreter: import, ModelManager.load_model()
+and one prediction. Reports load time, first-prediction time, RSS and the
+process-private part of RSS (pages not shared with other workers).
+
+Usage (from backend/):
+    python benchmarks/cold_start.py [--runs 5] [--variant minimal]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BACKEND_DIR, '..', 'model')
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+from models import ModelManager
+t1 = time.perf_counter()
+manager = ModelManager({path!r}, backend={backend!r})
+assert manager.load_model()
+t2 = time.perf_counter()
+record = manager.engine.encoder.probe_records()[0] if manager.engine else None
+if record is None:
+    from inference import FeatureEncoder
+    record = FeatureEncoder.from_preprocessor(manager.model.named_steps['preprocessor']).probe_records()[0]
+manager.predict_records([record])
+t3 = time.perf_counter()
+
+memory = {{}}
+for name in ('/proc/self/smaps_rollup', '/proc/self/status'):
+    try:
+        with open(name) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    memory.setdefault(key, int(value.split()[0]))
+    except OSError:
+        pass
+
+print(json.dumps({{
+    'import_seconds': t1 - t0,
+    'load_seconds': t2 - t1,
+    'first_predict_seconds': t3 - t2,
+    'rss_mb': memory.get('VmRSS', 0) / 1024,
+    'private_mb': (memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0)) / 1024
+}}))
+'''
+
+
+def measure(path, backend, runs):
+    """Median of each metric over fresh-process runs"""
+    samples = []
+    for _ in range(runs):
+        code = CHILD.format(backend_dir=BACKEND_DIR, path=path, backend=backend)
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True, cwd=BACKEND_DIR).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: round(statistics.median(s[key] for s in samples), 4) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--variant', default='minimal', choices=['full', 'reduced', 'minimal'])
+    args = parser.parse_args()
+
+    base = os.path.join(MODEL_DIR, f'attrition_pipeline_{args.variant}')
+    report = {
+        'variant': args.variant,
+        'runs': args.runs,
+        'pickle_sklearn': measure(base + '.pkl', 'sklearn', args.runs),
+        'pickle_numpy': measure(base + '.pkl', 'numpy', args.runs),
+        'forest_mmap': measure(base + '.forest', 'numpy', args.runs)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark - Inference latency, throughput, cold load and peak memory per model variant
+
+Every (variant, backend) pair runs in a fresh interpreter: cold
+ModelManager.load_model(), then ModelManager.predict_batch() on rows of the
+training CSV tiled to each batch size (prediction cache off). Reports load
+time, RSS after load, peak RSS, and per batch size the median / p95 latency
+and rows per second. The report is written next to hasil.json together with
+each variant's test accuracy, so the accuracy/latency trade-off between the
+feature sets can be read off one file.
+
+New backends plug in through BACKENDS: an artifact extension plus
+ModelManager keyword arguments.
+
+Usage (from backend/):
+    python benchmarks/inference_latency.py [--variants full,reduced,minimal]
+        [--backends sklearn,numpy,auto,forest_mmap] [--batch-sizes 1,10,100,1000,10000,100000]
+        [--output ../model/benchmark_inference.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BACKEND_DIR, '..', 'model')
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+
+# name: (artifact extension, ModelManager keyword arguments)
+BACKENDS = {
+    # sklearn pipeline at every batch size
+    'sklearn': ('.pkl', {'backend': 'sklearn'}),
+    # compiled numpy forest at every batch size
+    'numpy': ('.pkl', {'backend': 'numpy', 'numpy_max_rows': sys.maxsize}),
+    # serving default: numpy up to NUMPY_BACKEND_MAX_ROWS, sklearn above
+    'auto': ('.pkl', {'backend': 'numpy', 'numpy_max_rows': 512}),
+    # memory-mapped .forest artifact (numpy only, no sklearn fallback)
+    'forest_mmap': ('.forest', {'backend': 'numpy', 'numpy_max_rows': sys.maxsize})
+}
+
+
+def memory_kb():
+    """VmRSS and VmHWM (peak RSS) of this process"""
+    memory = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory = {'VmRSS': peak, 'VmHWM': peak}
+    return memory
+
+
+def child(spec):
+    """Measure one (variant, backend) pair in this process; prints a JSON line"""
+    sys.path.insert(0, BACKEND_DIR)
+    import numpy as np
+    import pandas as pd
+    from models import ModelManager
+    from threads import ThreadBudget
+
+    data = pd.read_csv(DATASET)[spec['features']]
+    before = memory_kb()
+
+    started = time.perf_counter()
+    manager = ModelManager(spec['path'], thread_budget=ThreadBudget(threads=spec['threads']),
+                           **spec['options'])
+    if not manager.load_model():
+        raise SystemExit(f"could not load {spec['path']}")
+    load_seconds = time.perf_counter() - started
+    after_load = memory_kb()
+
+    batches = {}
+    for size in spec['batch_sizes']:
+        frame = data.iloc[np.arange(size) % len(data)].reset_index(drop=True)
+        if size <= 1000:
+            manager.predict_batch(frame)  # warm-up
+        timings = []
+        total = 0.0
+        while (len(timings) < spec['min_repeats'] or total < spec['min_time']) and \
+                (not timings or total < spec['max_time']):
+            started = time.perf_counter()
+            manager.predict_batch(frame)
+            timings.append(time.perf_counter() - started)
+            total += timings[-1]
+        timings.sort()
+        median = statistics.median(timings)
+        batches[str(size)] = {
+            'runs': len(timings),
+            'median_ms': round(median * 1000, 3),
+            'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000, 3),
+            'rows_per_second': round(size / median, 1)
+        }
+
+    peak = memory_kb()
+    print(json.dumps({
+        'active_backend': manager.active_backend,
+        'load_seconds': round(load_seconds, 4),
+        'rss_after_load_mb': round(after_load['VmRSS'] / 1024, 1),
+        'model_rss_mb': round((after_load['VmRSS'] - before['VmRSS']) / 1024, 1),
+        'peak_rss_mb': round(peak['VmHWM'] / 1024, 1),
+        'batches': batches
+    }))
+
+
+def measure(spec):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                            capture_output=True, text=True, check=True, cwd=BACKEND_DIR).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--variants', default='full,reduced,minimal')
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--batch-sizes', default='1,10,100,1000,10000,100000')
+    parser.add_argument('--threads', type=int, default=1, help='sklearn forest threads (n_jobs)')
+    parser.add_argument('--min-repeats', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per batch size')
+    parser.add_argument('--max-time', type=float, default=10.0, help='stop repeating after this')
+    parser.add_argument('--output', default=os.path.join(MODEL_DIR, 'benchmark_inference.json'))
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(json.loads(args.child))
+        return
+
+    with open(os.path.join(MODEL_DIR, 'hasil.json'), 'r', encoding='utf-8') as f:
+        results = json.load(f)
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cores': os.cpu_count(),
+        'threads': args.threads,
+        'batch_sizes': batch_sizes,
+        'variants': {}
+    }
+
+    for variant in args.variants.split(','):
+        features = results['feature_sets'][variant]
+        entry = {
+            'features': len(features),
+            'test_accuracy': results['models'][variant]['test_accuracy'],
+            'backends': {}
+        }
+        for backend in args.backends.split(','):
+            extension, options = BACKENDS[backend]
+            path = os.path.join(MODEL_DIR, f'attrition_pipeline_{variant}{extension}')
+            if not os.path.exists(path):
+                print(f"skip {variant}/{backend}: {path} not found", file=sys.stderr)
+                continue
+            entry['backends'][backend] = measure({
+                'path': path,
+                'options': options,
+                'features': features,
+                'threads': args.threads,
+                'batch_sizes': batch_sizes,
+                'min_repeats': args.min_repeats,
+                'min_time': args.min_time,
+                'max_time': args.max_time
+            })
+            single = entry['backends'][backend]['batches'].get('1', {})
+            print(f"{variant}/{backend}: load {entry['backends'][backend]['load_seconds']}s, "
+                  f"single row {single.get('median_ms')} ms", file=sys.stderr)
+        report['variants'][variant] = entry
+
+    # Fastest backend per variant: the numbers to weigh against accuracy
+    report['tradeoff'] = {}
+    for variant, entry in report['variants'].items():
+        if not entry['backends']:
+            continue
+        tradeoff = {'features': entry['features'], 'test_accuracy': entry['test_accuracy']}
+        for size in (1, max(batch_sizes)):
+            timings = {name: backend['batches'][str(size)] for name, backend in entry['backends'].items()
+                       if str(size) in backend['batches']}
+            if timings:
+                best = min(timings, key=lambda name: timings[name]['median_ms'])
+                tradeoff[f'batch_{size}'] = {'backend': best, **timings[best]}
+        report['tradeoff'][variant] = tradeoff
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report['tradeoff'], indent=2))
+    print(f"Report written to {os.path.relpath(args.output, BACKEND_DIR)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Benchmark - Open-loop HTTP load test of the API with baseline comparison
+
+Each scenario sends requests at a fixed average rate (seeded Poisson
+arrivals, independent of how fast the server answers) for ``--duration``
+seconds. Latency is measured from the scheduled send time, so queueing
+behind a slow server is counted instead of hidden (no coordinated
+omission). Scenarios run one after another against the same server:
+
+    predict   POST /predict, single rows from the golden set
+    batch     POST /predict/batch, --batch-rows rows per request
+    results   GET /api/results and /api/results/summary (gzip)
+    images    GET hashed visualization assets, original and 960px WebP
+
+By default gunicorn is started locally with gunicorn.conf.py (extra settings
+via --env KEY=VALUE); --url targets a server that is already running. With
+--baseline, regressions beyond the tolerances make the exit status 1.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--duration 20] [--scenarios predict,batch]
+        [--rate predict=80] [--env WEB_CONCURRENCY=3] [--output report.json]
+        [--baseline benchmarks/baselines/load_test.json] [--save-baseline PATH]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from server import BACKEND_DIR, minimal_records, start_gunicorn, stop
+
+DEFAULT_RATES = {'predict': 50.0, 'batch': 2.0, 'results': 50.0, 'images': 20.0}
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines', 'load_test.json')
+
+
+class Target:
+    """Host and port of the server under test"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def connect(self, timeout=30):
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def get_json(self, path):
+        connection = self.connect()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return json.loads(response.read())
+
+
+def build_requests(scenario, target, batch_rows):
+    """(method, path, body, headers) cycled through by a scenario"""
+    json_headers = {'Content-Type': 'application/json'}
+    if scenario == 'predict':
+        return [('POST', '/predict', json.dumps(record).encode(), json_headers)
+                for record in minimal_records()]
+    if scenario == 'batch':
+        records = minimal_records()
+        batch = [records[i % len(records)] for i in range(batch_rows)]
+        return [('POST', '/predict/batch', json.dumps(batch).encode(), json_headers)]
+    if scenario == 'results':
+        headers = {'Accept-Encoding': 'gzip'}
+        return [('GET', '/api/results', None, headers), ('GET', '/api/results/summary', None, headers)]
+    if scenario == 'images':
+        listing = target.get_json('/api/visualizations/list')
+        requests = []
+        for names in listing['assets'].values():
+            for hashed_name in names.values():
+                requests.append(('GET', f'/api/assets/{hashed_name}', None, {}))
+                requests.append(('GET', f'/api/assets/{hashed_name}?w=960&format=webp', None, {}))
+        return requests
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def run_scenario(target, requests, rate, duration, seed, max_inflight):
+    """Open-loop run at ``rate`` requests/s; returns the scenario report"""
+    rng = random.Random(seed)
+    schedule = []
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        schedule.append(offset)
+        offset += rng.expovariate(rate)
+
+    jobs = queue.Queue()
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+
+    def worker():
+        connection = target.connect()
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            scheduled, (method, path, body, headers) = job
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+                connection = target.connect()
+            latency = time.perf_counter() - scheduled
+            with lock:
+                statuses[status] += 1
+                if status.isdigit() and int(status) < 400:
+                    latencies.append(latency)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max_inflight)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for index, offset in enumerate(schedule):
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        jobs.put((started + offset, requests[index % len(requests)]))
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    sent = len(schedule)
+    errors = sent - len(latencies)
+    latencies.sort()
+    report = {
+        'target_rate': rate,
+        'sent': sent,
+        'completed': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / sent, 4) if sent else 0.0,
+        'throughput': round(len(latencies) / elapsed, 2),
+        'statuses': dict(sorted(statuses.items()))
+    }
+    if latencies:
+        report.update({
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2)
+        })
+    return report
+
+
+def compare(report, baseline, latency_tolerance, throughput_tolerance, error_tolerance, latency_floor_ms):
+    """Scenarios that got slower, served less or failed more than the baseline"""
+    regressions = []
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if metric not in current or metric not in previous:
+                continue
+            limit = max(previous[metric] * (1 + latency_tolerance), previous[metric] + latency_floor_ms)
+            if current[metric] > limit:
+                regressions.append(f'{name}: {metric} {current[metric]} > {limit:.2f} '
+                                   f'(baseline {previous[metric]})')
+        if current['throughput'] < previous['throughput'] * (1 - throughput_tolerance):
+            regressions.append(f"{name}: throughput {current['throughput']} < "
+                               f"{previous['throughput'] * (1 - throughput_tolerance):.2f} "
+                               f"(baseline {previous['throughput']})")
+        if current['error_rate'] > previous['error_rate'] + error_tolerance:
+            regressions.append(f"{name}: error_rate {current['error_rate']} "
+                               f"(baseline {previous['error_rate']})")
+    return regressions
+
+
+def parse_pairs(pairs, convert=str):
+    result = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        result[key] = convert(value)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='server to test (default: start gunicorn locally)')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='setting for the local gunicorn (repeatable)')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_RATES))
+    parser.add_argument('--rate', action='append', default=[], metavar='SCENARIO=RPS')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3, help='seconds per scenario, not reported')
+    parser.add_argument('--batch-rows', type=int, default=100)
+    parser.add_argument('--max-inflight', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the report here as well as to stdout')
+    parser.add_argument('--baseline', help=f'compare against this report (e.g. {os.path.relpath(DEFAULT_BASELINE, BACKEND_DIR)})')
+    parser.add_argument('--save-baseline', metavar='PATH', help='store this run as the new baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5)
+    parser.add_argument('--latency-floor-ms', type=float, default=10.0,
+                        help='ignore latency increases smaller than this')
+    parser.add_argument('--throughput-tolerance', type=float, default=0.05)
+    parser.add_argument('--error-tolerance', type=float, default=0.01)
+    args = parser.parse_args()
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = [name for name in scenarios if name not in DEFAULT_RATES]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (use: {', '.join(DEFAULT_RATES)})")
+    rates = {**DEFAULT_RATES, **parse_pairs(args.rate, float)}
+    env = parse_pairs(args.env)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_gunicorn(args.port, **env)
+        url = f'http://127.0.0.1:{args.port}'
+    target = Target(url)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'url': url if args.url else 'local gunicorn',
+        'env': env,
+        'cores': os.cpu_count(),
+        'duration': args.duration,
+        'seed': args.seed,
+        'scenarios': {}
+    }
+    try:
+        for name in scenarios:
+            requests = build_requests(name, target, args.batch_rows)
+            if args.warmup > 0:
+                run_scenario(target, requests, rates[name], args.warmup, args.seed, args.max_inflight)
+            report['scenarios'][name] = run_scenario(
+                target, requests, rates[name], args.duration, args.seed, args.max_inflight
+            )
+            print(f"{name}: {json.dumps(report['scenarios'][name])}", file=sys.stderr)
+    finally:
+        if server is not None:
+            stop(server)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.latency_tolerance, args.throughput_tolerance,
+                              args.error_tolerance, args.latency_floor_ms)
+        report['baseline'] = {'path': args.baseline, 'created_at': baseline.get('created_at'),
+                              'regressions': regressions}
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark helpers - Start app_mvc under gunicorn and build request payloads
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BACKEND_DIR, '..', 'model')
+
+
+def minimal_records():
+    """Golden-set rows projected to the minimal model's features"""
+    with open(os.path.join(MODEL_DIR, 'golden_set.json'), 'r', encoding='utf-8') as f:
+        golden_set = json.load(f)
+    with open(os.path.join(MODEL_DIR, 'hasil.json'), 'r', encoding='utf-8') as f:
+        features = json.load(f)['feature_sets']['minimal']
+    return [{feature: record[feature] for feature in features} for record in golden_set['records']]
+
+
+def start_gunicorn(port, **env):
+    """Start gunicorn with extra environment variables and wait for /ready"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null',
+         'app_mvc:build_app()'],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, PORT=str(port), **{key: str(value) for key, value in env.items()}),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {server.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/ready')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.kill()
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def stop(server):
+    server.terminate()
+    server.wait()
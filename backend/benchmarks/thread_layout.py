@@ -0,0 +1,130 @@
+"""
+Benchmark - Throughput and latency of gunicorn worker x inference-thread layouts
+
+Starts gunicorn once per layout (WEB_CONCURRENCY workers, INFERENCE_THREADS
+threads per sklearn forest call) and drives it with concurrent keep-alive
+clients for single-row /predict and /predict/batch traffic. The prediction
+cache is disabled and INFERENCE_BACKEND defaults to sklearn so every request
+reaches the forest (the numpy backend is single-threaded for small batches).
+
+Usage (from backend/):
+    python benchmarks/thread_layout.py [--layouts 1x4,2x2,4x1,9x1] [--seconds 10]
+        [--clients 8] [--batch-rows 2000] [--backend sklearn]
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+
+import joblib
+
+from server import minimal_records, start_gunicorn, stop
+
+
+def default_layouts(cores):
+    """Few workers with many threads through many single-threaded workers"""
+    layouts = {(1, cores), (cores, 1), (cores * 2 + 1, 1), (cores * 2 + 1, cores)}
+    if cores >= 4:
+        layouts.add((cores // 2, 2))
+        layouts.add((2, cores // 2))
+    return sorted(layouts)
+
+
+def payloads(batch_rows):
+    """(single-row body, batch body) built from golden-set records"""
+    records = minimal_records()
+    batch = [records[i % len(records)] for i in range(batch_rows)]
+    return json.dumps(records[0]).encode(), json.dumps(batch).encode()
+
+
+def drive(port, path, body, clients, seconds):
+    """Requests/s and latency percentiles for ``clients`` closed-loop clients"""
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline = time.monotonic() + seconds
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        headers = {'Content-Type': 'application/json'}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('POST', path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[index] += 1
+            except OSError:
+                errors[index] += 1
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            latencies[index].append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    samples = sorted(latency for per_client in latencies for latency in per_client)
+    if not samples:
+        return {'requests_per_second': 0.0, 'errors': sum(errors)}
+    return {
+        'requests_per_second': round(len(samples) / seconds, 2),
+        'p50_ms': round(statistics.median(samples) * 1000, 2),
+        'p99_ms': round(samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000, 2),
+        'errors': sum(errors)
+    }
+
+
+def main():
+    cores = joblib.cpu_count()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--layouts', help='comma-separated WORKERSxTHREADS (default: derived from cores)')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=cores * 2 + 1)
+    parser.add_argument('--batch-rows', type=int, default=2000)
+    parser.add_argument('--backend', default='sklearn', choices=['sklearn', 'numpy'])
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    layouts = default_layouts(cores)
+    if args.layouts:
+        layouts = [tuple(int(n) for n in layout.split('x')) for layout in args.layouts.split(',')]
+    single, batch = payloads(args.batch_rows)
+
+    report = {'cores': cores, 'clients': args.clients, 'seconds': args.seconds,
+              'batch_rows': args.batch_rows, 'backend': args.backend, 'layouts': {}}
+    for workers, threads in layouts:
+        server = start_gunicorn(
+            args.port,
+            WEB_CONCURRENCY=workers,
+            INFERENCE_THREADS=threads,
+            INFERENCE_MAX_THREADS=threads,
+            INFERENCE_BACKEND=args.backend,
+            PREDICTION_CACHE_SIZE=0,
+            MODEL_WATCH_INTERVAL=0
+        )
+        try:
+            report['layouts'][f'{workers}x{threads}'] = {
+                'single_row': drive(args.port, '/predict', single, args.clients, args.seconds),
+                'batch': drive(args.port, '/predict/batch', batch, args.clients, args.seconds)
+            }
+        finally:
+            stop(server)
+        print(f"{workers}x{threads}: {json.dumps(report['layouts'][f'{workers}x{threads}'])}",
+              file=sys.stderr)
+
+    for traffic in ('single_row', 'batch'):
+        report[f'best_{traffic}'] = max(
+            report['layouts'], key=lambda layout: report['layouts'][layout][traffic]['requests_per_second']
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
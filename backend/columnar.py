@@ -0,0 +1,173 @@
+"""
+Columnar Layer - Binary column-array request/response codecs for bulk scoring
+"""
+
+import io
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional: application/x-msgpack
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional: Arrow IPC stream
+    pyarrow = None
+
+
+class CodecError(ValueError):
+    """Body cannot be decoded as the declared format"""
+
+
+class ColumnarCodec(ABC):
+    """Decodes a body into {column: array} and encodes scored columns
+
+    Responses carry ``probability_yes`` (float64, NaN for rows that failed
+    validation) plus the per-row field errors where the format can hold them.
+    ``requires`` names the optional package the codec needs (None if none).
+    """
+
+    media_type = None
+    name = None
+    requires = None
+
+    @property
+    def available(self):
+        return True
+
+    @abstractmethod
+    def decode(self, body):
+        """{column: array} from a request body (CodecError if malformed)"""
+
+    @abstractmethod
+    def encode(self, probability_yes, errors):
+        """Response body from scored probabilities and {row: {feature: message}} errors"""
+
+
+class NpyCodec(ColumnarCodec):
+    """NumPy ``.npy``: a 1-D structured array in, a float64 array out
+
+    Field names are the feature names; categorical fields are unicode or
+    UTF-8 bytes. The response is the bare probability array (errors are
+    only counted, in the ``X-Failed-Rows`` header).
+    """
+
+    media_type = 'application/x-npy'
+    name = 'npy'
+
+    def decode(self, body):
+        try:
+            array = np.load(io.BytesIO(body), allow_pickle=False)
+        except (ValueError, OSError, EOFError) as e:
+            raise CodecError(f'Malformed .npy body: {e}')
+        if array.dtype.names is None or array.ndim != 1:
+            raise CodecError('Expected a 1-D structured array with one field per feature')
+        columns = {}
+        for name in array.dtype.names:
+            column = array[name]
+            if column.dtype.kind == 'S':
+                column = np.char.decode(column, 'utf-8')
+            columns[name] = column
+        return columns
+
+    def encode(self, probability_yes, errors):
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(probability_yes, dtype='<f8'), allow_pickle=False)
+        return buffer.getvalue()
+
+
+class MsgpackCodec(ColumnarCodec):
+    """MessagePack map of column arrays: ``{feature: [values]}`` or ``{"columns": {...}}``"""
+
+    media_type = 'application/x-msgpack'
+    name = 'msgpack'
+    requires = 'msgpack'
+
+    @property
+    def available(self):
+        return msgpack is not None
+
+    def decode(self, body):
+        try:
+            data = msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise CodecError(f'Malformed MessagePack body: {e}')
+        if isinstance(data, dict) and isinstance(data.get('columns'), dict):
+            data = data['columns']
+        if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+            raise CodecError('Expected a map of column name to array')
+        return data
+
+    def encode(self, probability_yes, errors):
+        return msgpack.packb({
+            'count': len(probability_yes),
+            'failed': len(errors),
+            'probability_yes': probability_yes.tolist(),
+            'errors': [{'index': index, 'field_errors': fields} for index, fields in sorted(errors.items())]
+        })
+
+
+class ArrowCodec(ColumnarCodec):
+    """Arrow IPC stream: a table in, ``probability_yes`` / ``error`` columns out"""
+
+    media_type = 'application/vnd.apache.arrow.stream'
+    name = 'arrow'
+    requires = 'pyarrow'
+
+    @property
+    def available(self):
+        return pyarrow is not None
+
+    def decode(self, body):
+        try:
+            table = pyarrow.ipc.open_stream(body).read_all()
+        except (pyarrow.ArrowInvalid, OSError) as e:
+            raise CodecError(f'Malformed Arrow IPC stream: {e}')
+        return {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+
+    def encode(self, probability_yes, errors):
+        messages = [None] * len(probability_yes)
+        for index, fields in errors.items():
+            messages[index] = '; '.join(f'{feature}: {message}' for feature, message in fields.items())
+        table = pyarrow.table({
+            'probability_yes': pyarrow.array(probability_yes, mask=np.isnan(probability_yes)),
+            'error': pyarrow.array(messages, type=pyarrow.string())
+        })
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+CODECS = {codec.media_type: codec for codec in (NpyCodec(), MsgpackCodec(), ArrowCodec())}
+
+
+def codec_for(content_type):
+    """Codec of a request ``Content-Type`` (None for JSON and unknown types)"""
+    if not content_type:
+        return None
+    return CODECS.get(content_type.split(';')[0].strip().lower())
+
+
+def negotiate(accept, default):
+    """Response codec from a parsed ``Accept`` header; None means JSON
+
+    Only explicitly listed (and installed) types count: no header or
+    wildcards answer in ``default``, the request's own format.
+    """
+    listed = [
+        (quality, value) for value, quality in (accept or [])
+        if quality > 0 and (value == 'application/json' or (value in CODECS and CODECS[value].available))
+    ]
+    if not listed:
+        return default
+    return CODECS.get(max(listed, key=lambda item: item[0])[1])
+
+
+def supported_types():
+    """Media types usable in this install (optional packages present)"""
+    return [media_type for media_type, codec in CODECS.items() if codec.available] + ['application/json']
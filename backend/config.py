@@ -3,6 +3,7 @@ Configuration - App settings and paths
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -27,19 +28,118 @@ class Config:
     MODEL_PATH = os.getenv('MODEL_PATH', os.path.join(BASE_DIR, '..', 'model', 'attrition_pipeline_minimal.pkl'))
     RESULTS_PATH = os.getenv('RESULTS_PATH', os.path.join(BASE_DIR, '..', 'model', 'hasil.json'))
     IMG_BASE_PATH = os.getenv('IMG_BASE_PATH', os.path.join(BASE_DIR, '..', 'model', 'img'))
+    GOLDEN_SET_PATH = os.getenv('GOLDEN_SET_PATH', os.path.join(BASE_DIR, '..', 'model', 'golden_set.json'))
+    FEATURE_SCHEMA_PATH = os.getenv('FEATURE_SCHEMA_PATH', os.path.join(BASE_DIR, '..', 'model', 'feature_schema.json'))
+    
+    # Directory searched for the other model variants (attrition_pipeline_<type>.pkl/.forest)
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.dirname(MODEL_PATH))
     
     # Convert relative paths to absolute paths
     if not os.path.isabs(MODEL_PATH):
         MODEL_PATH = os.path.join(BASE_DIR, MODEL_PATH)
+    if not os.path.isabs(MODEL_DIR):
+        MODEL_DIR = os.path.join(BASE_DIR, MODEL_DIR)
     if not os.path.isabs(RESULTS_PATH):
         RESULTS_PATH = os.path.join(BASE_DIR, RESULTS_PATH)
     if not os.path.isabs(IMG_BASE_PATH):
         IMG_BASE_PATH = os.path.join(BASE_DIR, IMG_BASE_PATH)
+    if not os.path.isabs(GOLDEN_SET_PATH):
+        GOLDEN_SET_PATH = os.path.join(BASE_DIR, GOLDEN_SET_PATH)
+    if not os.path.isabs(FEATURE_SCHEMA_PATH):
+        FEATURE_SCHEMA_PATH = os.path.join(BASE_DIR, FEATURE_SCHEMA_PATH)
     
     # Model info
     MODEL_TYPE = os.getenv('MODEL_TYPE', 'ultra_minimal')
     REQUIRED_FEATURES = int(os.getenv('REQUIRED_FEATURES', 7))
     
+    # Model variants: MODEL_PATH serves /predict as DEFAULT_MODEL_VARIANT (always loaded);
+    # the others load lazily on /predict/<model_type> and are evicted over the budget
+    DEFAULT_MODEL_VARIANT = os.getenv('DEFAULT_MODEL_VARIANT', 'minimal')
+    MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', 256))
+    
+    # Inference backend: 'numpy' (compiled forest) or 'sklearn' (pipeline)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'numpy')
+    NUMPY_BACKEND_MAX_ROWS = int(os.getenv('NUMPY_BACKEND_MAX_ROWS', 512))
+    
+    # Threads per sklearn forest call (0 = cores / (workers x threads), see threads.py).
+    # WEB_CONCURRENCY / GUNICORN_THREADS are exported by gunicorn.conf.py
+    INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', 0))
+    # Cap for ?threads= and for batches of LARGE_BATCH_ROWS rows or more (0 = all cores)
+    INFERENCE_MAX_THREADS = int(os.getenv('INFERENCE_MAX_THREADS', 0))
+    LARGE_BATCH_ROWS = int(os.getenv('LARGE_BATCH_ROWS', 5000))
+    SERVING_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+    SERVING_THREADS = int(os.getenv('GUNICORN_THREADS', 1))
+    
+    # Prediction cache (size 0 disables it)
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', 300))
+    # Key the cache by forest split interval instead of exact values
+    PREDICTION_CACHE_BINNING = os.getenv('PREDICTION_CACHE_BINNING', 'true').lower() == 'true'
+    
+    # Resized / WebP visualizations (?w=&format=), rendered on first request (needs Pillow)
+    DERIVATIVE_DIR = os.getenv('DERIVATIVE_DIR', os.path.join(tempfile.gettempdir(), 'attrition-api-derivatives'))
+    DERIVATIVE_WIDTHS = [int(w) for w in os.getenv('DERIVATIVE_WIDTHS', '320,640,960,1280,1920').split(',')]
+    DERIVATIVE_CACHE_MB = float(os.getenv('DERIVATIVE_CACHE_MB', 64))
+    if not os.path.isabs(DERIVATIVE_DIR):
+        DERIVATIVE_DIR = os.path.join(BASE_DIR, DERIVATIVE_DIR)
+    
+    # Browser/proxy cache lifetime of /api/results* (revalidated by ETag afterwards)
+    RESULTS_CACHE_MAX_AGE = int(os.getenv('RESULTS_CACHE_MAX_AGE', 300))
+    
+    # Micro-batching of concurrent /predict calls (needs threaded workers)
+    MICRO_BATCHING = os.getenv('MICRO_BATCHING', 'false').lower() == 'true'
+    MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 64))
+    MICRO_BATCH_WAIT_MS = float(os.getenv('MICRO_BATCH_WAIT_MS', 2))
+    MICRO_BATCH_TIMEOUT_MS = float(os.getenv('MICRO_BATCH_TIMEOUT_MS', 100))
+    
+    # Hot reload: poll MODEL_PATH every N seconds (0 disables) and swap in a new
+    # model only if it reaches GOLDEN_MIN_AUC (ROC AUC) on the golden set
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))
+    GOLDEN_MIN_AUC = float(os.getenv('GOLDEN_MIN_AUC', 0.7))
+    # Every reload outcome is written here; the other workers poll it every N
+    # seconds (0 disables) and follow, so /admin/reload applies to all of them
+    MODEL_GENERATION_PATH = os.getenv('MODEL_GENERATION_PATH',
+                                      os.path.join(tempfile.gettempdir(), 'attrition-api-model.generation'))
+    MODEL_GENERATION_INTERVAL = float(os.getenv('MODEL_GENERATION_INTERVAL', 1))
+    
+    # Admin endpoints (/admin/*) are disabled unless a token is set
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
+    # Sampling profiler (/admin/profile); also needs ADMIN_TOKEN
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 30))
+    # Shared by all workers so any of them can return a finished profile
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'attrition-api-profiles'))
+    
+    # Rows scored per worker at startup before it reports ready
+    WARMUP_ROWS = int(os.getenv('WARMUP_ROWS', 64))
+    
+    # Request values outside the training range widened by this fraction of
+    # its span are rejected with 400 (negative = no range checks)
+    SCHEMA_RANGE_MARGIN = float(os.getenv('SCHEMA_RANGE_MARGIN', 1.0))
+    
+    # Batch prediction
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 50000))
+    # What-if sweeps (POST /predict/sweep): max grid points per request
+    SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 10000))
+    
+    # Streaming CSV scoring: rows parsed and scored per chunk
+    CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 5000))
+    
+    # Asynchronous scoring jobs (/jobs): scoring processes of the single job runner,
+    # shared job directory, and the only directory server-side paths may point into
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_DIR = os.getenv('JOB_DIR', os.path.join(tempfile.gettempdir(), 'attrition-api-jobs'))
+    JOB_INPUT_DIR = os.getenv('JOB_INPUT_DIR', '')
+    JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', 24))
+    # SSE streams close after this long (below gunicorn's timeout); browsers reconnect.
+    # gunicorn.conf.py defaults it to 0 for sync workers (one snapshot per connection)
+    JOB_EVENTS_MAX_SECONDS = float(os.getenv('JOB_EVENTS_MAX_SECONDS', 55))
+    if not os.path.isabs(JOB_DIR):
+        JOB_DIR = os.path.join(BASE_DIR, JOB_DIR)
+    if JOB_INPUT_DIR and not os.path.isabs(JOB_INPUT_DIR):
+        JOB_INPUT_DIR = os.path.join(BASE_DIR, JOB_INPUT_DIR)
+    
     @classmethod
     def validate_paths(cls):
         """Validate that required files exist"""
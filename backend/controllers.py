@@ -2,38 +2,124 @@
 Controller Layer - Request handling and business logic orchestration
 """
 
+import csv
+import hmac
+import io
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
 import pandas as pd
-from models import ModelManager, ResultsManager, VisualizationManager
+
+import columnar
+import metrics
+from jobs import JobQueue
+from schema import FeatureSchema, FieldRule
+
+
+class _ReadableStream(io.RawIOBase):
+    """Adapts a read()-only upload/WSGI input stream for io.TextIOWrapper"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
 
 
 class PredictionController:
     """Handles prediction requests"""
     
-    MINIMAL_FEATURES = [
-        'OverTime',
-        'MonthlyIncome',
-        'Age',
-        'TotalWorkingYears',
-        'DistanceFromHome',
-        'StockOptionLevel',
-        'EnvironmentSatisfaction'
-    ]
-    
-    def __init__(self, model_manager):
+    # Display grouping of the dataset's features (/features)
+    FEATURE_GROUPS = {
+        'OverTime': 'work_life',
+        'DistanceFromHome': 'work_life',
+        'BusinessTravel': 'work_life',
+        'WorkLifeBalance': 'work_life',
+        'MonthlyIncome': 'compensation',
+        'StockOptionLevel': 'compensation',
+        'DailyRate': 'compensation',
+        'HourlyRate': 'compensation',
+        'MonthlyRate': 'compensation',
+        'PercentSalaryHike': 'compensation',
+        'Age': 'experience',
+        'TotalWorkingYears': 'experience',
+        'YearsAtCompany': 'experience',
+        'YearsInCurrentRole': 'experience',
+        'YearsSinceLastPromotion': 'experience',
+        'YearsWithCurrManager': 'experience',
+        'NumCompaniesWorked': 'experience',
+        'TrainingTimesLastYear': 'experience',
+        'EnvironmentSatisfaction': 'satisfaction',
+        'JobSatisfaction': 'satisfaction',
+        'RelationshipSatisfaction': 'satisfaction',
+        'JobInvolvement': 'satisfaction',
+        'PerformanceRating': 'satisfaction',
+        'Department': 'role',
+        'JobRole': 'role',
+        'JobLevel': 'role',
+        'Education': 'role',
+        'EducationField': 'role',
+        'Gender': 'personal',
+        'MaritalStatus': 'personal',
+        'EmployeeNumber': 'personal'
+    }
+    
+    STREAM_FORMATS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv'
+    }
+    
+    CSV_RESULT_COLUMNS = ['line', 'prediction', 'confidence', 'probability_no', 'probability_yes', 'error']
+    
+    # Points per swept numeric range when 'steps' is not given
+    SWEEP_DEFAULT_STEPS = 20
+    
+    def __init__(self, model_manager, max_batch_size=50000, batcher=None, csv_chunk_rows=5000,
+                 features=None, registry=None, model_type=None, schema=None, sweep_max_points=10000):
         self.model_manager = model_manager
+        self.max_batch_size = max_batch_size
+        self.sweep_max_points = sweep_max_points
+        self.batcher = batcher
+        self.csv_chunk_rows = csv_chunk_rows
+        if features is None:
+            features = model_manager.feature_names if model_manager.loaded else []
+        self.features = list(features)
+        # Lazily loaded variant: resolve the manager through the registry per call
+        self.registry = registry
+        self.model_type = model_type
+        # Compiled value rules; without them only the model's categories are checked
+        self.schema = schema if schema is not None and schema.covers(self.features) else None
+    
+    def _model(self):
+        """Context yielding a loaded model manager"""
+        if self.registry is not None:
+            return self.registry.use(self.model_type)
+        return nullcontext(self.model_manager)
     
     def get_required_features(self):
         """Get list of required features"""
+        categories = {}
+        for feature in self.features:
+            categories.setdefault(self.FEATURE_GROUPS.get(feature, 'other'), []).append(feature)
+        
         return {
-            'required_features': self.MINIMAL_FEATURES,
-            'count': len(self.MINIMAL_FEATURES),
-            'categories': {
-                'work_life': ['OverTime', 'DistanceFromHome'],
-                'compensation': ['MonthlyIncome', 'StockOptionLevel'],
-                'experience': ['Age', 'TotalWorkingYears'],
-                'satisfaction': ['EnvironmentSatisfaction']
-            },
-            'description': 'Only these 7 features are required and used'
+            'model': self.model_type,
+            'required_features': self.features,
+            'count': len(self.features),
+            'categories': categories,
+            'description': f'Only these {len(self.features)} features are required and used',
+            'schema': self.schema.describe(self.features) if self.schema is not None else None
         }
     
     def validate_input(self, input_data):
@@ -47,110 +133,647 @@ class PredictionController:
             }
         
         # Check for missing features
-        missing = [f for f in self.MINIMAL_FEATURES if f not in input_data]
+        missing = [f for f in self.features if f not in input_data]
         if missing:
             return {
                 'valid': False,
                 'error': 'Missing required features',
                 'missing': missing,
-                'required': self.MINIMAL_FEATURES,
-                'hint': 'All 7 features are required',
+                'required': self.features,
+                'hint': f'All {len(self.features)} features are required',
                 'code': 400
             }
         
         # Check for extra features
-        extra = [f for f in input_data.keys() if f not in self.MINIMAL_FEATURES]
+        extra = [f for f in input_data.keys() if f not in self.features]
         if extra:
             return {
                 'valid': False,
                 'error': 'Extra features not allowed',
                 'extra_features': extra,
-                'allowed_features': self.MINIMAL_FEATURES,
-                'hint': 'Only 7 minimal features are accepted',
+                'allowed_features': self.features,
+                'hint': f'Only these {len(self.features)} features are accepted',
                 'code': 400
             }
         
         return {'valid': True}
     
-    def predict(self, input_data):
-        """Process prediction request"""
+    def predict(self, input_data, explain=False):
+        """Process prediction request
+        
+        ``explain`` adds per-feature contributions to the 'Yes' probability
+        (bypasses the prediction cache and micro-batcher).
+        """
         # Validate input
-        validation = self.validate_input(input_data)
+        with metrics.stage('validation'):
+            validation = self.validate_input(input_data)
+            if validation['valid'] and self.schema is not None:
+                # Coerced values in feature order, checked before any model work
+                minimal_data, errors = self.schema.validate_record(input_data, self.features)
+                if errors:
+                    validation = {'valid': False, **self._value_error(errors), 'code': 400}
         if not validation['valid']:
             return validation
         
+        if self.schema is None:
+            minimal_data = {feat: input_data[feat] for feat in self.features}
+        
         try:
-            # Extract features in correct order
-            minimal_data = {feat: input_data[feat] for feat in self.MINIMAL_FEATURES}
+            # Make prediction (encoded straight into the feature vector),
+            # coalesced with concurrent requests when micro-batching is on
+            if explain:
+                with self._model() as model_manager:
+                    result = model_manager.explain_records([minimal_data])[0]
+            elif self.batcher is not None:
+                result = self.batcher.submit(minimal_data)
+            else:
+                with self._model() as model_manager:
+                    result = model_manager.predict_records([minimal_data])[0]
             
-            # Convert to DataFrame
-            df = pd.DataFrame([minimal_data])
+            return {'valid': True, **self._format_result(result)}
+        
+        except Exception as e:
+            return {
+                'valid': False,
+                'error': 'Prediction failed',
+                'details': str(e),
+                'code': 500
+            }
+    
+    def predict_batch(self, input_data, threads=None, explain=False):
+        """Process batch prediction request with one vectorized model call"""
+        threads, error = self._parse_threads(threads)
+        if error is not None:
+            return error
+        
+        records = input_data.get('records') if isinstance(input_data, dict) else input_data
+        if not isinstance(records, list) or not records:
+            return {
+                'valid': False,
+                'error': 'No records provided',
+                'hint': 'Send a JSON list of employees or {"records": [...]}',
+                'code': 400
+            }
+        
+        if len(records) > self.max_batch_size:
+            return {
+                'valid': False,
+                'error': 'Batch too large',
+                'received': len(records),
+                'max_batch_size': self.max_batch_size,
+                'code': 413
+            }
+        
+        results = [None] * len(records)
+        valid_rows = []
+        valid_index = []
+        
+        # Per-row structural validation (missing / extra features)
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                results[index] = {'index': index, 'error': 'Record must be a JSON object'}
+                continue
             
-            # Make prediction
-            result = self.model_manager.predict(df)
+            validation = self.validate_input(record)
+            if not validation['valid']:
+                results[index] = self._row_error(index, validation)
+                continue
             
-            # Format response
-            prediction_label = 'Yes' if result['prediction'] == 1 else 'No'
-            confidence = max(result['probabilities'].values()) * 100
+            valid_rows.append(record)
+            valid_index.append(index)
+        
+        if valid_rows:
+            metrics.observe_batch('batch', len(valid_rows))
+            try:
+                df = pd.DataFrame.from_records(valid_rows, columns=self.features)
+                for index, outcome in zip(valid_index, self._score_frame(df, threads, explain)):
+                    results[index] = {'index': index, **outcome}
             
-            return {
-                'valid': True,
-                'prediction': prediction_label,
-                'confidence': round(confidence, 2),
-                'probabilities': {
-                    'No': round(result['probabilities']['no'] * 100, 2),
-                    'Yes': round(result['probabilities']['yes'] * 100, 2)
+            except Exception as e:
+                return {
+                    'valid': False,
+                    'error': 'Batch prediction failed',
+                    'details': str(e),
+                    'code': 500
                 }
+        
+        failed = sum(1 for result in results if 'error' in result)
+        
+        return {
+            'valid': True,
+            'count': len(records),
+            'succeeded': len(records) - failed,
+            'failed': failed,
+            'results': results
+        }
+    
+    def predict_columnar(self, body, codec, threads=None):
+        """Decode a binary columnar body (Arrow IPC, .npy, MessagePack) and score it"""
+        if not codec.available:
+            return {
+                'valid': False,
+                'error': f'{codec.media_type} is not supported by this server',
+                'codec': codec.name,
+                'missing_package': codec.requires,
+                'hint': f'pip install {codec.requires} (or pip install -r requirements-optional.txt)',
+                'supported': columnar.supported_types(),
+                'code': 415
             }
         
+        try:
+            with metrics.stage('decoding'):
+                columns = codec.decode(body)
+        except columnar.CodecError as e:
+            return {'valid': False, 'error': str(e), 'code': 400}
+        
+        return self.predict_columns(columns, threads)
+    
+    def predict_columns(self, columns, threads=None):
+        """Score column arrays ({feature: values}) with one vectorized model call
+        
+        Columns go straight into a DataFrame and the feature matrix, with no
+        per-row dicts. Returns ``probability_yes`` as one float64 array (NaN
+        where a row failed validation) and the per-row field errors.
+        """
+        threads, error = self._parse_threads(threads)
+        if error is not None:
+            return error
+        
+        # Extra columns are ignored, as in CSV uploads
+        missing = [f for f in self.features if f not in columns]
+        if missing:
+            return {
+                'valid': False,
+                'error': 'Missing required columns',
+                'missing': missing,
+                'required': self.features,
+                'code': 400
+            }
+        
+        lengths = {len(columns[f]) for f in self.features}
+        if len(lengths) != 1:
+            return {'valid': False, 'error': 'Columns must all have the same length', 'code': 400}
+        n_rows = lengths.pop()
+        if n_rows == 0:
+            return {'valid': False, 'error': 'No records provided', 'code': 400}
+        if n_rows > self.max_batch_size:
+            return {
+                'valid': False,
+                'error': 'Batch too large',
+                'received': n_rows,
+                'max_batch_size': self.max_batch_size,
+                'code': 413
+            }
+        
+        metrics.observe_batch('columnar', n_rows)
+        try:
+            df = pd.DataFrame({f: columns[f] for f in self.features})
+            probabilities, valid, row_errors = self._score_valid(
+                df, lambda model_manager, rows: model_manager.predict_probabilities(rows, threads)
+            )
         except Exception as e:
             return {
                 'valid': False,
-                'error': 'Prediction failed',
+                'error': 'Batch prediction failed',
                 'details': str(e),
                 'code': 500
             }
+        
+        probability_yes = np.full(n_rows, np.nan)
+        if probabilities is not None:
+            probability_yes[valid] = probabilities[:, 1]
+        
+        return {
+            'valid': True,
+            'count': n_rows,
+            'succeeded': n_rows - len(row_errors),
+            'failed': len(row_errors),
+            'probability_yes': probability_yes,
+            'errors': row_errors
+        }
+    
+    def sweep(self, input_data):
+        """What-if grid: a base employee with one or two features varied over value ranges
+        
+        Body: ``{"base": {...}, "sweep": [{"feature": ..., "min": ..., "max": ...,
+        "steps": ...} or {"feature": ..., "values": [...]}]}``; a feature given
+        alone sweeps all its levels. The grid is scored server-side in one
+        call, one point per forest split interval. Returns the
+        'Yes' probability (percent) as a curve (one feature) or a surface
+        (rows = first feature).
+        """
+        if not isinstance(input_data, dict) or not isinstance(input_data.get('base'), dict):
+            return {
+                'valid': False,
+                'error': 'No base employee provided',
+                'hint': 'Send {"base": {...}, "sweep": [{"feature": ..., "min": ..., "max": ...}]}',
+                'code': 400
+            }
+        
+        specs = input_data.get('sweep')
+        if isinstance(specs, dict):
+            specs = [specs]
+        if not isinstance(specs, list) or not 1 <= len(specs) <= 2 \
+                or not all(isinstance(spec, dict) for spec in specs):
+            return {'valid': False, 'error': 'sweep must list one or two features', 'code': 400}
+        features = [spec.get('feature') for spec in specs]
+        unknown = [feature for feature in features if feature not in self.features]
+        if unknown:
+            return {
+                'valid': False,
+                'error': 'Unknown sweep features',
+                'unknown': unknown,
+                'allowed_features': self.features,
+                'code': 400
+            }
+        if len(set(features)) != len(features):
+            return {'valid': False, 'error': 'Sweep features must be different', 'code': 400}
+        
+        base = input_data['base']
+        validation = self.validate_input(base)
+        if not validation['valid']:
+            return validation
+        
+        try:
+            with self._model() as model_manager:
+                schema = self.schema or FeatureSchema.from_levels(model_manager.categorical_levels, self.features)
+                
+                with metrics.stage('validation'):
+                    base, errors = schema.validate_record(base, self.features)
+                    axes = []
+                    for feature, spec in zip(features, specs):
+                        values, error = self._sweep_values(schema.rules[feature], spec)
+                        if error is not None:
+                            errors[feature] = error
+                        axes.append((feature, values))
+                if errors:
+                    return {'valid': False, **self._value_error(errors), 'code': 400}
+                
+                points = int(np.prod([len(values) for _, values in axes]))
+                if points > self.sweep_max_points:
+                    return {
+                        'valid': False,
+                        'error': 'Sweep grid too large',
+                        'points': points,
+                        'max_points': self.sweep_max_points,
+                        'code': 413
+                    }
+                
+                probability_yes, evaluated = model_manager.predict_grid(base, axes)
+        
+        except Exception as e:
+            return {
+                'valid': False,
+                'error': 'Sweep failed',
+                'details': str(e),
+                'code': 500
+            }
+        
+        metrics.observe_batch('sweep', evaluated)
+        return {
+            'valid': True,
+            'base': base,
+            'features': features,
+            'axes': {feature: values for feature, values in axes},
+            'probability_yes': np.round(probability_yes * 100, 2).tolist(),
+            'points': points,
+            'evaluated': evaluated
+        }
+    
+    def _sweep_values(self, rule, spec):
+        """Coerced values of one sweep axis; returns (values, error message or None)"""
+        if 'values' in spec:
+            values = spec['values']
+            if not isinstance(values, list) or not values:
+                return None, 'values must be a non-empty list'
+        elif 'min' in spec or 'max' in spec:
+            bounds = FieldRule('range', 'number')
+            low, high = bounds.coerce(spec.get('min'))[0], bounds.coerce(spec.get('max'))[0]
+            steps = spec.get('steps', self.SWEEP_DEFAULT_STEPS)
+            if low is None or high is None or low > high:
+                return None, 'min and max must be numbers with min <= max'
+            if isinstance(steps, bool) or not isinstance(steps, int) or not 2 <= steps <= self.sweep_max_points:
+                return None, f'steps must be an integer between 2 and {self.sweep_max_points}'
+            values = np.linspace(low, high, steps)
+            values = np.unique(np.round(values)) if rule.kind == 'integer' else np.round(values, 4)
+            values = values.tolist()
+        elif rule.levels is not None:
+            values = rule.levels
+        else:
+            return None, 'min and max (or values) are required for numeric features'
+        
+        coerced, seen = [], set()
+        for value in values:
+            value, error = rule.coerce(value)
+            if error is not None:
+                return None, f'sweep value {error}'
+            if value not in seen:
+                seen.add(value)
+                coerced.append(value)
+        return coerced, None
+    
+    def predict_csv(self, stream, output_format='ndjson', threads=None, progress=None):
+        """Validate a CSV upload's header and return a generator streaming scored chunks
+        
+        The body is read row by row and scored ``csv_chunk_rows`` at a time,
+        so memory stays flat regardless of upload size. Each output row
+        carries its CSV line number; malformed rows become per-line errors.
+        ``progress`` is called with the running row counts after every chunk.
+        """
+        if output_format not in self.STREAM_FORMATS:
+            return {
+                'valid': False,
+                'error': 'Invalid output format',
+                'allowed_formats': list(self.STREAM_FORMATS),
+                'code': 400
+            }
+        
+        threads, error = self._parse_threads(threads)
+        if error is not None:
+            return error
+        
+        if stream is None:
+            return {'valid': False, 'error': 'No CSV data provided', 'code': 400}
+        
+        binary = io.BufferedReader(_ReadableStream(stream))
+        reader = csv.reader(io.TextIOWrapper(binary, encoding='utf-8-sig', newline=''))
+        try:
+            header = [column.strip() for column in next(reader)]
+        except StopIteration:
+            return {'valid': False, 'error': 'Empty CSV', 'code': 400}
+        except (csv.Error, UnicodeDecodeError) as e:
+            return {'valid': False, 'error': 'Malformed CSV header', 'details': str(e), 'code': 400}
+        
+        # Columns are validated once; extra columns are echoed back but not used
+        missing = [f for f in self.features if f not in header]
+        if missing:
+            return {
+                'valid': False,
+                'error': 'Missing required columns',
+                'missing': missing,
+                'required': self.features,
+                'code': 400
+            }
+        
+        return {
+            'valid': True,
+            'stream': self._stream_csv(reader, header, output_format, threads, progress),
+            'mimetype': self.STREAM_FORMATS[output_format]
+        }
+    
+    def _stream_csv(self, reader, header, output_format, threads=None, progress=None):
+        """Yield rendered results chunk by chunk"""
+        counts = {'rows': 0, 'succeeded': 0, 'failed': 0}
+        
+        def render(outcomes):
+            rendered = self._render_chunk(outcomes, header, output_format, counts)
+            if progress is not None:
+                progress(counts)
+            return rendered
+        
+        if output_format == 'csv':
+            yield self._render_csv_rows([header + self.CSV_RESULT_COLUMNS])
+        
+        chunk = []
+        try:
+            for fields in reader:
+                if not any(field.strip() for field in fields):
+                    continue
+                chunk.append((reader.line_num, fields))
+                if len(chunk) >= self.csv_chunk_rows:
+                    yield render(self._score_csv_chunk(chunk, header, threads))
+                    chunk = []
+            if chunk:
+                yield render(self._score_csv_chunk(chunk, header, threads))
+        except (csv.Error, UnicodeDecodeError) as e:
+            if chunk:
+                yield render(self._score_csv_chunk(chunk, header, threads))
+            error = {'line': reader.line_num + 1, 'error': f'Malformed CSV, stopped reading: {e}'}
+            yield render([(None, error)])
+        
+        if output_format == 'ndjson':
+            yield json.dumps({'summary': counts}) + '\n'
+    
+    def _score_csv_chunk(self, chunk, header, threads=None):
+        """Score one chunk of (line, fields); returns (fields or None, outcome) per row"""
+        n_columns = len(header)
+        outcomes = [None] * len(chunk)
+        well_formed = []
+        
+        for position, (line, fields) in enumerate(chunk):
+            if len(fields) != n_columns:
+                outcomes[position] = (None, {
+                    'line': line,
+                    'error': f'Expected {n_columns} fields, got {len(fields)}'
+                })
+            else:
+                well_formed.append(position)
+        
+        if well_formed:
+            metrics.observe_batch('csv', len(well_formed))
+            columns = {}
+            for feat in self.features:
+                column = header.index(feat)
+                columns[feat] = [chunk[position][1][column].strip() for position in well_formed]
+            try:
+                scored = self._score_frame(pd.DataFrame(columns, columns=self.features), threads)
+            except Exception as e:
+                scored = [{'error': 'Prediction failed', 'details': str(e)}] * len(well_formed)
+            
+            for position, outcome in zip(well_formed, scored):
+                line, fields = chunk[position]
+                outcomes[position] = (fields, {'line': line, **outcome})
+        
+        return outcomes
+    
+    def _render_chunk(self, outcomes, header, output_format, counts):
+        """Render scored rows as NDJSON lines or CSV rows"""
+        for _, outcome in outcomes:
+            counts['rows'] += 1
+            counts['failed' if 'error' in outcome else 'succeeded'] += 1
+        
+        if output_format == 'ndjson':
+            lines = []
+            for fields, outcome in outcomes:
+                if fields is not None:
+                    outcome = {'line': outcome['line'], 'input': dict(zip(header, fields)),
+                               **{k: v for k, v in outcome.items() if k != 'line'}}
+                lines.append(json.dumps(outcome))
+            return '\n'.join(lines) + '\n'
+        
+        rows = []
+        for fields, outcome in outcomes:
+            probabilities = outcome.get('probabilities', {})
+            rows.append((fields or [''] * len(header)) + [
+                outcome.get('line', ''),
+                outcome.get('prediction', ''),
+                outcome.get('confidence', ''),
+                probabilities.get('No', ''),
+                probabilities.get('Yes', ''),
+                outcome.get('error', '')
+            ])
+        return self._render_csv_rows(rows)
+    
+    def _render_csv_rows(self, rows):
+        """Format rows as CSV text"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    
+    def _parse_threads(self, value):
+        """``?threads=`` as a positive int (None when absent); returns (threads, error)"""
+        if value is None:
+            return None, None
+        try:
+            threads = int(value)
+        except (TypeError, ValueError):
+            threads = 0
+        if threads <= 0:
+            return None, {'valid': False, 'error': 'threads must be a positive integer', 'code': 400}
+        return threads, None
+    
+    def _score_frame(self, df, threads=None, explain=False):
+        """Validate raw feature values column-wise and score every valid row in one call
+        
+        Returns one entry per row: formatted prediction fields (with
+        contributions when ``explain``) or an error dict.
+        """
+        predictions, valid, row_errors = self._score_valid(
+            df, lambda model_manager, rows: model_manager.explain_batch(rows, threads) if explain
+            else model_manager.predict_batch(rows, threads)
+        )
+        
+        outcomes = [None] * len(df)
+        for position, errors in row_errors.items():
+            outcomes[position] = self._value_error(errors)
+        if predictions is not None:
+            for position, result in zip(valid.nonzero()[0], predictions):
+                outcomes[position] = self._format_result(result)
+        return outcomes
+    
+    def _score_valid(self, df, score):
+        """Validate and coerce raw feature values column-wise, then ``score(model_manager, rows)`` once
+        
+        Returns (scores of the valid rows or None, valid row mask,
+        {row position: {feature: message}}). Rows are checked against the
+        compiled schema before the model is touched, so a chunk of invalid
+        rows never loads a lazy variant.
+        """
+        if self.schema is not None:
+            with metrics.stage('validation'):
+                df, row_errors = self.schema.validate_frame(df, self.features)
+            if len(row_errors) == len(df):
+                return None, np.zeros(len(df), dtype=bool), row_errors
+        
+        with self._model() as model_manager:
+            if self.schema is None:
+                # No feature metadata: only the model's categories are known
+                schema = FeatureSchema.from_levels(model_manager.categorical_levels, self.features)
+                with metrics.stage('validation'):
+                    df, row_errors = schema.validate_frame(df, self.features)
+            
+            valid = np.ones(len(df), dtype=bool)
+            valid[list(row_errors)] = False
+            scores = score(model_manager, df[valid]) if valid.any() else None
+        
+        return scores, valid, row_errors
+    
+    def _value_error(self, errors):
+        """Error fields for one record's invalid values ({feature: message})"""
+        return {
+            'error': 'Invalid feature values',
+            'invalid_features': list(errors),
+            'field_errors': errors
+        }
+    
+    def _row_error(self, index, validation):
+        """Compact per-row error for batch responses"""
+        error = {'index': index, 'error': validation['error']}
+        for key in ('missing', 'extra_features'):
+            if key in validation:
+                error[key] = validation[key]
+        return error
+    
+    def _format_result(self, result):
+        """Format raw model output as API prediction fields"""
+        prediction_label = 'Yes' if result['prediction'] == 1 else 'No'
+        confidence = max(result['probabilities'].values()) * 100
+        
+        formatted = {
+            'prediction': prediction_label,
+            'confidence': round(confidence, 2),
+            'probabilities': {
+                'No': round(result['probabilities']['no'] * 100, 2),
+                'Yes': round(result['probabilities']['yes'] * 100, 2)
+            }
+        }
+        if 'explanation' in result:
+            formatted['explanation'] = self._format_explanation(result['explanation'])
+        return formatted
+    
+    def _format_explanation(self, explanation):
+        """Base value and per-feature contributions in percentage points of 'Yes'"""
+        return {
+            'base_value': round(explanation['base_value'] * 100, 2),
+            'contributions': {
+                feature: round(value * 100, 2) for feature, value in explanation['contributions'].items()
+            }
+        }
 
 
 class ResultsController:
-    """Handles results requests"""
+    """Handles results requests
+    
+    Results are pre-rendered by ResultsManager; ``fields`` is the raw
+    ``?fields=`` value (comma-separated dotted paths) or None.
+    """
     
     def __init__(self, results_manager):
         self.results_manager = results_manager
     
-    def get_all_results(self):
+    def get_all_results(self, fields=None):
         """Get complete results"""
-        results = self.results_manager.get_all_results()
-        if results is None:
-            return {'error': 'Results not loaded', 'code': 500}
-        return {'valid': True, 'data': results}
+        return self._rendered('all', fields)
     
-    def get_summary(self):
+    def get_summary(self, fields=None):
         """Get results summary"""
-        summary = self.results_manager.get_summary()
-        if summary is None:
-            return {'error': 'Results not loaded', 'code': 500}
-        return {'valid': True, 'data': summary}
+        return self._rendered('summary', fields)
     
-    def get_model_results(self, model_type):
+    def get_model_results(self, model_type, fields=None):
         """Get specific model results"""
         if model_type not in ['full', 'reduced', 'minimal']:
             return {
                 'error': 'Invalid model type. Use: full, reduced, or minimal',
                 'code': 400
             }
+        return self._rendered(model_type, fields)
+    
+    def _rendered(self, document, fields):
+        field_list = None
+        if fields is not None:
+            field_list = [field.strip() for field in fields.split(',') if field.strip()]
+            if not field_list:
+                return {'error': 'fields must list at least one field', 'code': 400}
         
-        results = self.results_manager.get_model_results(model_type)
-        if results is None:
+        try:
+            rendered = self.results_manager.get_rendered(document, field_list)
+        except KeyError as e:
+            return {'error': f'Unknown field: {e.args[0]}', 'code': 400}
+        if rendered is None:
             return {'error': 'Results not loaded', 'code': 500}
-        return {'valid': True, 'data': results}
+        return {'valid': True, 'rendered': rendered}
 
 
 class VisualizationController:
-    """Handles visualization requests"""
+    """Handles visualization requests
     
-    def __init__(self, viz_manager):
+    ``width`` / ``fmt`` are the raw ``?w=`` / ``?format=`` values; with a
+    DerivativeStore they select a downscaled or WebP version.
+    """
+    
+    def __init__(self, viz_manager, derivatives=None):
         self.viz_manager = viz_manager
+        self.derivatives = derivatives
     
     def list_visualizations(self):
         """List all available visualizations"""
@@ -159,7 +782,9 @@ class VisualizationController:
             return {
                 'valid': True,
                 'visualizations': visualizations,
-                'base_url': '/api/visualizations'
+                'assets': self.viz_manager.hashed_names(),
+                'base_url': '/api/visualizations',
+                'assets_url': '/api/assets'
             }
         except Exception as e:
             return {
@@ -167,7 +792,7 @@ class VisualizationController:
                 'code': 500
             }
     
-    def get_image(self, category, filename):
+    def get_image(self, category, filename, width=None, fmt=None):
         """Get visualization image"""
         # Validate category
         if not self.viz_manager.validate_category(category):
@@ -176,26 +801,253 @@ class VisualizationController:
                 'code': 400
             }
         
-        # Get image path
-        img_path = self.viz_manager.get_image_path(category, filename)
-        if img_path is None:
+        # Look up the indexed image
+        asset = self.viz_manager.get_asset(category, filename)
+        if asset is None:
             return {
                 'error': f'Visualization not found: {category}/{filename}',
                 'code': 404
             }
         
+        return self._found(asset, width, fmt)
+    
+    def get_hashed_image(self, hashed_name, width=None, fmt=None):
+        """Get visualization image by content-hashed name"""
+        asset = self.viz_manager.get_hashed_asset(hashed_name)
+        if asset is None:
+            return {
+                'error': f'Asset not found: {hashed_name}',
+                'code': 404
+            }
+        
+        return self._found(asset, width, fmt)
+    
+    def _found(self, asset, width, fmt):
+        if width is None and fmt is None:
+            return {
+                'valid': True,
+                'asset': asset,
+                'data': self.viz_manager.read(asset),
+                'mimetype': 'image/png',
+                'etag': asset.digest
+            }
+        
+        if width is not None:
+            try:
+                width = int(width)
+            except ValueError:
+                width = 0
+            if width <= 0:
+                return {'error': 'w must be a positive integer (pixels)', 'code': 400}
+        fmt = (fmt or 'png').lower()
+        if fmt not in ('png', 'webp'):
+            return {'error': 'Invalid format. Use: png or webp', 'code': 400}
+        
+        if self.derivatives is None:
+            data, mimetype, etag = self.viz_manager.read(asset), 'image/png', asset.digest
+        else:
+            data, mimetype, etag = self.derivatives.get(asset, width, fmt)
+        return {
+            'valid': True,
+            'asset': asset,
+            'data': data,
+            'mimetype': mimetype,
+            'etag': etag
+        }
+
+
+class JobController:
+    """Handles asynchronous batch scoring jobs
+    
+    The dataset is an uploaded CSV or a file under ``input_dir`` (server-side
+    paths are refused when it is empty). The header is checked before the
+    job is queued, so a file without the required columns fails right away.
+    """
+    
+    OUTPUT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+    
+    def __init__(self, job_queue, model_registry=None, model_manager=None, default_model='minimal',
+                 input_dir='', events_max_seconds=55, poll_interval=0.5):
+        self.job_queue = job_queue
+        self.model_registry = model_registry
+        self.model_manager = model_manager
+        self.default_model = default_model
+        self.input_dir = input_dir
+        self.events_max_seconds = events_max_seconds
+        self.poll_interval = poll_interval
+    
+    def submit(self, upload=None, path=None, model_type=None, output_format=None):
+        """Queue a scoring job; returns immediately with its id and URLs"""
+        output_format = output_format or 'csv'
+        if output_format not in self.OUTPUT_FORMATS:
+            return {
+                'valid': False,
+                'error': 'Invalid output format',
+                'allowed_formats': list(self.OUTPUT_FORMATS),
+                'code': 400
+            }
+        
+        model_type = model_type or self.default_model
+        if self.model_registry is not None:
+            if model_type not in self.model_registry:
+                return {
+                    'valid': False,
+                    'error': f'Unknown model type: {model_type}',
+                    'available': self.model_registry.names,
+                    'code': 400
+                }
+            model_path = self.model_registry.manager(model_type).model_path
+            features = self.model_registry.features(model_type)
+        else:
+            model_path = self.model_manager.model_path
+            features = self.model_manager.feature_names
+        
+        if upload is None and not path:
+            return {
+                'valid': False,
+                'error': 'No dataset provided',
+                'hint': 'Upload a CSV (multipart field "file" or text/csv body) or send {"path": ...}',
+                'code': 400
+            }
+        
+        if upload is None:
+            input_path = self._resolve_input(path)
+            if isinstance(input_path, dict):
+                return input_path
+        
+        job_id = self.job_queue.create()
+        if upload is not None:
+            input_path = self.job_queue.path(job_id, JobQueue.INPUT_FILE)
+            with open(input_path, 'wb') as f:
+                shutil.copyfileobj(upload, f, 1024 * 1024)
+        
+        error = self._check_header(input_path, features)
+        if error is not None:
+            self.job_queue.discard(job_id)
+            return error
+        
+        state = self.job_queue.submit(job_id, {
+            'model': model_type,
+            'model_path': model_path,
+            'features': features,
+            'format': output_format,
+            'input': input_path,
+            'source': 'upload' if upload is not None else path
+        })
+        return {'valid': True, 'job': self._describe(state), 'code': 202}
+    
+    def _resolve_input(self, path):
+        """Absolute path of a server-side dataset inside input_dir (or an error dict)"""
+        if not self.input_dir:
+            return {'valid': False, 'error': 'Server-side dataset paths are disabled', 'code': 403}
+        root = os.path.realpath(self.input_dir)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root or not os.path.isfile(resolved):
+            return {'valid': False, 'error': 'Dataset not found', 'path': path, 'code': 404}
+        return resolved
+    
+    def _check_header(self, input_path, features):
+        """Error dict when the CSV cannot be read or lacks required columns"""
+        try:
+            with open(input_path, 'r', encoding='utf-8-sig', newline='') as f:
+                header = [column.strip() for column in next(csv.reader(f))]
+        except StopIteration:
+            return {'valid': False, 'error': 'Empty CSV', 'code': 400}
+        except (csv.Error, UnicodeDecodeError) as e:
+            return {'valid': False, 'error': 'Malformed CSV header', 'details': str(e), 'code': 400}
+        
+        missing = [f for f in features if f not in header]
+        if missing:
+            return {
+                'valid': False,
+                'error': 'Missing required columns',
+                'missing': missing,
+                'required': features,
+                'code': 400
+            }
+        return None
+    
+    def status(self, job_id):
+        """Status and progress of a job"""
+        state = self.job_queue.get(job_id)
+        if state is None:
+            return {'valid': False, 'error': 'Job not found', 'code': 404}
+        return {'valid': True, 'job': self._describe(state)}
+    
+    def result(self, job_id):
+        """Result file of a succeeded job"""
+        state = self.job_queue.get(job_id)
+        if state is None:
+            return {'valid': False, 'error': 'Job not found', 'code': 404}
+        if state['status'] != 'succeeded':
+            return {
+                'valid': False,
+                'error': 'Job failed' if state['status'] == 'failed' else 'Job not finished',
+                'status': state['status'],
+                'job_error': state['error'],
+                'code': 409
+            }
         return {
             'valid': True,
-            'path': img_path
+            'path': self.job_queue.result_path(state),
+            'mimetype': self.OUTPUT_FORMATS[state['format']],
+            'filename': f"predictions-{job_id}.{state['format']}"
         }
+    
+    def events(self, job_id):
+        """Server-sent events stream of a job's progress"""
+        if self.job_queue.get(job_id) is None:
+            return {'valid': False, 'error': 'Job not found', 'code': 404}
+        return {'valid': True, 'stream': self._events(job_id)}
+    
+    def _events(self, job_id):
+        """Yield a ``progress`` event whenever job.json changes and ``done`` at the end
+        
+        The stream closes after ``events_max_seconds`` so a sync gunicorn
+        worker is never held past its timeout; EventSource reconnects on
+        its own after the ``retry`` delay.
+        """
+        yield 'retry: 2000\n\n'
+        deadline = time.monotonic() + self.events_max_seconds
+        last = None
+        while True:
+            state = self.job_queue.get(job_id)
+            if state is None:
+                return
+            payload = json.dumps(self._describe(state))
+            if payload != last:
+                yield f'event: progress\ndata: {payload}\n\n'
+                last = payload
+            if state['status'] in JobQueue.FINISHED:
+                yield f'event: done\ndata: {payload}\n\n'
+                return
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(self.poll_interval)
+    
+    def _describe(self, state):
+        """Public view of a job state with its endpoint URLs"""
+        job = {key: value for key, value in state.items() if key != 'pid'}
+        job.update({
+            'status_url': f"/jobs/{state['id']}",
+            'events_url': f"/jobs/{state['id']}/events",
+            'result_url': f"/jobs/{state['id']}/result"
+        })
+        return job
 
 
 class HealthController:
     """Handles health check requests"""
     
-    def __init__(self, model_manager, results_manager):
+    def __init__(self, model_manager, results_manager, batcher=None, registry=None, reloader=None,
+                 default_model='minimal', job_queue=None):
         self.model_manager = model_manager
         self.results_manager = results_manager
+        self.default_model = default_model
+        self.batcher = batcher
+        self.registry = registry
+        self.reloader = reloader
+        self.job_queue = job_queue
     
     def get_health_status(self):
         """Get API health status"""
@@ -204,14 +1056,168 @@ class HealthController:
         
         accuracy = None
         if results_loaded:
-            accuracy = self.results_manager.get_model_accuracy('minimal')
+            accuracy = self.results_manager.get_model_accuracy(self.default_model)
         
         return {
             'status': 'healthy' if (model_loaded and results_loaded) else 'error',
             'model': {
                 'loaded': model_loaded,
-                'type': 'ultra_minimal',
-                'features_required': 7,
+                'type': self.default_model,
+                'features_required': len(self.model_manager.feature_names) if model_loaded else None,
                 'accuracy': f"{accuracy:.2f}%" if accuracy else 'N/A'
+            },
+            'cache': self.model_manager.cache_stats(),
+            'threads': self.model_manager.thread_budget.stats(),
+            'micro_batching': self.batcher.stats() if self.batcher is not None else None,
+            'models': self.registry.stats() if self.registry is not None else None,
+            'reload': self.reloader.status() if self.reloader is not None else None,
+            'jobs': self.job_queue.stats() if self.job_queue is not None else None
+        }
+    
+    def get_models(self):
+        """List servable model variants and their features"""
+        if self.registry is None:
+            return {'error': 'Model registry not available', 'code': 404}
+        
+        stats = self.registry.stats()
+        models = {}
+        for name in self.registry.names:
+            accuracy = self.results_manager.get_model_accuracy(name)
+            models[name] = {
+                **stats['variants'][name],
+                'required_features': self.registry.features(name),
+                'accuracy': f"{accuracy:.2f}%" if accuracy else 'N/A',
+                'endpoint': f'/predict/{name}'
+            }
+        
+        return {
+            'valid': True,
+            'models': models,
+            'memory_budget_mb': stats['memory_budget_mb'],
+            'memory_used_mb': stats['memory_used_mb']
+        }
+    
+    def get_readiness(self):
+        """Get readiness of this worker (model loaded and warmed up)"""
+        ready = self.model_manager.loaded and self.model_manager.ready and self.results_manager.loaded
+        return {
+            'ready': ready,
+            'pid': os.getpid(),
+            'model_loaded': self.model_manager.loaded,
+            'warmed_up': self.model_manager.ready,
+            'backend': self.model_manager.active_backend,
+            'code': 200 if ready else 503
+        }
+
+
+class AdminController:
+    """Handles operational requests protected by ADMIN_TOKEN"""
+    
+    PROFILE_FORMATS = ['json', 'collapsed']
+    
+    def __init__(self, reloader, admin_token='', profiler=None):
+        self.reloader = reloader
+        self.admin_token = admin_token
+        self.profiler = profiler
+    
+    def authorize(self, token):
+        """Check the X-Admin-Token header (endpoints are off without ADMIN_TOKEN)"""
+        if not self.admin_token:
+            return {'valid': False, 'error': 'Admin endpoints are disabled', 'code': 404}
+        if not token or not hmac.compare_digest(token, self.admin_token):
+            return {'valid': False, 'error': 'Invalid admin token', 'code': 403}
+        return {'valid': True}
+    
+    def reload_model(self, token, wait=False):
+        """Reload MODEL_PATH (validated, then swapped atomically); other workers follow"""
+        auth = self.authorize(token)
+        if not auth['valid']:
+            return auth
+        
+        if self.reloader.status()['reloading']:
+            return {'valid': False, 'error': 'Reload already in progress', 'code': 409}
+        
+        if not wait:
+            self.reloader.request_reload()
+            return {'valid': True, 'accepted': True, 'pid': os.getpid(), 'code': 202}
+        
+        if not self.reloader.request_reload(wait=True):
+            status = self.reloader.status()
+            return {
+                'valid': False,
+                'error': 'Model reload rejected',
+                'details': status['last_error'] or 'Reload already in progress',
+                'code': 422
             }
+        
+        return {'valid': True, 'reloaded': True, 'pid': os.getpid(), **self.reloader.status(), 'code': 200}
+    
+    def get_reload_status(self, token):
+        """Reload state of the worker answering the request"""
+        auth = self.authorize(token)
+        if not auth['valid']:
+            return auth
+        return {'valid': True, 'pid': os.getpid(), **self.reloader.status(), 'code': 200}
+    
+    def start_profile(self, token, seconds='5', interval_ms='10', include_idle=False, wait=False):
+        """Sample this worker's stacks for a few seconds"""
+        auth = self.authorize(token)
+        if not auth['valid']:
+            return auth
+        
+        if self.profiler is None:
+            return {'valid': False, 'error': 'Profiler is disabled', 'code': 404}
+        
+        try:
+            seconds = float(seconds)
+            interval_ms = float(interval_ms)
+            if not (math.isfinite(seconds) and math.isfinite(interval_ms)):
+                raise ValueError('non-finite profile parameter')
+        except (TypeError, ValueError):
+            return {
+                'valid': False,
+                'error': 'Invalid profile parameters',
+                'details': 'seconds and interval_ms must be finite numbers',
+                'code': 400
+            }
+        
+        # A waiting request must not profile itself
+        exclude = threading.get_ident() if wait else None
+        profile_id = self.profiler.start(seconds, interval_ms, include_idle, exclude)
+        if profile_id is None:
+            return {'valid': False, 'error': 'Profile already running in this worker', 'code': 409}
+        
+        if wait:
+            self.profiler.wait()
+            return {'valid': True, 'profile': self.profiler.result(profile_id), 'code': 200}
+        
+        return {
+            'valid': True,
+            'id': profile_id,
+            'pid': os.getpid(),
+            'seconds': min(seconds, self.profiler.max_seconds),
+            'result_url': f'/admin/profile/{profile_id}',
+            'code': 202
         }
+    
+    def get_profile(self, token, profile_id, output_format='json'):
+        """Finished profile (written by whichever worker sampled it)"""
+        auth = self.authorize(token)
+        if not auth['valid']:
+            return auth
+        
+        if self.profiler is None:
+            return {'valid': False, 'error': 'Profiler is disabled', 'code': 404}
+        
+        if output_format not in self.PROFILE_FORMATS:
+            return {
+                'valid': False,
+                'error': 'Invalid output format',
+                'details': f"Use: {', '.join(self.PROFILE_FORMATS)}",
+                'code': 400
+            }
+        
+        profile = self.profiler.result(profile_id)
+        if profile is None:
+            return {'valid': False, 'error': 'Profile not found or still running', 'code': 404}
+        return {'valid': True, 'profile': profile, 'format': output_format, 'code': 200}
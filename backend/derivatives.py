@@ -0,0 +1,187 @@
+"""
+Imaging Layer - Downscaled / WebP derivatives of visualization images
+
+Usage (from backend/, e.g. as a build step):
+    python derivatives.py            # pre-generate every width x format
+"""
+
+import io
+import os
+import threading
+
+from cache import _Flight
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional: originals are served unchanged
+    Image = None
+
+
+class DerivativeStore:
+    """Resizes and re-encodes indexed images on first request, cached on disk
+
+    Requested widths are rounded up to the nearest entry of ``widths`` (and
+    never above the original), so the cache holds a bounded set of
+    variants per image. Files are named by the source content hash, which
+    makes them valid forever and safe to share between workers and
+    deploys; the least recently used are deleted once the directory grows
+    past ``max_bytes``. Concurrent misses on one derivative in a process
+    render it once.
+
+    Without Pillow the store is disabled and callers get the original.
+    """
+
+    FORMATS = {
+        'png': ('image/png', 'PNG', {'optimize': True}),
+        'webp': ('image/webp', 'WEBP', {'quality': 80, 'method': 4})
+    }
+
+    def __init__(self, viz_manager, cache_dir, widths=(320, 640, 960, 1280, 1920),
+                 max_bytes=64 * 1024 * 1024):
+        self.viz_manager = viz_manager
+        self.cache_dir = cache_dir
+        self.widths = sorted(widths)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.generated = 0
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    @property
+    def formats(self):
+        """Output formats this Pillow build can write"""
+        if not self.enabled:
+            return []
+        return [fmt for fmt in self.FORMATS if fmt != 'webp' or features.check('webp')]
+
+    def snap_width(self, width):
+        """Smallest configured width >= ``width`` (the largest one if none is)"""
+        return next((w for w in self.widths if w >= width), self.widths[-1])
+
+    def get(self, asset, width=None, fmt='png'):
+        """(bytes, mimetype, etag) of a derivative; the original if nothing changes"""
+        original = self.viz_manager.read(asset)
+        if not self.enabled or fmt not in self.formats:
+            return original, 'image/png', asset.digest
+
+        width = self.snap_width(width) if width else None
+        if width is not None and asset.width and width >= asset.width:
+            width = None  # never upscale
+        if fmt == 'png' and width is None:
+            return original, 'image/png', asset.digest
+
+        key = f'{asset.digest}-{width or "orig"}.{fmt}'
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # recency for eviction
+        except FileNotFoundError:
+            data = self._render_once(key, path, original, width, fmt)
+        return data, self.FORMATS[fmt][0], key
+
+    def _render_once(self, key, path, original, width, fmt):
+        """Render a missing derivative; concurrent callers wait for one render"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._render(original, width, fmt)
+            self._write(path, flight.value)
+            with self._lock:
+                self.generated += 1
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def _render(self, original, width, fmt):
+        _, pil_format, options = self.FORMATS[fmt]
+        with Image.open(io.BytesIO(original)) as image:
+            image.load()
+            if width and width < image.width:
+                height = max(round(image.height * width / image.width), 1)
+                image = image.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, pil_format, **options)
+        return out.getvalue()
+
+    def _write(self, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used derivatives until under ``max_bytes``"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def pregenerate(self):
+        """Render every configured width and format of every indexed image
+
+        Returns the number of distinct derivatives (originals excluded).
+        """
+        keys = set()
+        for category, files in self.viz_manager.list_all().items():
+            for filename in files:
+                asset = self.viz_manager.get_asset(category, filename)
+                for fmt in self.formats:
+                    for width in [None, *self.widths]:
+                        _, _, key = self.get(asset, width, fmt)
+                        if key != asset.digest:
+                            keys.add(key)
+        return len(keys)
+
+
+if __name__ == '__main__':
+    import time
+
+    from config import Config
+    from models import VisualizationManager
+
+    if Image is None:
+        raise SystemExit('Pillow is not installed: pip install Pillow')
+
+    viz_manager = VisualizationManager(Config.IMG_BASE_PATH)
+    viz_manager.build_index()
+    store = DerivativeStore(viz_manager, Config.DERIVATIVE_DIR, Config.DERIVATIVE_WIDTHS,
+                            Config.DERIVATIVE_CACHE_MB * 1024 * 1024)
+    started = time.perf_counter()
+    count = store.pregenerate()
+    print(f"🖼️  {count} derivatives ready in {Config.DERIVATIVE_DIR} "
+          f"({store.generated} generated, {time.perf_counter() - started:.1f}s)")
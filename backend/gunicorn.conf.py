@@ -1,6 +1,9 @@
 # Gunicorn configuration file
+import gc
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
@@ -8,7 +11,23 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
-worker_class = 'sync'
+# Threads per worker; >1 switches to gthread so MICRO_BATCHING can coalesce requests
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+# A sync worker serves one request at a time: /jobs/<id>/events then sends the
+# current state and closes, and EventSource polls at its retry interval
+if worker_class == 'sync':
+    os.environ.setdefault('JOB_EVENTS_MAX_SECONDS', '0')
+
+# Tell the app how many requests run at once so it can size the threads each
+# model call may use (threads.ThreadBudget); native pools get the same share.
+# Must be set before numpy is imported
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+inference_threads = int(os.environ.get('INFERENCE_THREADS', 0)) or \
+    max(multiprocessing.cpu_count() // (workers * threads), 1)
+for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(name, str(inference_threads))
 worker_connections = 1000
 timeout = 120
 keepalive = 2
@@ -17,6 +36,19 @@ keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
 
+# Load the app (and model) once in the master; workers are forked from it and
+# share the model's memory pages copy-on-write, so recycled workers start warm
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() == 'true'
+
+# Metrics: every process writes prometheus_client samples to files in this
+# directory and /metrics merges them. Must be set before the app is imported;
+# cleared on start so counters do not carry over from a previous run
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'attrition-api-metrics')
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -36,3 +68,38 @@ tmp_upload_dir = None
 # SSL (if needed)
 keyfile = None
 certfile = None
+
+
+# Server hooks
+def when_ready(server):
+    """Start the job runner, then move everything loaded in the master to GC's
+    permanent generation.
+
+    The runner is one process for all workers, so /jobs survive worker
+    recycling. Without the freeze, the first collection in each worker
+    touches every object header of the preloaded model and dirties the
+    shared pages.
+    """
+    from app_mvc import start_job_runner
+    server.job_runner = start_job_runner()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Catch up with model reloads since preload, then warm up before accepting requests"""
+    from app_mvc import warm_up
+    warm_up(worker.wsgi)
+
+
+def on_exit(server):
+    """Stop the job runner (its running jobs are failed on the next start)"""
+    job_runner = getattr(server, 'job_runner', None)
+    if job_runner is not None:
+        job_runner.terminate()
+        job_runner.wait(10)
+
+
+def child_exit(server, worker):
+    """Drop live-gauge files of exited workers (their counters are kept)"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,542 @@
+"""
+Inference Layer - Compiled NumPy evaluation of the pickled RandomForest pipelines
+"""
+
+import bisect
+import json
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureEncoder:
+    """Precompiled replacement for the fitted ColumnTransformer
+
+    Maps feature dicts (validated request JSON) straight into a float32
+    matrix in the column order the forest was trained on, without building
+    a DataFrame. Supports the transformers produced by
+    ``model/model.py::create_pipeline``: ``OneHotEncoder`` (including
+    ``drop='first'``) and passthrough columns.
+    """
+
+    def __init__(self, feature_names, n_outputs, numeric, categorical):
+        self.feature_names = feature_names
+        self.n_outputs = n_outputs
+        # [(feature, output column)]
+        self.numeric = numeric
+        # [(feature, {category: output column or -1 when dropped})]
+        self.categorical = categorical
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Build from a fitted ColumnTransformer"""
+        feature_names = [str(name) for name in preprocessor.feature_names_in_]
+        numeric, categorical = [], []
+
+        with warnings.catch_warnings():
+            # sklearn 1.6 warns when reading integer remainder columns
+            warnings.simplefilter('ignore', FutureWarning)
+            transformers = [
+                (name, transformer, list(columns))
+                for name, transformer, columns in preprocessor.transformers_
+            ]
+
+        for name, transformer, columns in transformers:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            columns = [feature_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            start = preprocessor.output_indices_[name].start
+
+            if type(transformer).__name__ == 'OneHotEncoder':
+                if transformer.handle_unknown != 'error':
+                    raise ValueError(f"Unsupported handle_unknown: {transformer.handle_unknown}")
+                drop_idx = transformer.drop_idx_
+                position = start
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    lookup = {}
+                    for j, category in enumerate(categories):
+                        if drop_idx is not None and drop_idx[i] == j:
+                            lookup[category] = -1
+                        else:
+                            lookup[category] = position
+                            position += 1
+                    categorical.append((column, lookup))
+            elif (isinstance(transformer, str) and transformer == 'passthrough') \
+                    or getattr(transformer, 'func', False) is None:
+                numeric.extend((column, start + offset) for offset, column in enumerate(columns))
+            else:
+                raise ValueError(f"Unsupported transformer: {type(transformer).__name__}")
+
+        n_outputs = sum(s.stop - s.start for s in preprocessor.output_indices_.values())
+        return cls(feature_names, n_outputs, numeric, categorical)
+
+    def encode_into(self, record, row):
+        """Write one feature dict into a preallocated (zeroed) float32 row"""
+        for feature, index in self.numeric:
+            row[index] = float(record[feature])
+        for feature, lookup in self.categorical:
+            index = self._code(feature, lookup, record[feature])
+            if index >= 0:
+                row[index] = 1.0
+        return row
+
+    def encode(self, record):
+        """Encode a single feature dict, shape (1, n_outputs)"""
+        row = np.zeros((1, self.n_outputs), dtype=np.float32)
+        self.encode_into(record, row[0])
+        return row
+
+    def encode_many(self, records):
+        """Encode a list of feature dicts column by column"""
+        X = np.zeros((len(records), self.n_outputs), dtype=np.float32)
+        rows = np.arange(len(records))
+
+        for feature, index in self.numeric:
+            X[:, index] = [float(record[feature]) for record in records]
+        for feature, lookup in self.categorical:
+            codes = np.array(
+                [self._code(feature, lookup, record[feature]) for record in records],
+                dtype=np.intp
+            )
+            kept = codes >= 0
+            X[rows[kept], codes[kept]] = 1.0
+
+        return X
+
+    def encode_frame(self, data_frame):
+        """Encode a DataFrame column by column"""
+        X = np.zeros((len(data_frame), self.n_outputs), dtype=np.float32)
+        rows = np.arange(len(data_frame))
+
+        for feature, index in self.numeric:
+            X[:, index] = np.asarray(data_frame[feature], dtype=np.float64)
+        for feature, lookup in self.categorical:
+            codes = np.array(
+                [self._code(feature, lookup, value) for value in data_frame[feature]],
+                dtype=np.intp
+            )
+            kept = codes >= 0
+            X[rows[kept], codes[kept]] = 1.0
+
+        return X
+
+    def column_features(self):
+        """Index into ``feature_names`` of the raw feature behind each output column"""
+        position = {feature: i for i, feature in enumerate(self.feature_names)}
+        owner = np.zeros(self.n_outputs, dtype=np.intp)
+        for feature, index in self.numeric:
+            owner[index] = position[feature]
+        for feature, lookup in self.categorical:
+            for index in lookup.values():
+                if index >= 0:
+                    owner[index] = position[feature]
+        return owner
+
+    def to_dict(self):
+        """JSON-serializable description (stored in the artifact header)"""
+        return {
+            'feature_names': self.feature_names,
+            'n_outputs': self.n_outputs,
+            'numeric': [[feature, index] for feature, index in self.numeric],
+            'categorical': [
+                [feature, [[category, index] for category, index in lookup.items()]]
+                for feature, lookup in self.categorical
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild from ``to_dict()`` output"""
+        return cls(
+            feature_names=list(data['feature_names']),
+            n_outputs=int(data['n_outputs']),
+            numeric=[(feature, int(index)) for feature, index in data['numeric']],
+            categorical=[
+                (feature, {category: int(index) for category, index in pairs})
+                for feature, pairs in data['categorical']
+            ]
+        )
+
+    @staticmethod
+    def _code(feature, lookup, value):
+        """Output column of a category (-1 when dropped), like handle_unknown='error'"""
+        try:
+            return lookup[value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Unknown category for {feature}: {value!r}")
+
+    def probe_records(self):
+        """Records covering every category level, for equivalence checks"""
+        n_probes = max([len(lookup) for _, lookup in self.categorical] + [1])
+        records = []
+        for i in range(n_probes):
+            record = {feature: 1.5 + i * 7.25 for feature, _ in self.numeric}
+            for feature, lookup in self.categorical:
+                categories = list(lookup)
+                record[feature] = categories[i % len(categories)]
+            records.append(record)
+        return records
+
+    def matches(self, preprocessor, records=None):
+        """Check equivalence with the preprocessor's own transform"""
+        records = records if records is not None else self.probe_records()
+        expected = np.asarray(
+            preprocessor.transform(pd.DataFrame.from_records(records, columns=self.feature_names)),
+            dtype=np.float32
+        )
+        return np.array_equal(self.encode_many(records), expected)
+
+
+class CompiledForest:
+    """RandomForest flattened into contiguous node arrays and evaluated with NumPy
+
+    All trees are concatenated into one set of arrays (feature, threshold,
+    children, leaf probabilities). Leaves point to themselves, so every tree
+    can be walked in lock-step for ``max_depth`` steps over a
+    ``(rows, trees)`` matrix of node indices, with no per-tree dispatch
+    overhead. Probabilities are summed in tree order and divided by the
+    number of trees exactly like ``RandomForestClassifier.predict_proba``,
+    so results match sklearn (single-threaded) bit for bit.
+    """
+
+    # Rows evaluated per traversal chunk (bounds the (rows, trees) work arrays)
+    CHUNK_SIZE = 1024
+
+    # Artifact format (see save()/load())
+    MAGIC = b'RPFOREST'
+    FORMAT_VERSION = 1
+    ALIGNMENT = 64
+    ARRAYS = {
+        'feature': np.int64,
+        'threshold': np.float64,
+        'children': np.int64,
+        'values': np.float64,
+        'roots': np.int64
+    }
+
+    def __init__(self, preprocessor, feature, threshold, children, values,
+                 roots, max_depth, classes, encoder=None):
+        self.preprocessor = preprocessor
+        self.encoder = encoder
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.values = values
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes = classes
+        self.n_estimators = len(roots)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Build from a fitted Pipeline([('preprocessor', ...), ('classifier', RandomForest)])"""
+        preprocessor = pipeline.named_steps['preprocessor']
+        forest = pipeline.named_steps['classifier']
+
+        encoder = FeatureEncoder.from_preprocessor(preprocessor)
+        if not encoder.matches(preprocessor):
+            raise ValueError("Compiled encoder does not match the fitted preprocessor")
+
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        n_classes = forest.n_classes_
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves and always take the left branch
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            # Interleaved [left, right] pairs: child = children[2 * node + go_right]
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_left),
+                np.where(is_leaf, node_ids, tree.children_right)
+            ], axis=1).ravel() + offset)
+            values.append(tree.value[:, 0, :n_classes])
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            preprocessor=preprocessor,
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            encoder=encoder
+        )
+
+    def save(self, path):
+        """Write a memory-mappable artifact: magic, header length, JSON header, aligned arrays
+
+        The header records the format version, forest metadata, encoder
+        metadata and the dtype/shape/offset of every node array, so
+        ``load()`` can map the arrays straight from the file.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name), dtype=dtype)
+                  for name, dtype in self.ARRAYS.items()}
+        header = {
+            'format': 'attrition-forest',
+            'version': self.FORMAT_VERSION,
+            'max_depth': int(self.max_depth),
+            'n_estimators': int(self.n_estimators),
+            'classes': [c.item() if hasattr(c, 'item') else c for c in self.classes],
+            'encoder': self.encoder.to_dict(),
+            'arrays': {}
+        }
+
+        # Offsets depend on the header size, so reserve generous padding first
+        def layout(start):
+            offset = start
+            for name, array in arrays.items():
+                offset = -(-offset // self.ALIGNMENT) * self.ALIGNMENT
+                header['arrays'][name] = {
+                    'dtype': array.dtype.str,
+                    'shape': list(array.shape),
+                    'offset': offset
+                }
+                offset += array.nbytes
+
+        prefix = len(self.MAGIC) + 8
+        layout(0)
+        reserved = len(json.dumps(header).encode('utf-8')) + 1024
+        data_start = -(-(prefix + reserved) // self.ALIGNMENT) * self.ALIGNMENT
+        layout(data_start)
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.write(b'\0' * (header['arrays'][name]['offset'] - f.tell()))
+                f.write(array.tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load an artifact written by ``save()``; arrays are memory-mapped read-only"""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"Not a forest artifact: {path}")
+            header_length = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_length).decode('utf-8'))
+
+        if header.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact version: {header.get('version')}")
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if mmap:
+                # Plain ndarray view over the shared, read-only file mapping
+                arrays[name] = np.asarray(np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r',
+                                                    offset=spec['offset'], shape=shape))
+            else:
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(path, dtype=np.dtype(spec['dtype']), count=count,
+                                           offset=spec['offset']).reshape(shape)
+
+        return cls(
+            preprocessor=None,
+            max_depth=header['max_depth'],
+            classes=np.asarray(header['classes']),
+            encoder=FeatureEncoder.from_dict(header['encoder']),
+            **arrays
+        )
+
+    def transform(self, data_frame):
+        """Encode a raw feature DataFrame; trees compare in float32 like sklearn"""
+        if self.preprocessor is None:
+            return self.encoder.encode_frame(data_frame)
+        return np.asarray(self.preprocessor.transform(data_frame), dtype=np.float32)
+
+    def apply(self, X):
+        """Leaf node index (global) per row and tree, shape (rows, trees)"""
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_estimators))
+        for _ in range(self.max_depth):
+            values = flat[row_base + self.feature[nodes]]
+            # sklearn goes left when x <= threshold (float32 x vs float64 threshold)
+            go_right = ~(values <= self.threshold[nodes])
+            nodes = self.children[2 * nodes + go_right]
+        return nodes
+
+    def predict_proba_matrix(self, X):
+        """Class probabilities for an already-encoded float32 feature matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.empty((X.shape[0], self.values.shape[1]), dtype=np.float64)
+
+        for start in range(0, X.shape[0], self.CHUNK_SIZE):
+            stop = start + self.CHUNK_SIZE
+            leaves = self.apply(X[start:stop])
+            # Sequential accumulation in tree order (same summation order as sklearn)
+            proba[start:stop] = np.add.accumulate(self.values[leaves], axis=1)[:, -1]
+
+        proba /= self.n_estimators
+        return proba
+
+    # Elements of the (rows, trees, features) gather per contributions chunk
+    CONTRIBUTION_CHUNK_ELEMENTS = 1 << 21
+
+    def contribution_table(self, class_index=1):
+        """Decision-path contributions from the root to every node, shape (nodes, features)
+
+        Every split moves a tree's estimate from the parent's class fraction
+        to the child's; that change is credited to the split feature (one-hot
+        columns to their source feature). Row ``n`` holds the changes summed
+        along the path to node ``n``, so a leaf's row is that tree's full
+        explanation. Built breadth-first once per class and kept.
+        """
+        tables = self.__dict__.setdefault('_contribution_tables', {})
+        if class_index in tables:
+            return tables[class_index]
+
+        value = self.values[:, class_index]
+        owner = self.encoder.column_features()
+        left, right = self.children[0::2], self.children[1::2]
+        table = np.zeros((len(value), len(self.encoder.feature_names)), dtype=np.float64)
+        frontier = np.asarray(self.roots)
+        while frontier.size:
+            # Leaves loop back to themselves
+            frontier = frontier[left[frontier] != frontier]
+            columns = owner[self.feature[frontier]]
+            for children in (left[frontier], right[frontier]):
+                table[children] = table[frontier]
+                table[children, columns] += value[children] - value[frontier]
+            frontier = np.concatenate([left[frontier], right[frontier]])
+
+        tables[class_index] = table
+        return table
+
+    def explain_matrix(self, X, leaves=None, class_index=1):
+        """Labels, probabilities and per-feature contributions from one traversal
+
+        The leaves (found here, or passed in as global node indices when
+        sklearn's ``apply`` already walked the trees) give both the
+        probabilities, summed exactly as in ``predict_proba_matrix``, and a
+        gather of each leaf's precomputed path contributions to
+        ``class_index``, averaged over the trees. Returns (labels,
+        probabilities, base value, contributions of shape (rows,
+        features)); per row, base value + contributions equals the
+        probability of ``class_index`` (up to rounding).
+        """
+        table = self.contribution_table(class_index)
+        n_rows = X.shape[0]
+        proba = np.empty((n_rows, self.values.shape[1]), dtype=np.float64)
+        contributions = np.empty((n_rows, table.shape[1]), dtype=np.float64)
+        step = max(self.CONTRIBUTION_CHUNK_ELEMENTS // (self.n_estimators * table.shape[1]), 1)
+
+        for start in range(0, n_rows, step):
+            stop = start + step
+            chunk_leaves = leaves[start:stop] if leaves is not None else \
+                self.apply(np.ascontiguousarray(X[start:stop], dtype=np.float32))
+            proba[start:stop] = np.add.accumulate(self.values[chunk_leaves], axis=1)[:, -1]
+            contributions[start:stop] = table[chunk_leaves].sum(axis=1)
+
+        proba /= self.n_estimators
+        contributions /= self.n_estimators
+        base_value = float(self.values[self.roots, class_index].mean())
+        return self.classes.take(proba.argmax(axis=1)), proba, base_value, contributions
+
+    def predict_matrix(self, X):
+        """Labels and probabilities from a single traversal"""
+        proba = self.predict_proba_matrix(X)
+        return self.classes.take(proba.argmax(axis=1)), proba
+
+    def predict(self, data_frame):
+        """Labels and probabilities for a raw feature DataFrame"""
+        return self.predict_matrix(self.transform(data_frame))
+
+    def predict_records(self, records):
+        """Labels and probabilities for feature dicts (no pandas involved)"""
+        return self.predict_matrix(self.encoder.encode_many(records))
+
+
+class SplitBinner:
+    """Canonicalizes feature values to the forest's split intervals
+
+    A tree only looks at a numeric value through ``x <= threshold`` tests,
+    so two values with the same number of thresholds strictly below them
+    (after the float32 cast sklearn applies) take identical paths through
+    every tree and get bit-identical probabilities. ``key()`` maps a record
+    to that interval index per feature, which lets the prediction cache
+    share one entry across nearly-continuous inputs like ``MonthlyIncome``.
+    Integer features with only a few split points also get a dense
+    value -> interval table.
+    """
+
+    # Integer span up to which a dense lookup table is precomputed
+    DENSE_MAX_SPAN = 64
+
+    def __init__(self, feature_names, thresholds, categorical):
+        self.feature_names = feature_names
+        # {feature: sorted list of split thresholds}
+        self.thresholds = thresholds
+        # {feature: set of known categories}
+        self.categorical = categorical
+        self.dense = {}
+        for feature, cuts in thresholds.items():
+            if not cuts:
+                continue
+            low, high = math.floor(cuts[0]), math.ceil(cuts[-1])
+            if high - low <= self.DENSE_MAX_SPAN:
+                self.dense[feature] = {
+                    value: bisect.bisect_left(cuts, value) for value in range(low, high + 1)
+                }
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Collect split thresholds per input feature from a fitted pipeline"""
+        return cls.from_forest(CompiledForest.from_pipeline(pipeline))
+
+    @classmethod
+    def from_forest(cls, forest):
+        """Collect split thresholds per input feature from a CompiledForest"""
+        split = np.isfinite(forest.threshold)
+        columns = np.asarray(forest.feature)[split]
+        cuts = np.asarray(forest.threshold)[split]
+
+        thresholds = {
+            feature: np.unique(cuts[columns == column]).tolist()
+            for feature, column in forest.encoder.numeric
+        }
+        categorical = {feature: set(lookup) for feature, lookup in forest.encoder.categorical}
+        return cls(forest.encoder.feature_names, thresholds, categorical)
+
+    def interval(self, feature, value):
+        """Index of the split interval containing a numeric value"""
+        table = self.dense.get(feature)
+        if table is not None and value in table:
+            return table[value]
+        # Compare the float32-rounded value, as the trees do
+        return bisect.bisect_left(self.thresholds[feature], float(np.float32(value)))
+
+    def key(self, record):
+        """Canonical cache key, or None if the record cannot be binned"""
+        key = []
+        for feature in self.feature_names:
+            value = record.get(feature)
+            if feature in self.categorical:
+                if not isinstance(value, str) or value not in self.categorical[feature]:
+                    return None
+                key.append(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) \
+                    and math.isfinite(value):
+                key.append(self.interval(feature, value))
+            else:
+                return None
+        return tuple(key)
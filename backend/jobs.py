@@ -0,0 +1,368 @@
+"""
+Job Layer - Asynchronous batch scoring jobs on the local filesystem
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: no lock, run a single runner
+    fcntl = None
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _write_state(path, state):
+    """Replace a job's state file atomically (readers never see half a file)"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _read_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class JobQueue:
+    """Batch scoring jobs queued on the local filesystem
+
+    Every job is a directory under ``job_dir`` holding ``job.json`` (status
+    and progress), ``spec.json``, the uploaded input and the result file.
+    Any gunicorn worker can submit a job or answer status, event and
+    download requests from those files; no broker is involved. Submitting
+    only drops a marker in ``job_dir/queue``: the jobs are run by one
+    ``JobRunner`` process per ``job_dir`` (see ``start_runner()``), so they
+    outlive recycled web workers and never use more than ``workers``
+    scoring processes in total.
+
+    Finished jobs are deleted after ``retention_hours``.
+    """
+
+    JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+    STATE_FILE = 'job.json'
+    SPEC_FILE = 'spec.json'
+    INPUT_FILE = 'input.csv'
+    RESULT_FILES = {'csv': 'results.csv', 'ndjson': 'results.ndjson'}
+    FINISHED = ('succeeded', 'failed')
+    QUEUE_DIR = 'queue'
+    RUNNER_FILE = 'runner.json'
+    # A runner that has not written its heartbeat for this long is down
+    RUNNER_TIMEOUT = 10.0
+
+    def __init__(self, job_dir, workers=2, retention_hours=24, worker_options=None, poll_interval=0.5):
+        self.job_dir = job_dir
+        self.workers = max(workers, 1)
+        self.retention_hours = retention_hours
+        self.retention_seconds = retention_hours * 3600
+        self.poll_interval = poll_interval
+        # ModelManager / schema settings for the scoring processes
+        self.worker_options = worker_options or {}
+
+    def path(self, job_id, name=STATE_FILE):
+        return os.path.join(self.job_dir, job_id, name)
+
+    def create(self):
+        """New job directory; returns its id"""
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.job_dir, job_id))
+        return job_id
+
+    def discard(self, job_id):
+        """Remove a job that was never submitted (e.g. rejected upload)"""
+        shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+
+    def submit(self, job_id, spec):
+        """Record the job as queued for the runner"""
+        spec = {**self.worker_options, **spec}
+        state = {
+            'id': job_id,
+            'status': 'queued',
+            'model': spec.get('model'),
+            'format': spec['format'],
+            'source': spec['source'],
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'rows': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'bytes_total': os.path.getsize(spec['input']),
+            'bytes_read': 0,
+            'progress': 0.0,
+            'error': None,
+            'pid': None
+        }
+        _write_state(self.path(job_id, self.SPEC_FILE), spec)
+        _write_state(self.path(job_id), state)
+        self.enqueue(job_id)
+        return state
+
+    def enqueue(self, job_id):
+        """Drop the queue marker the runner picks the job up from"""
+        queue_dir = os.path.join(self.job_dir, self.QUEUE_DIR)
+        os.makedirs(queue_dir, exist_ok=True)
+        with open(os.path.join(queue_dir, job_id), 'w', encoding='utf-8'):
+            pass
+
+    def get(self, job_id):
+        """Current state of a job (None if unknown)"""
+        if not self.JOB_ID.match(job_id or ''):
+            return None
+        return _read_state(self.path(job_id))
+
+    def result_path(self, state):
+        """Result file of a finished job"""
+        return self.path(state['id'], self.RESULT_FILES[state['format']])
+
+    def job_ids(self):
+        """Ids of all jobs on disk"""
+        if not os.path.isdir(self.job_dir):
+            return []
+        return [name for name in os.listdir(self.job_dir) if self.JOB_ID.match(name)]
+
+    def cleanup(self):
+        """Delete finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in self.job_ids():
+            path = self.path(job_id)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except OSError:
+                continue
+            state = _read_state(path)
+            if state is not None and state['status'] in self.FINISHED:
+                shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+
+    def runner_status(self):
+        """Heartbeat of the runner process (alive False if missing or stale)"""
+        runner = _read_state(os.path.join(self.job_dir, self.RUNNER_FILE))
+        if runner is None:
+            return {'alive': False}
+        runner['alive'] = time.time() - runner.get('heartbeat', 0) < self.RUNNER_TIMEOUT
+        return runner
+
+    def stats(self):
+        """Jobs on disk by status and the runner's heartbeat"""
+        counts = {'queued': 0, 'running': 0, 'succeeded': 0, 'failed': 0}
+        for job_id in self.job_ids():
+            state = _read_state(self.path(job_id))
+            if state is not None:
+                counts[state['status']] = counts.get(state['status'], 0) + 1
+        return {'workers': self.workers, 'jobs': counts, 'runner': self.runner_status()}
+
+    def start_runner(self):
+        """Start the runner as a separate process (``python jobs.py``); returns the Popen
+
+        Called once by the gunicorn master (or the dev server). A second
+        runner on the same ``job_dir`` waits on the lock as a standby.
+        """
+        return subprocess.Popen([
+            sys.executable, os.path.abspath(__file__),
+            '--job-dir', self.job_dir,
+            '--workers', str(self.workers),
+            '--retention-hours', str(self.retention_hours),
+            '--poll-interval', str(self.poll_interval)
+        ])
+
+
+class JobRunner:
+    """Runs queued jobs in a ``ProcessPoolExecutor`` of ``workers`` processes
+
+    The only writer of running / finished states besides the scoring
+    processes themselves. Holding ``runner.lock`` makes it the single runner
+    of ``job_dir``; on start it fails the jobs a previous runner left
+    ``running`` and requeues the ones it had dispatched but not started.
+    A heartbeat in ``runner.json`` lets the web workers report whether
+    queued jobs are being picked up.
+    """
+
+    LOCK_FILE = 'runner.lock'
+    HEARTBEAT_INTERVAL = 2.0
+
+    def __init__(self, job_queue):
+        self.job_queue = job_queue
+        self.queue_dir = os.path.join(job_queue.job_dir, JobQueue.QUEUE_DIR)
+        self._executor = None
+        self._running = {}
+
+    def run(self):
+        """Serve the queue until the process is terminated"""
+        os.makedirs(self.queue_dir, exist_ok=True)
+        with open(os.path.join(self.job_queue.job_dir, self.LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            print(f"🗂️  Job runner started (pid {os.getpid()}, {self.job_queue.workers} workers)")
+            self._recover()
+            started_at = _now()
+            next_heartbeat = 0.0
+            try:
+                while True:
+                    if time.monotonic() >= next_heartbeat:
+                        next_heartbeat = time.monotonic() + self.HEARTBEAT_INTERVAL
+                        _write_state(os.path.join(self.job_queue.job_dir, JobQueue.RUNNER_FILE), {
+                            'pid': os.getpid(),
+                            'started_at': started_at,
+                            'heartbeat': time.time(),
+                            'running': len(self._running)
+                        })
+                        self.job_queue.cleanup()
+                    self._reap()
+                    self._dispatch()
+                    time.sleep(self.job_queue.poll_interval)
+            finally:
+                # Scoring processes must not outlive the runner (the next one fails their jobs)
+                for child in multiprocessing.active_children():
+                    child.terminate()
+
+    def _recover(self):
+        """Settle jobs a previous runner left behind"""
+        queued = set(os.listdir(self.queue_dir))
+        for job_id in self.job_queue.job_ids():
+            state = self.job_queue.get(job_id)
+            if state is None:
+                continue
+            if state['status'] == 'running':
+                self._fail(job_id, 'Scoring process exited unexpectedly')
+            elif state['status'] == 'queued' and job_id not in queued:
+                self.job_queue.enqueue(job_id)
+
+    def _next(self):
+        """Oldest queued job id (None if the queue is empty)"""
+        markers = []
+        for job_id in os.listdir(self.queue_dir):
+            try:
+                markers.append((os.path.getmtime(os.path.join(self.queue_dir, job_id)), job_id))
+            except OSError:
+                continue
+        return min(markers)[1] if markers else None
+
+    def _dispatch(self):
+        """Hand queued jobs to the pool while it has free workers"""
+        while len(self._running) < self.job_queue.workers:
+            job_id = self._next()
+            if job_id is None:
+                return
+            spec = _read_state(self.job_queue.path(job_id, JobQueue.SPEC_FILE)) \
+                if JobQueue.JOB_ID.match(job_id) else None
+            if spec is not None:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.job_queue.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                future = self._executor.submit(run_job, os.path.join(self.job_queue.job_dir, job_id), spec)
+                self._running[future] = job_id
+            os.remove(os.path.join(self.queue_dir, job_id))
+
+    def _reap(self):
+        """Record jobs whose scoring process died without writing an outcome"""
+        for future in [future for future in self._running if future.done()]:
+            job_id = self._running.pop(future)
+            error = future.exception()
+            if error is None:
+                continue
+            self._fail(job_id, f'Scoring process exited unexpectedly: {error}')
+            if isinstance(error, BrokenProcessPool) and self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _fail(self, job_id, error):
+        path = self.job_queue.path(job_id)
+        state = _read_state(path)
+        if state is not None and state['status'] not in JobQueue.FINISHED:
+            state.update(status='failed', error=error, finished_at=_now())
+            _write_state(path, state)
+
+
+def run_job(job_path, spec):
+    """Score one job in a pool process of the runner"""
+    # Imported here: the parent's modules are not inherited by spawned processes
+    from controllers import PredictionController
+    from models import ModelManager
+    from schema import FeatureSchema
+
+    state_path = os.path.join(job_path, JobQueue.STATE_FILE)
+    state = _read_state(state_path)
+    state.update(status='running', pid=os.getpid(), started_at=_now())
+    _write_state(state_path, state)
+
+    result_path = os.path.join(job_path, JobQueue.RESULT_FILES[spec['format']])
+    partial_path = f'{result_path}.part'
+    try:
+        manager = ModelManager(spec['model_path'], backend=spec.get('backend', 'numpy'),
+                               numpy_max_rows=spec.get('numpy_max_rows', 512))
+        if not manager.load_model():
+            raise RuntimeError(f"Could not load model {os.path.basename(spec['model_path'])}")
+        schema = None
+        if spec.get('schema_path'):
+            schema = FeatureSchema.load(spec['schema_path'], spec.get('range_margin', 1.0))
+        controller = PredictionController(manager, csv_chunk_rows=spec.get('chunk_rows', 5000),
+                                          features=spec['features'], schema=schema)
+
+        with open(spec['input'], 'rb') as source, open(partial_path, 'w', encoding='utf-8', newline='') as out:
+            def progress(counts):
+                state.update(rows=counts['rows'], succeeded=counts['succeeded'], failed=counts['failed'],
+                             bytes_read=source.tell(),
+                             progress=round(min(source.tell() / max(state['bytes_total'], 1), 1.0), 4))
+                _write_state(state_path, state)
+
+            result = controller.predict_csv(source, spec['format'], progress=progress)
+            if not result['valid']:
+                missing = result.get('missing')
+                raise ValueError(result['error'] + (f": {', '.join(missing)}" if missing else ''))
+            for chunk in result['stream']:
+                out.write(chunk)
+
+        os.replace(partial_path, result_path)
+        state.update(status='succeeded', progress=1.0, bytes_read=state['bytes_total'], finished_at=_now())
+    except Exception as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        state.update(status='failed', error=str(e), finished_at=_now())
+    _write_state(state_path, state)
+
+
+def main():
+    """Job runner process: ``python jobs.py`` (defaults from Config)"""
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Run queued /jobs scoring jobs')
+    parser.add_argument('--job-dir', default=Config.JOB_DIR)
+    parser.add_argument('--workers', type=int, default=Config.JOB_WORKERS)
+    parser.add_argument('--retention-hours', type=float, default=Config.JOB_RETENTION_HOURS)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    # SIGTERM from the gunicorn master: unwind so the scoring processes are stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    job_queue = JobQueue(args.job_dir, workers=args.workers, retention_hours=args.retention_hours,
+                         poll_interval=args.poll_interval)
+    try:
+        JobRunner(job_queue).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
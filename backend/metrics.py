@@ -0,0 +1,166 @@
+"""
+Metrics Layer - Prometheus metrics shared across gunicorn workers
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py does this), every process
+# writes its samples to mmapped files in that directory and /metrics merges them
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 5000, 10000, 50000)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route and status',
+    ['method', 'route', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency (until the response body is sent)',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    'predict_stage_duration_seconds', 'Time per prediction stage (validation, encoding, inference, serialization)',
+    ['route', 'stage'], buckets=LATENCY_BUCKETS
+)
+MODEL_LOAD = Histogram(
+    'model_load_duration_seconds', 'Model artifact load time (startup, lazy variants and reloads)',
+    ['artifact'], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+BATCH_ROWS = Histogram(
+    'prediction_batch_rows', 'Rows scored per model call',
+    ['source'], buckets=BATCH_BUCKETS
+)
+
+# Route of the request being served (or the caller a background job works for)
+_route = ContextVar('metrics_route', default='background')
+
+
+def set_route(route):
+    """Label stage timings recorded in this context with ``route``"""
+    _route.set(route)
+
+
+def with_route(route, fn):
+    """Wrap ``fn`` so stage timings inside it are labelled ``route`` in any thread"""
+    def wrapper(*args, **kwargs):
+        token = _route.set(route)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _route.reset(token)
+    return wrapper
+
+
+@contextmanager
+def stage(name):
+    """Time one prediction stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(_route.get(), name).observe(time.perf_counter() - started)
+
+
+def observe_batch(source, rows):
+    """Record the number of rows in one model call"""
+    BATCH_ROWS.labels(source).observe(rows)
+
+
+def observe_model_load(path, seconds):
+    """Record how long an artifact took to load"""
+    MODEL_LOAD.labels(os.path.basename(path)).observe(seconds)
+
+
+def render():
+    """Exposition text for /metrics, merged across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class _TimedBody:
+    """Response iterable that records the request once the body is sent"""
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._body)
+
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._finish()
+
+
+class MetricsMiddleware:
+    """WSGI middleware counting requests and timing them until the body is sent
+
+    Streaming responses (/predict/csv) are timed to their last chunk, not
+    just their headers. The route label is the matched URL rule (set by
+    ``install``), so path parameters do not explode label cardinality.
+    """
+
+    ROUTE_KEY = 'metrics.route'
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        status = ['500']
+
+        def capture(status_line, headers, exc_info=None):
+            status[0] = status_line.split(' ', 1)[0]
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            method = environ.get('REQUEST_METHOD', 'GET')
+            route = environ.get(self.ROUTE_KEY, 'unmatched')
+            REQUESTS.labels(method, route, status[0]).inc()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+
+        try:
+            body = self.wsgi_app(environ, capture)
+        except Exception:
+            finish()
+            raise
+
+        # Keep sendfile for send_file() responses; they are timed up to here
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(body, file_wrapper):
+            finish()
+            return body
+        return _TimedBody(body, finish)
+
+
+def install(app):
+    """Wrap a Flask app with request metrics"""
+    @app.before_request
+    def label_route():
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request.environ[MetricsMiddleware.ROUTE_KEY] = route
+        set_route(route)
+
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
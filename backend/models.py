@@ -2,66 +2,755 @@
 Model Layer - Data handling and business logic
 """
 
+import copy
+import gzip
+import hashlib
+import itertools
 import pickle
+import struct
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+import metrics
+from inference import CompiledForest, FeatureEncoder, SplitBinner
+from threads import ThreadBudget
+
+
+class LoadedModel:
+    """One loaded model artifact; replaced as a whole on reload"""
+    
+    def __init__(self, path, model, engine, binner, version):
+        self.path = path
+        self.model = model
+        self.engine = engine
+        self.binner = binner
+        self.version = version
+        self.loaded_at = time.time()
+        self.encoder = engine.encoder if engine is not None else \
+            FeatureEncoder.from_preprocessor(model.named_steps['preprocessor'])
+        # Accepted values of each categorical feature
+        self.categorical_levels = {feature: list(lookup) for feature, lookup in self.encoder.categorical}
+        self.memory_bytes = self._measure_memory()
+        self._classifiers = {}
+        self._explainer = engine
+        self._splits = binner
+    
+    def classifier(self, n_jobs):
+        """The sklearn forest set to ``n_jobs`` threads
+        
+        Shallow copies share the fitted trees, so requests with different
+        thread counts never mutate the estimator another request is using.
+        """
+        classifier = self._classifiers.get(n_jobs)
+        if classifier is None:
+            classifier = copy.copy(self.model.named_steps['classifier'])
+            classifier.n_jobs = n_jobs
+            self._classifiers[n_jobs] = classifier
+        return classifier
+    
+    @property
+    def feature_names(self):
+        """Raw input features in model column order"""
+        return list(self.encoder.feature_names)
+    
+    @property
+    def explainer(self):
+        """Compiled forest for contributions (compiled on first use on the sklearn backend)"""
+        if self._explainer is None:
+            self._explainer = CompiledForest.from_pipeline(self.model)
+        return self._explainer
+    
+    @property
+    def splits(self):
+        """Split intervals per feature (the cache binner, or built on first use)"""
+        if self._splits is None:
+            self._splits = SplitBinner.from_forest(self.explainer)
+        return self._splits
+    
+    def _measure_memory(self):
+        """Approximate bytes held by the forest (tree nodes and leaf values)"""
+        total = 0
+        if self.engine is not None:
+            engine = self.engine
+            total += sum(array.nbytes for array in (engine.feature, engine.threshold,
+                                                    engine.children, engine.values, engine.roots))
+        if self.model is not None:
+            for tree in self.model.named_steps['classifier'].estimators_:
+                # sklearn stores one 64-byte node struct per node plus its value row
+                total += tree.tree_.node_count * 64 + tree.tree_.value.nbytes
+        return total
 
 
 class ModelManager:
-    """Manages machine learning model loading and predictions"""
+    """Manages machine learning model loading and predictions
+    
+    The loaded model is a single ``LoadedModel`` reference. Every prediction
+    reads it once, so ``reload()`` can swap in a new artifact atomically
+    while in-flight requests finish on the old one.
+    """
+    
+    BACKENDS = ['sklearn', 'numpy']
     
-    def __init__(self, model_path):
+    # Memory-mappable forest artifact written by model/model.py (numpy backend only)
+    ARTIFACT_EXTENSION = '.forest'
+    
+    def __init__(self, model_path, backend='numpy', numpy_max_rows=512, cache=None,
+                 cache_binning=True, thread_budget=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend} (use: {', '.join(self.BACKENDS)})")
         self.model_path = model_path
-        self.model = None
-        self.loaded = False
+        self.backend = backend
+        self.numpy_max_rows = numpy_max_rows
+        self.cache = cache
+        self.cache_binning = cache_binning
+        # Never inherit the pickled n_jobs=-1 (one thread per core per call)
+        self.thread_budget = thread_budget or ThreadBudget(threads=1)
+        self.ready = False
+        self.reloads = 0
+        self._current = None
+        self._version = 0
+        self._swap_lock = threading.Lock()
         
     def load_model(self):
-        """Load the pickled model"""
+        """Load the pickled model (or a memory-mapped .forest artifact)"""
         try:
-            with open(self.model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            self.loaded = True
+            self._swap(self._load(self.model_path))
             return True
         except Exception as e:
             print(f"❌ Error loading model: {str(e)}")
             return False
     
+    def reload(self, golden_set=None, min_auc=0.0, warmup_rows=64):
+        """Load ``model_path`` again, validate it and swap it in without downtime
+        
+        The new model is loaded, checked against the golden set and warmed up
+        before the swap; on any failure the current model keeps serving.
+        Returns an error message, or None on success.
+        """
+        try:
+            state = self._load(self.model_path)
+        except Exception as e:
+            return f"Load failed: {str(e)}"
+        
+        error = self.validate(state, golden_set, min_auc)
+        if error is not None:
+            return error
+        
+        try:
+            self._warm_up(state, warmup_rows)
+        except Exception as e:
+            return f"Warm-up failed: {str(e)}"
+        
+        # In-flight requests hold their own reference to the old model; it is
+        # freed when the last of them finishes
+        self._swap(state)
+        self.reloads += 1
+        self.ready = True
+        return None
+    
+    def _load(self, path):
+        """Build a LoadedModel from an artifact on disk"""
+        started = time.perf_counter()
+        if path.endswith(self.ARTIFACT_EXTENSION):
+            # Arrays are mmapped: near-instant load, pages shared via the OS page cache
+            model = None
+            engine = CompiledForest.load(path)
+        else:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            engine = self._compile(model) if self.backend == 'numpy' else None
+        
+        binner = None
+        if self.cache is not None and self.cache_binning:
+            binner = self._build_binner(model, engine)
+        
+        with self._swap_lock:
+            self._version += 1
+            version = self._version
+        state = LoadedModel(path, model, engine, binner, version)
+        metrics.observe_model_load(path, time.perf_counter() - started)
+        return state
+    
+    def _swap(self, state):
+        """Publish a new model and drop predictions cached for the old one"""
+        with self._swap_lock:
+            old, self._current = self._current, state
+        if self.cache is not None:
+            self.cache.clear()
+        return old
+    
+    def validate(self, state, golden_set=None, min_auc=0.0):
+        """Check a freshly loaded model before it serves traffic (None when valid)
+        
+        The golden set must score without errors, give valid probabilities
+        and reach ``min_auc`` ROC AUC against its labels (accuracy alone
+        cannot catch a model that always predicts the majority class).
+        """
+        current = self._current
+        if current is not None and state.feature_names != current.feature_names:
+            return f"Feature mismatch: expected {current.feature_names}, got {state.feature_names}"
+        
+        records = golden_set['records'] if golden_set else state.encoder.probe_records()
+        try:
+            records = [{feature: record[feature] for feature in state.feature_names} for record in records]
+            probabilities = np.asarray(self._score_records(state, records)[1], dtype=float)
+        except Exception as e:
+            return f"Golden set prediction failed: {str(e)}"
+        
+        if not np.all(np.isfinite(probabilities)) or not np.allclose(probabilities.sum(axis=1), 1.0):
+            return "Golden set produced invalid probabilities"
+        
+        if golden_set and golden_set.get('labels') is not None:
+            auc = self._roc_auc(np.asarray(golden_set['labels']), probabilities[:, 1])
+            if auc < min_auc:
+                return f"Golden set ROC AUC {auc:.4f} below {min_auc:.4f}"
+        return None
+    
+    @staticmethod
+    def _roc_auc(labels, scores):
+        """ROC AUC as the Mann-Whitney rank statistic (ties count half)"""
+        positives = labels == 1
+        n_pos, n_neg = positives.sum(), (~positives).sum()
+        if n_pos == 0 or n_neg == 0:
+            return 1.0
+        ranks = pd.Series(scores).rank().to_numpy()
+        return float((ranks[positives].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+    
+    def unload(self):
+        """Drop the model and its cached predictions (reloaded by ``load_model()``)"""
+        self.ready = False
+        self._swap(None)
+    
+    @property
+    def loaded(self):
+        """Whether a model is serving"""
+        return self._current is not None
+    
+    @property
+    def model(self):
+        """Fitted sklearn pipeline (None for .forest artifacts)"""
+        return self._current.model if self._current is not None else None
+    
+    @property
+    def engine(self):
+        """Compiled forest (None on the sklearn backend)"""
+        return self._current.engine if self._current is not None else None
+    
+    @property
+    def memory_bytes(self):
+        """Approximate bytes held by the serving forest"""
+        return self._current.memory_bytes if self._current is not None else 0
+    
+    @property
+    def categorical_levels(self):
+        """Accepted values of each categorical feature"""
+        return self._current.categorical_levels if self._current is not None else {}
+    
+    def model_info(self):
+        """Path, version and load time of the serving model"""
+        state = self._current
+        if state is None:
+            return None
+        return {
+            'path': state.path,
+            'version': state.version,
+            'loaded_at': datetime.fromtimestamp(state.loaded_at).isoformat(timespec='seconds'),
+            'reloads': self.reloads
+        }
+    
+    def _compile(self, model):
+        """Compile the forest for the numpy backend (falls back to sklearn)"""
+        try:
+            return CompiledForest.from_pipeline(model)
+        except Exception as e:
+            print(f"⚠️  Numpy backend unavailable, using sklearn: {str(e)}")
+            return None
+    
+    def _build_binner(self, model, engine):
+        """Split-interval cache keys (falls back to exact feature tuples)"""
+        try:
+            if engine is not None:
+                return SplitBinner.from_forest(engine)
+            return SplitBinner.from_pipeline(model)
+        except Exception as e:
+            print(f"⚠️  Cache binning unavailable, using exact keys: {str(e)}")
+            return None
+    
+    def warm_up(self, rows=64):
+        """Run single-row and batch predictions once so the first request is not slow"""
+        state = self._current
+        if state is None:
+            return False
+        
+        try:
+            self._warm_up(state, rows)
+            self.ready = True
+            return True
+        except Exception as e:
+            print(f"❌ Error warming up model: {str(e)}")
+            return False
+    
+    def _warm_up(self, state, rows):
+        """Score probe records on a given model, bypassing the cache"""
+        probes = state.encoder.probe_records()
+        records = [probes[i % len(probes)] for i in range(max(rows, 1))]
+        self._score_records(state, records[:1])
+        self._score_records(state, records)
+    
+    @property
+    def feature_names(self):
+        """Raw input features in model column order"""
+        return self._current.feature_names
+    
+    def _use_engine(self, state, n_rows):
+        """Compiled forest wins on small batches; sklearn's Cython traversal on large ones"""
+        if state.engine is None:
+            return False
+        return state.model is None or n_rows <= self.numpy_max_rows
+    
+    @property
+    def active_backend(self):
+        """Backend actually used for inference"""
+        return 'numpy' if self.engine is not None else 'sklearn'
+    
+    def _state(self):
+        """The serving model (read once per prediction)"""
+        state = self._current
+        if state is None:
+            raise ValueError("Model not loaded")
+        return state
+    
+    def _score(self, state, data_frame, threads=None):
+        """Labels and probabilities from a single model pass"""
+        if self._use_engine(state, len(data_frame)):
+            with metrics.stage('encoding'):
+                X = state.engine.transform(data_frame)
+            with metrics.stage('inference'):
+                return state.engine.predict_matrix(X)
+        
+        classifier = state.classifier(self.thread_budget.for_rows(len(data_frame), threads))
+        with metrics.stage('encoding'):
+            X = state.model.named_steps['preprocessor'].transform(data_frame)
+        with metrics.stage('inference'):
+            probabilities = classifier.predict_proba(X)
+        return state.model.classes_.take(probabilities.argmax(axis=1)), probabilities
+    
+    def _score_records(self, state, records):
+        """Labels and probabilities for feature dicts (pandas-free on the numpy backend)"""
+        if self._use_engine(state, len(records)):
+            with metrics.stage('encoding'):
+                X = state.engine.encoder.encode_many(records)
+            with metrics.stage('inference'):
+                return state.engine.predict_matrix(X)
+        return self._score(state, pd.DataFrame.from_records(records, columns=state.feature_names))
+    
     def predict(self, data_frame):
         """Make prediction using the loaded model"""
-        if not self.loaded or self.model is None:
-            raise ValueError("Model not loaded")
+        return self.predict_batch(data_frame)[0]
+    
+    def predict_batch(self, data_frame, threads=None):
+        """Make predictions for many rows with a single model pass
+        
+        ``threads`` overrides the thread budget for this call (sklearn path).
+        """
+        return self._format(*self._score(self._state(), data_frame, threads))
+    
+    def predict_probabilities(self, data_frame, threads=None):
+        """Class probability matrix (n_rows, 2) for many rows, without per-row dicts"""
+        return self._score(self._state(), data_frame, threads)[1]
+    
+    def explain_batch(self, data_frame, threads=None):
+        """Predictions with per-feature contributions to P(yes), from one forest traversal
         
-        prediction = self.model.predict(data_frame)[0]
-        probabilities = self.model.predict_proba(data_frame)[0]
+        Large batches let sklearn's Cython ``apply`` find the leaves; the
+        compiled forest turns them into probabilities and contributions.
+        """
+        state = self._state()
+        if state.model is None or self._use_engine(state, len(data_frame)):
+            with metrics.stage('encoding'):
+                X = state.explainer.transform(data_frame)
+            return self._explain(state, X)
         
-        return {
-            'prediction': int(prediction),
-            'probabilities': {
-                'no': float(probabilities[0]),
-                'yes': float(probabilities[1])
+        classifier = state.classifier(self.thread_budget.for_rows(len(data_frame), threads))
+        with metrics.stage('encoding'):
+            X = state.model.named_steps['preprocessor'].transform(data_frame)
+        with metrics.stage('inference'):
+            leaves = classifier.apply(X) + state.explainer.roots
+        return self._explain(state, X, leaves)
+    
+    def explain_records(self, records):
+        """Predictions with per-feature contributions for feature dicts (never cached)"""
+        state = self._state()
+        if state.model is None or self._use_engine(state, len(records)):
+            with metrics.stage('encoding'):
+                X = state.explainer.encoder.encode_many(records)
+            return self._explain(state, X)
+        return self.explain_batch(pd.DataFrame.from_records(records, columns=state.feature_names))
+    
+    def _explain(self, state, X, leaves=None):
+        """Result dicts plus 'explanation': the forest's base rate of 'yes' and
+        one decision-path contribution per raw feature, adding up to the
+        row's 'yes' probability"""
+        with metrics.stage('explanation'):
+            predictions, probabilities, base_value, contributions = \
+                state.explainer.explain_matrix(X, leaves)
+        results = self._format(predictions, probabilities)
+        features = state.feature_names
+        for result, row in zip(results, contributions):
+            result['explanation'] = {'base_value': base_value, 'contributions': dict(zip(features, row.tolist()))}
+        return results
+    
+    def predict_grid(self, base, axes):
+        """P(yes) over every combination of ``axes`` ([(feature, values)]) applied to ``base``
+        
+        Values that fall in the same split interval of every tree (or are
+        the same category) take identical paths, so each axis is reduced to
+        one representative per interval and only the grid of representatives
+        is scored, in one model call. Returns (array shaped like the axes,
+        number of points actually scored).
+        """
+        state = self._state()
+        splits = state.splits
+        representatives, inverses = [], []
+        for feature, values in axes:
+            index, kept, inverse = {}, [], []
+            for value in values:
+                key = value if feature in splits.categorical else splits.interval(feature, value)
+                if key not in index:
+                    index[key] = len(kept)
+                    kept.append(value)
+                inverse.append(index[key])
+            representatives.append(kept)
+            inverses.append(inverse)
+        
+        features = [feature for feature, _ in axes]
+        records = [{**base, **dict(zip(features, point))} for point in itertools.product(*representatives)]
+        probabilities = self._score_records(state, records)[1][:, 1]
+        grid = probabilities.reshape([len(kept) for kept in representatives])
+        return grid[np.ix_(*inverses)], len(records)
+    
+    def predict_records(self, records):
+        """Make predictions from feature dicts, served from the cache when possible"""
+        state = self._state()
+        
+        if self.cache is None:
+            return self._format(*self._score_records(state, records))
+        
+        keys = [self._cache_key(state, record) for record in records]
+        
+        # Single record: concurrent identical requests share one computation
+        if len(records) == 1 and keys[0] is not None:
+            return [self.cache.get_or_compute(keys[0], lambda: self._format(*self._score_records(state, records))[0])]
+        
+        results = [self.cache.get(key) if key is not None else None for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = self._format(*self._score_records(state, [records[i] for i in missing]))
+            for i, result in zip(missing, computed):
+                results[i] = result
+                if keys[i] is not None:
+                    self.cache.put(keys[i], result)
+        return results
+    
+    def _cache_key(self, state, record):
+        """Model version plus canonical feature tuple (None if not cacheable)
+        
+        The version keeps a request that started on the old model from
+        filling the cache with its result after a swap.
+        """
+        if state.binner is not None:
+            key = state.binner.key(record)
+            return None if key is None else (state.version, key)
+        
+        key = [state.version]
+        for feature in state.feature_names:
+            value = record.get(feature)
+            if isinstance(value, str):
+                key.append(value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                key.append(float(value))
+            else:
+                return None
+        return tuple(key)
+    
+    def cache_stats(self):
+        """Prediction cache counters (None when caching is disabled)"""
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+    
+    def _format(self, predictions, probabilities):
+        """Convert model output arrays into result dicts"""
+        return [
+            {
+                'prediction': int(prediction),
+                'probabilities': {
+                    'no': float(proba[0]),
+                    'yes': float(proba[1])
+                }
             }
-        }
+            for prediction, proba in zip(predictions, probabilities)
+        ]
+
+
+class _Variant:
+    """A registered model variant and its usage state"""
+    
+    def __init__(self, name, manager, features, pinned):
+        self.name = name
+        self.manager = manager
+        self.features = features
+        self.pinned = pinned
+        self.users = 0
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Model variants (full / reduced / minimal) loaded lazily under a memory budget
+    
+    Each variant keeps a ``ModelManager`` that is loaded on first use. When
+    the loaded forests exceed ``memory_budget_mb`` the least recently used
+    variants are unloaded; pinned variants (the default model) and variants
+    serving a request right now are never evicted.
+    """
+    
+    # Artifact names written by model/model.py
+    ARTIFACT_PATTERN = 'attrition_pipeline_{name}{extension}'
+    
+    def __init__(self, memory_budget_mb=256):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._variants = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+    
+    def register(self, name, manager, features, pinned=False):
+        """Add a variant (an already loaded manager is kept as is)"""
+        with self._lock:
+            self._variants[name] = _Variant(name, manager, list(features), pinned)
+    
+    def discover(self, feature_sets, model_dir, manager_factory, extensions=('.pkl',)):
+        """Register every variant in ``feature_sets`` (hasil.json) with an artifact in ``model_dir``"""
+        for name, features in feature_sets.items():
+            if name in self._variants:
+                continue
+            for extension in extensions:
+                path = os.path.join(model_dir, self.ARTIFACT_PATTERN.format(name=name, extension=extension))
+                if os.path.exists(path):
+                    self.register(name, manager_factory(path), features)
+                    break
+    
+    @property
+    def names(self):
+        """Registered variant names"""
+        return list(self._variants)
+    
+    def __contains__(self, name):
+        return name in self._variants
+    
+    def manager(self, name):
+        """Model manager of a variant (may not be loaded)"""
+        return self._variants[name].manager
+    
+    def features(self, name):
+        """Raw input features of a variant"""
+        return self._variants[name].features
+    
+    @contextmanager
+    def use(self, name):
+        """Loaded manager of a variant, protected from eviction while in use"""
+        variant = self._variants[name]
+        with self._lock:
+            variant.users += 1
+            self._variants.move_to_end(name)
+        
+        try:
+            if not variant.manager.loaded:
+                with variant.load_lock:
+                    if not variant.manager.loaded:
+                        if not variant.manager.load_model():
+                            raise RuntimeError(f"Model variant '{name}' failed to load")
+                        print(f"✅ Model variant loaded: {name} ({variant.manager.memory_bytes / 1024 / 1024:.1f} MB)")
+                        with self._lock:
+                            self.loads += 1
+            yield variant.manager
+        finally:
+            with self._lock:
+                variant.users -= 1
+            # Variants skipped while busy are evicted once released
+            self._evict()
+    
+    def memory_bytes(self):
+        """Bytes held by all loaded variants"""
+        return sum(v.manager.memory_bytes for v in self._variants.values() if v.manager.loaded)
+    
+    def _evict(self):
+        """Unload least recently used idle variants until within budget"""
+        with self._lock:
+            total = self.memory_bytes()
+            for variant in list(self._variants.values()):
+                if total <= self.memory_budget:
+                    break
+                if variant.pinned or variant.users or not variant.manager.loaded:
+                    continue
+                total -= variant.manager.memory_bytes
+                variant.manager.unload()
+                self.evictions += 1
+                print(f"♻️  Model variant evicted: {variant.name}")
+    
+    def stats(self):
+        """Loaded variants and memory usage"""
+        with self._lock:
+            return {
+                'memory_budget_mb': round(self.memory_budget / 1024 / 1024, 1),
+                'memory_used_mb': round(self.memory_bytes() / 1024 / 1024, 1),
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'variants': {
+                    variant.name: {
+                        'features': len(variant.features),
+                        'loaded': variant.manager.loaded,
+                        'pinned': variant.pinned,
+                        'memory_mb': round(variant.manager.memory_bytes / 1024 / 1024, 1)
+                    }
+                    for variant in self._variants.values()
+                }
+            }
+
+
+class RenderedJSON:
+    """A JSON document serialized once, with pre-compressed variants and a strong ETag"""
+    
+    # Bodies smaller than this are not worth compressing
+    MIN_COMPRESS_SIZE = 256
+    
+    def __init__(self, data):
+        # Same encoding as Flask's jsonify (sorted keys, ASCII), minus whitespace
+        body = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {'identity': body}
+        
+        if len(body) >= self.MIN_COMPRESS_SIZE:
+            self.bodies['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(body, quality=11)
+    
+    def etag_for(self, encoding):
+        """Strong ETag of one representation (differs per Content-Encoding)"""
+        if encoding == 'identity':
+            return self.etag
+        return f'{self.etag}-{encoding}'
+    
+    @property
+    def etags(self):
+        """ETags of every representation, for If-None-Match"""
+        return {self.etag_for(encoding) for encoding in self.bodies}
 
 
 class ResultsManager:
-    """Manages training results from hasil.json"""
+    """Manages training results from hasil.json
+    
+    Every results document is serialized and compressed once at load time
+    (``get_rendered``); ``?fields=`` projections are rendered on first use
+    and kept in a small LRU.
+    """
+    
+    DOCUMENTS = ['all', 'summary', 'full', 'reduced', 'minimal']
+    MAX_PROJECTIONS = 64
     
     def __init__(self, results_path):
         self.results_path = results_path
         self.results = None
+        self.summary = None
         self.loaded = False
+        self._rendered = {}
+        self._projections = OrderedDict()
+        self._lock = threading.Lock()
     
     def load_results(self):
         """Load results from JSON file"""
         try:
             with open(self.results_path, 'r', encoding='utf-8') as f:
                 self.results = json.load(f)
+            self.summary = self._build_summary()
+            self._rendered = {
+                'all': RenderedJSON(self.results),
+                'summary': RenderedJSON(self.summary),
+                **{
+                    model_type: RenderedJSON(self.results['models'][model_type])
+                    for model_type in ['full', 'reduced', 'minimal']
+                }
+            }
+            with self._lock:
+                self._projections.clear()
             self.loaded = True
             return True
         except Exception as e:
             print(f"❌ Error loading results: {str(e)}")
             return False
     
+    def get_rendered(self, document, fields=None):
+        """Pre-rendered document, optionally projected to dotted ``fields``
+        
+        Raises KeyError naming the first field that does not exist.
+        """
+        if not self.loaded:
+            return None
+        if not fields:
+            return self._rendered[document]
+        
+        key = (document, tuple(fields))
+        with self._lock:
+            rendered = self._projections.get(key)
+            if rendered is not None:
+                self._projections.move_to_end(key)
+                return rendered
+        
+        rendered = RenderedJSON(self._project(self._document(document), fields))
+        with self._lock:
+            self._projections[key] = rendered
+            while len(self._projections) > self.MAX_PROJECTIONS:
+                self._projections.popitem(last=False)
+        return rendered
+    
+    def _document(self, document):
+        """Source data of a results document"""
+        if document == 'all':
+            return self.results
+        if document == 'summary':
+            return self.summary
+        return self.results['models'][document]
+    
+    @staticmethod
+    def _project(data, fields):
+        """Keep only the dotted paths in ``fields`` (e.g. ``models_summary.minimal.features``)"""
+        projected = {}
+        for field in fields:
+            source, target = data, projected
+            parts = field.split('.')
+            for depth, part in enumerate(parts):
+                if not isinstance(source, dict) or part not in source:
+                    raise KeyError(field)
+                source = source[part]
+                if depth == len(parts) - 1:
+                    target[part] = source
+                else:
+                    target = target.setdefault(part, {})
+        return projected
+    
     def get_all_results(self):
         """Get complete results"""
         if not self.loaded:
@@ -72,7 +761,10 @@ class ResultsManager:
         """Get summary of all models"""
         if not self.loaded:
             return None
-        
+        return self.summary
+    
+    def _build_summary(self):
+        """Summary of all models (built once per load)"""
         return {
             'training_date': self.results['dataset_info'].get('training_date', 'N/A'),
             'dataset_info': self.results['dataset_info'],
@@ -114,43 +806,125 @@ class ResultsManager:
         return self.results['dataset_info']
     
     def get_model_accuracy(self, model_type='minimal'):
-        """Get accuracy for specific model"""
+        """Get accuracy for specific model (None if unknown)"""
         if not self.loaded:
             return None
-        return self.results['models'][model_type]['test_accuracy']
+        return self.results['models'].get(model_type, {}).get('test_accuracy')
+
+
+class VisualAsset:
+    """One indexed image: where it is listed and which content blob it uses"""
+    
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    
+    def __init__(self, category, filename, digest, size, modified, width=None, height=None):
+        self.category = category
+        self.filename = filename
+        self.digest = digest
+        self.size = size
+        self.modified = modified
+        self.width = width
+        self.height = height
+    
+    @classmethod
+    def dimensions(cls, data):
+        """(width, height) from a PNG header, (None, None) for other formats"""
+        if data[:8] != cls.PNG_SIGNATURE or len(data) < 24:
+            return None, None
+        return struct.unpack('>II', data[16:24])
+    
+    @property
+    def hashed_name(self):
+        """Fingerprinted file name, e.g. ``confusion_matrix.3f2a9c1d4e5b6a70.png``"""
+        stem, extension = os.path.splitext(self.filename)
+        return f'{stem}.{self.digest}{extension}'
 
 
 class VisualizationManager:
-    """Manages visualization files"""
+    """Manages visualization files
+    
+    ``build_index()`` reads every image once at startup. Contents are kept
+    in memory keyed by SHA-256, so identical files (the same chart under
+    two names or categories) are stored once, and each asset is also
+    reachable under a content-hashed name that never changes meaning.
+    """
+    
+    DIGEST_LENGTH = 16
+    EXTENSIONS = ('.png',)
     
     def __init__(self, img_base_path):
         self.img_base_path = img_base_path
         self.categories = ['comparison', 'full', 'reduced', 'minimal']
+        self._assets = {}
+        self._blobs = {}
+        self._by_digest = {}
+        self._listing = {category: [] for category in self.categories}
     
-    def list_all(self):
-        """List all available visualizations"""
-        visualizations = {category: [] for category in self.categories}
+    def build_index(self):
+        """Read and hash all visualizations under ``img_base_path``"""
+        assets, blobs, by_digest = {}, {}, {}
+        listing = {category: [] for category in self.categories}
         
         for category in self.categories:
             category_path = os.path.join(self.img_base_path, category)
-            if os.path.exists(category_path):
-                files = [f for f in os.listdir(category_path) if f.endswith('.png')]
-                visualizations[category] = files
+            if not os.path.isdir(category_path):
+                continue
+            for filename in sorted(os.listdir(category_path)):
+                if not filename.endswith(self.EXTENSIONS):
+                    continue
+                path = os.path.join(category_path, filename)
+                with open(path, 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()[:self.DIGEST_LENGTH]
+                blobs.setdefault(digest, data)
+                asset = VisualAsset(category, filename, digest, len(data),
+                                    datetime.fromtimestamp(os.path.getmtime(path)),
+                                    *VisualAsset.dimensions(data))
+                assets[(category, filename)] = asset
+                by_digest.setdefault(digest, asset)
+                listing[category].append(filename)
         
-        return visualizations
+        self._assets, self._blobs, self._by_digest, self._listing = assets, blobs, by_digest, listing
+        print(f"✅ Visualizations indexed: {len(assets)} files, {len(blobs)} unique "
+              f"({sum(len(blob) for blob in blobs.values()) / 1024:.0f} KB)")
+        return len(assets)
     
-    def get_image_path(self, category, filename):
-        """Get full path to visualization image"""
-        if category not in self.categories:
-            return None
-        
-        img_path = os.path.join(self.img_base_path, category, filename)
-        
-        if not os.path.exists(img_path):
+    def list_all(self):
+        """List all available visualizations"""
+        return {category: list(files) for category, files in self._listing.items()}
+    
+    def hashed_names(self):
+        """Content-hashed name of every visualization, per category"""
+        names = {category: {} for category in self.categories}
+        for (category, filename), asset in self._assets.items():
+            names[category][filename] = asset.hashed_name
+        return names
+    
+    def get_asset(self, category, filename):
+        """Indexed asset by category and file name (None if unknown)"""
+        return self._assets.get((category, filename))
+    
+    def get_hashed_asset(self, hashed_name):
+        """Indexed asset by content-hashed name (None if unknown or stale)"""
+        stem, extension = os.path.splitext(hashed_name)
+        digest = stem.rsplit('.', 1)[-1]
+        asset = self._by_digest.get(digest)
+        if asset is None or extension != os.path.splitext(asset.filename)[1]:
             return None
-        
-        return img_path
+        return asset
+    
+    def read(self, asset):
+        """Bytes of an indexed asset"""
+        return self._blobs[asset.digest]
     
     def validate_category(self, category):
         """Validate category name"""
         return category in self.categories
+    
+    def stats(self):
+        """Index size and memory used by the stored contents"""
+        return {
+            'files': len(self._assets),
+            'unique_files': len(self._blobs),
+            'bytes': sum(len(blob) for blob in self._blobs.values())
+        }
@@ -0,0 +1,223 @@
+"""
+Profiling Layer - On-demand sampling profiler for live workers
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread in this process
+
+    A background thread snapshots ``sys._current_frames()`` every
+    ``interval_ms`` for ``seconds``; requests keep being served meanwhile,
+    and the cost is one stack walk per thread per sample. Time spent in C
+    (numpy, sklearn's Cython trees) is attributed to the Python function
+    that called it. Idle threads (waiting on sockets, queues or locks) are
+    dropped unless ``include_idle`` is set.
+
+    Results are written as JSON to ``output_dir`` so any worker can serve
+    them: with gunicorn ``sync`` workers the worker that samples is not
+    necessarily the one answering the follow-up request.
+    """
+
+    # Inclusive time buckets: a sample counts for every category on its stack
+    CATEGORIES = {
+        'flask': ('/flask/', '/werkzeug/'),
+        'pandas': ('/pandas/',),
+        'column_transformer': ('/sklearn/compose/',),
+        'forest_predict_proba': ('/sklearn/ensemble/_forest.py', '/sklearn/tree/'),
+        'json': ('/json/',)
+    }
+    # Compiled-forest functions (numpy backend) counted with the sklearn forest
+    ENGINE_FUNCTIONS = {
+        'forest_predict_proba': {'predict_proba_matrix', 'apply', 'predict_matrix'},
+        'feature_encoding': {'encode_many', 'encode_frame', 'encode_into', 'encode'}
+    }
+
+    # Leaf frames that mean the thread is waiting rather than working
+    IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'socket.py', 'ssl.py')
+    IDLE_PATHS = ('gunicorn/workers/', 'gunicorn/arbiter.py')
+    IDLE_FUNCTIONS = {('reloader.py', '_watch'), ('batching.py', '_collect')}
+
+    PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+    # Finished profiles kept on disk
+    KEEP_RESULTS = 20
+
+    def __init__(self, output_dir, max_seconds=30):
+        self.output_dir = output_dir
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._labels = {}
+
+    @property
+    def running(self):
+        """Whether a profile is being sampled in this process"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds, interval_ms=10.0, include_idle=False, exclude_thread=None):
+        """Start sampling in the background; returns the profile id (None if busy)"""
+        seconds, interval_ms = float(seconds), float(interval_ms)
+        # min/max pass NaN through unchanged
+        if not (math.isfinite(seconds) and math.isfinite(interval_ms)):
+            raise ValueError('seconds and interval_ms must be finite')
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        interval = min(max(interval_ms, 1.0), 1000.0) / 1000
+        with self._lock:
+            if self.running:
+                return None
+            profile_id = uuid.uuid4().hex
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(profile_id, seconds, interval, include_idle, exclude_thread),
+                name='sampling-profiler',
+                daemon=True
+            )
+            self._thread.start()
+        return profile_id
+
+    def wait(self):
+        """Block until the running profile has been written"""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self, profile_id, seconds, interval, include_idle, exclude_thread):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = idle = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_tick = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident == exclude_thread:
+                    continue
+                stack = self._stack(frame)
+                if not include_idle and self._is_idle(stack[-1]):
+                    idle += 1
+                    continue
+                stacks[stack] += 1
+                samples += 1
+            next_tick += interval
+            time.sleep(max(next_tick - time.perf_counter(), 0))
+
+        result = self._summarize(stacks, samples, idle, time.perf_counter() - started, interval)
+        result['id'] = profile_id
+        result['pid'] = os.getpid()
+        self._write(profile_id, result)
+
+    def _label(self, code):
+        """'path/to/file.py:function' for a code object (cached)"""
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename.replace('\\', '/')
+            if 'site-packages/' in filename:
+                filename = filename.split('site-packages/', 1)[1]
+            elif filename.startswith(os.path.dirname(os.path.abspath(__file__)).replace('\\', '/')):
+                filename = os.path.basename(filename)
+            else:
+                filename = '/'.join(filename.rsplit('/', 2)[-2:])
+            label = f"{filename}:{code.co_name}".replace(';', ',').replace(' ', '_')
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame):
+        """Frame labels from the outermost call to the innermost"""
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def _is_idle(self, leaf):
+        filename, function = leaf.rsplit(':', 1)
+        basename = filename.rsplit('/', 1)[-1]
+        return (basename in self.IDLE_FILES
+                or any(path in filename for path in self.IDLE_PATHS)
+                or (basename, function) in self.IDLE_FUNCTIONS)
+
+    def _categories(self, stack):
+        """Categories present anywhere on a stack"""
+        found = set()
+        for label in stack:
+            filename, function = label.rsplit(':', 1)
+            path = '/' + filename
+            for category, markers in self.CATEGORIES.items():
+                if any(marker in path for marker in markers):
+                    found.add(category)
+            if filename == 'inference.py':
+                for category, functions in self.ENGINE_FUNCTIONS.items():
+                    if function in functions:
+                        found.add(category)
+        return found
+
+    def _summarize(self, stacks, samples, idle, elapsed, interval):
+        """Collapsed stacks plus inclusive time per category"""
+        breakdown = Counter()
+        for stack, count in stacks.items():
+            for category in self._categories(stack):
+                breakdown[category] += count
+
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(elapsed, 3),
+            'interval_ms': interval * 1000,
+            'samples': samples,
+            'idle_samples': idle,
+            'breakdown': {
+                category: {
+                    'samples': breakdown[category],
+                    'percent': round(breakdown[category] / samples * 100, 2) if samples else 0.0
+                }
+                for category in dict.fromkeys([*self.CATEGORIES, *self.ENGINE_FUNCTIONS])
+            },
+            # Brendan Gregg's folded format: flamegraph.pl, speedscope, inferno
+            'collapsed': '\n'.join(
+                f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()
+            )
+        }
+
+    def _path(self, profile_id):
+        return os.path.join(self.output_dir, f'{profile_id}.json')
+
+    def _write(self, profile_id, result):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp = self._path(profile_id) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp, self._path(profile_id))
+
+        results = sorted(
+            (entry for entry in os.scandir(self.output_dir) if entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in results[:-self.KEEP_RESULTS]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def result(self, profile_id):
+        """A finished profile, or None if unknown / still running"""
+        if not self.PROFILE_ID.match(profile_id or ''):
+            return None
+        try:
+            with open(self._path(profile_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
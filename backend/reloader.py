@@ -0,0 +1,244 @@
+"""
+Reload Layer - Zero-downtime model hot reload
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class ModelReloader:
+    """Reloads a ModelManager in the background when its artifact changes
+
+    A watcher thread polls the model file every ``watch_interval`` seconds
+    (0 disables it) and reloads once the file has stayed unchanged for one
+    interval, so a copy in progress is never picked up. ``request_reload()``
+    triggers the same reload on demand. Only one reload runs at a time; a
+    model that fails golden-set validation is not retried until the file
+    changes again. The thread is started lazily so it survives gunicorn's
+    preload-and-fork.
+
+    Each process holds its own model, so every reload outcome is also
+    written to ``generation_path``. The same thread polls that file every
+    ``generation_interval`` seconds and repeats a reload published by another
+    worker (or adopts its rejection), and ``catch_up()`` brings a freshly
+    forked worker up to date with ``MODEL_PATH``.
+    """
+
+    def __init__(self, model_manager, golden_set=None, min_auc=0.0, watch_interval=0,
+                 warmup_rows=64, generation_path=None, generation_interval=1.0):
+        self.model_manager = model_manager
+        self.golden_set = golden_set
+        self.min_auc = min_auc
+        self.watch_interval = watch_interval
+        self.warmup_rows = warmup_rows
+        self.generation_path = generation_path
+        self.generation_interval = generation_interval if generation_path else 0
+        self._lock = threading.Lock()
+        self._reloading = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._signature = self._stat()
+        self._pending = None
+        # Generation file already seen; only later writes are followed
+        self._generation = self._stat_generation()
+        self.attempts = 0
+        self.failures = 0
+        self.followed = 0
+        self.last_error = None
+        self.last_attempt = None
+
+    @staticmethod
+    def load_golden_set(path):
+        """Golden records and labels written by model/model.py (None if absent)"""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            golden_set = json.load(f)
+        if not golden_set.get('records'):
+            return None
+        return golden_set
+
+    def _stat(self):
+        """Change signature of the model file (None if missing)"""
+        try:
+            stat = os.stat(self.model_manager.model_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _stat_generation(self):
+        """Change signature of the generation file (None if missing or disabled)"""
+        if not self.generation_path:
+            return None
+        try:
+            stat = os.stat(self.generation_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_generation(self):
+        """Last reload outcome published by any worker (None if unreadable)"""
+        try:
+            with open(self.generation_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            signature = record.get('signature')
+            return (tuple(signature) if signature else None), record.get('error'), record.get('forced', False)
+        except (OSError, ValueError):
+            return None
+
+    def _publish(self, signature, error, forced):
+        """Write a reload outcome for the other workers (atomic rename)"""
+        if not self.generation_path:
+            return
+        temp_path = f"{self.generation_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'signature': list(signature) if signature else None,
+                    'error': error,
+                    'forced': forced,
+                    'pid': os.getpid(),
+                    'published_at': datetime.now().isoformat(timespec='seconds')
+                }, f)
+            os.replace(temp_path, self.generation_path)
+        except OSError as e:
+            print(f"⚠️  Could not publish model generation to {self.generation_path}: {str(e)}")
+
+    def start(self):
+        """Start the watcher in this process (again after a fork)"""
+        if self.watch_interval <= 0 and self.generation_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._watch, name='model-reloader', daemon=True)
+                self._thread.start()
+
+    def catch_up(self):
+        """Reload now if MODEL_PATH changed since this process loaded it
+
+        Workers forked from a preloaded master (including ones recycled by
+        ``max_requests``) start with the master's model; a file that another
+        worker already rejected is not tried again.
+        """
+        # Older publications are covered by loading the current file
+        self._generation = self._stat_generation()
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        published = self._read_generation() if self.generation_path else None
+        if published is not None and published[0] == signature and published[1] is not None:
+            with self._lock:
+                self._signature = signature
+            return False
+        return self._reload(signature, publish=False)
+
+    def _watch(self):
+        intervals = [interval for interval in (self.watch_interval, self.generation_interval) if interval > 0]
+        tick = min(intervals)
+        next_watch = time.monotonic() + self.watch_interval
+        while True:
+            time.sleep(tick)
+            if self.generation_interval > 0:
+                self._follow()
+            if self.watch_interval > 0 and time.monotonic() >= next_watch:
+                next_watch = time.monotonic() + self.watch_interval
+                self._check_file()
+
+    def _check_file(self):
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return
+        # Wait until the file stops changing (deploy copy finished)
+        if signature != self._pending:
+            self._pending = signature
+            return
+        self._pending = None
+        self._reload(signature)
+
+    def _follow(self):
+        """Repeat (or adopt the rejection of) a reload published by another worker"""
+        generation = self._stat_generation()
+        if generation is None or generation == self._generation:
+            return
+        self._generation = generation
+        published = self._read_generation()
+        if published is None:
+            return
+        signature, error, forced = published
+        # Unchanged file: already serving it, unless an admin asked for a reload
+        if signature is None or (signature == self._signature and not (forced and error is None)):
+            return
+        if error is not None:
+            with self._lock:
+                self._signature = signature
+            return
+        if self._reload(self._stat(), publish=False):
+            with self._lock:
+                self.followed += 1
+
+    def request_reload(self, wait=False):
+        """Reload now; in the background unless ``wait`` (False if one is already running)"""
+        if self._reloading.locked():
+            return False
+        signature = self._stat()
+        if wait:
+            return self._reload(signature, forced=True)
+        threading.Thread(target=self._reload, args=(signature,), kwargs={'forced': True},
+                         name='model-reload', daemon=True).start()
+        return True
+
+    def _reload(self, signature, publish=True, forced=False):
+        """Load, validate and swap in the model file; returns success
+
+        ``publish`` writes the outcome to the generation file so the other
+        workers follow; reloads that themselves follow one do not. A
+        ``forced`` (requested) reload is repeated even if the file is unchanged.
+        """
+        if not self._reloading.acquire(blocking=False):
+            return False
+        try:
+            started = time.monotonic()
+            error = self.model_manager.reload(self.golden_set, self.min_auc, self.warmup_rows)
+            with self._lock:
+                self.attempts += 1
+                self.last_attempt = datetime.now().isoformat(timespec='seconds')
+                self.last_error = error
+                # Remember the file either way: a rejected model is not retried until it changes
+                self._signature = signature
+                if error is not None:
+                    self.failures += 1
+            if publish:
+                self._publish(signature, error, forced)
+                # Our own write is not a generation to follow
+                self._generation = self._stat_generation()
+            if error is None:
+                print(f"🔄 Model reloaded in {time.monotonic() - started:.2f}s (pid {os.getpid()}): "
+                      f"{self.model_manager.model_path}")
+            else:
+                print(f"⚠️  Model reload rejected, keeping current model: {error}")
+            return error is None
+        finally:
+            self._reloading.release()
+
+    def status(self):
+        """Reload counters and the serving model"""
+        with self._lock:
+            return {
+                'watching': self._thread is not None and self._pid == os.getpid() and self._thread.is_alive(),
+                'watch_interval_seconds': self.watch_interval,
+                'generation_interval_seconds': self.generation_interval,
+                'golden_records': len(self.golden_set['records']) if self.golden_set else 0,
+                'min_auc': self.min_auc,
+                'reloading': self._reloading.locked(),
+                'attempts': self.attempts,
+                'failures': self.failures,
+                'followed': self.followed,
+                'last_attempt': self.last_attempt,
+                'last_error': self.last_error,
+                'model': self.model_manager.model_info()
+            }
@@ -2,30 +2,93 @@
 Routes - API endpoint definitions
 """
 
-from flask import request
+from flask import Response, request
+
+import columnar
+import metrics
+from batching import MicroBatcher
 from controllers import (
+    AdminController,
+    JobController,
     PredictionController,
     ResultsController,
     VisualizationController,
     HealthController
 )
 from views import (
+    AdminView,
     HealthView,
     FeaturesView,
+    JobView,
     PredictionView,
     ResultsView,
     VisualizationView
 )
 
 
-def register_routes(app, model_manager, results_manager, viz_manager):
+def register_routes(app, model_manager, results_manager, viz_manager, model_registry=None,
+                    model_reloader=None, profiler=None, derivatives=None, schema=None,
+                    job_queue=None):
     """Register all API routes"""
     
+    # Opt-in micro-batching of concurrent single predictions
+    batcher = None
+    if app.config.get('MICRO_BATCHING'):
+        batcher = MicroBatcher(
+            metrics.with_route('/predict', model_manager.predict_records),
+            max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+            max_wait_ms=app.config['MICRO_BATCH_WAIT_MS'],
+            timeout_ms=app.config['MICRO_BATCH_TIMEOUT_MS']
+        )
+    
     # Initialize controllers
-    health_controller = HealthController(model_manager, results_manager)
-    prediction_controller = PredictionController(model_manager)
+    default_model = app.config.get('DEFAULT_MODEL_VARIANT', 'minimal')
+    default_features = None
+    if model_registry is not None and default_model in model_registry:
+        default_features = model_registry.features(default_model)
+    
+    health_controller = HealthController(model_manager, results_manager, batcher, model_registry,
+                                         model_reloader, default_model=default_model, job_queue=job_queue)
+    prediction_controller = PredictionController(
+        model_manager,
+        max_batch_size=app.config.get('MAX_BATCH_SIZE', 50000),
+        batcher=batcher,
+        csv_chunk_rows=app.config.get('CSV_CHUNK_ROWS', 5000),
+        features=default_features,
+        model_type=default_model,
+        schema=schema,
+        sweep_max_points=app.config.get('SWEEP_MAX_POINTS', 10000)
+    )
+    
+    # One controller per registered variant; models load on first request
+    variant_controllers = {}
+    if model_registry is not None:
+        for name in model_registry.names:
+            variant_controllers[name] = PredictionController(
+                model_registry.manager(name),
+                max_batch_size=app.config.get('MAX_BATCH_SIZE', 50000),
+                features=model_registry.features(name),
+                registry=model_registry,
+                model_type=name,
+                schema=schema,
+                sweep_max_points=app.config.get('SWEEP_MAX_POINTS', 10000)
+            )
+    
+    job_controller = None
+    if job_queue is not None:
+        job_controller = JobController(
+            job_queue,
+            model_registry=model_registry,
+            model_manager=model_manager,
+            default_model=default_model,
+            input_dir=app.config.get('JOB_INPUT_DIR', ''),
+            events_max_seconds=app.config.get('JOB_EVENTS_MAX_SECONDS', 55)
+        )
+    
     results_controller = ResultsController(results_manager)
-    viz_controller = VisualizationController(viz_manager)
+    results_max_age = app.config.get('RESULTS_CACHE_MAX_AGE', 300)
+    viz_controller = VisualizationController(viz_manager, derivatives)
+    admin_controller = AdminController(model_reloader, app.config.get('ADMIN_TOKEN', ''), profiler)
     
     # ========================================================================
     # HEALTH & INFO ROUTES
@@ -37,34 +100,212 @@ def register_routes(app, model_manager, results_manager, viz_manager):
         health_data = health_controller.get_health_status()
         return HealthView.render(health_data)
     
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness probe (model loaded and warmed up in this worker)"""
+        readiness_data = health_controller.get_readiness()
+        return HealthView.render_readiness(readiness_data)
+    
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Prometheus metrics (aggregated over all gunicorn workers)"""
+        body, content_type = metrics.render()
+        return Response(body, content_type=content_type)
+    
+    @app.route('/models', methods=['GET'])
+    def list_models():
+        """List model variants servable via /predict/<model_type>"""
+        models_data = health_controller.get_models()
+        return HealthView.render_models(models_data)
+    
     @app.route('/features', methods=['GET'])
     def get_features():
-        """Get required features"""
-        features_data = prediction_controller.get_required_features()
-        accuracy = results_manager.get_model_accuracy('minimal')
+        """Get required features (``?model=`` for another variant)"""
+        model_type = request.args.get('model')
+        controller = prediction_controller
+        if model_type and model_type != default_model:
+            controller = variant_controllers.get(model_type)
+            if controller is None:
+                return FeaturesView.render_error({
+                    'error': f'Unknown model type: {model_type}',
+                    'available': sorted(variant_controllers),
+                    'code': 404
+                })
+        
+        features_data = controller.get_required_features()
+        accuracy = results_manager.get_model_accuracy(features_data['model'])
         return FeaturesView.render(features_data, accuracy)
     
     # ========================================================================
-    # PREDICTION ROUTE
+    # PREDICTION ROUTES
     # ========================================================================
     
+    def get_model_info(model_type=None):
+        """Model info attached to prediction responses"""
+        controller = prediction_controller if model_type is None else variant_controllers[model_type]
+        accuracy = results_manager.get_model_accuracy(controller.model_type)
+        return {
+            'type': controller.model_type,
+            'features_used': len(controller.features),
+            'accuracy': f"{accuracy:.2f}%" if accuracy else 'N/A'
+        }
+    
+    def _explain_requested():
+        """``?explain=true``: per-feature contributions in prediction responses"""
+        return request.args.get('explain', 'false').lower() == 'true'
+    
     @app.route('/predict', methods=['POST'])
     def predict():
-        """Prediction endpoint"""
+        """Prediction endpoint (``?explain=true`` adds feature contributions)"""
         input_data = request.get_json()
-        result = prediction_controller.predict(input_data)
+        result = prediction_controller.predict(input_data, _explain_requested())
         
         if not result.get('valid'):
             return PredictionView.render_error(result)
         
-        # Get model info
-        model_info = {
-            'type': 'ultra_minimal',
-            'features_used': 7,
-            'accuracy': f"{results_manager.get_model_accuracy('minimal'):.2f}%"
-        }
+        with metrics.stage('serialization'):
+            return PredictionView.render_success(result, get_model_info())
+    
+    @app.route('/predict/batch', methods=['POST'])
+    def predict_batch():
+        """Batch prediction endpoint (one model call for all records)"""
+        # Binary column arrays (Arrow IPC, .npy, MessagePack) skip JSON entirely
+        codec = columnar.codec_for(request.content_type)
+        if codec is not None:
+            result = prediction_controller.predict_columnar(request.get_data(cache=False), codec,
+                                                            request.args.get('threads'))
+            if not result.get('valid'):
+                return PredictionView.render_error(result)
+            with metrics.stage('serialization'):
+                return PredictionView.render_columns(result, columnar.negotiate(request.accept_mimetypes, codec),
+                                                     get_model_info())
+        
+        input_data = request.get_json(silent=True)
+        result = prediction_controller.predict_batch(input_data, request.args.get('threads'),
+                                                     _explain_requested())
+        
+        if not result.get('valid'):
+            return PredictionView.render_error(result)
+        
+        with metrics.stage('serialization'):
+            return PredictionView.render_batch(result, get_model_info())
+    
+    @app.route('/predict/sweep', methods=['POST'])
+    def predict_sweep():
+        """What-if sweep: probability curve / surface over one or two features"""
+        result = prediction_controller.sweep(request.get_json(silent=True))
+        
+        if not result.get('valid'):
+            return PredictionView.render_error(result)
+        
+        with metrics.stage('serialization'):
+            return PredictionView.render_sweep(result, get_model_info())
+    
+    @app.route('/predict/csv', methods=['POST'])
+    def predict_csv():
+        """Streaming CSV scoring (multipart field 'file' or raw text/csv body)"""
+        upload = request.files.get('file')
+        stream = upload.stream if upload is not None else request.stream
+        
+        output_format = request.args.get('format')
+        if output_format is None:
+            output_format = 'csv' if 'text/csv' in request.headers.get('Accept', '') else 'ndjson'
+        
+        result = prediction_controller.predict_csv(stream, output_format, request.args.get('threads'))
+        if not result.get('valid'):
+            return PredictionView.render_error(result)
+        
+        return PredictionView.render_stream(result)
+    
+    @app.route('/predict/<model_type>', methods=['POST'])
+    def predict_variant(model_type):
+        """Prediction with a specific model variant (full, reduced, minimal)"""
+        controller = variant_controllers.get(model_type)
+        if controller is None:
+            return PredictionView.render_error({
+                'error': f'Unknown model type: {model_type}',
+                'available': list(variant_controllers),
+                'code': 404
+            })
         
-        return PredictionView.render_success(result, model_info)
+        input_data = request.get_json()
+        result = controller.predict(input_data, _explain_requested())
+        
+        if not result.get('valid'):
+            return PredictionView.render_error(result)
+        
+        with metrics.stage('serialization'):
+            return PredictionView.render_success(result, get_model_info(model_type))
+    
+    @app.route('/predict/<model_type>/sweep', methods=['POST'])
+    def predict_variant_sweep(model_type):
+        """What-if sweep with a specific model variant"""
+        controller = variant_controllers.get(model_type)
+        if controller is None:
+            return PredictionView.render_error({
+                'error': f'Unknown model type: {model_type}',
+                'available': list(variant_controllers),
+                'code': 404
+            })
+        
+        result = controller.sweep(request.get_json(silent=True))
+        
+        if not result.get('valid'):
+            return PredictionView.render_error(result)
+        
+        with metrics.stage('serialization'):
+            return PredictionView.render_sweep(result, get_model_info(model_type))
+    
+    # ========================================================================
+    # JOB ROUTES (asynchronous batch scoring)
+    # ========================================================================
+    
+    if job_controller is not None:
+        @app.route('/jobs', methods=['POST'])
+        def submit_job():
+            """Queue a scoring job: multipart 'file', text/csv body or JSON {"path": ...}
+            
+            Options (form fields, JSON keys or query args): model, format (csv|ndjson).
+            """
+            options = {**request.args.to_dict(), **request.form.to_dict()}
+            body = request.get_json(silent=True)
+            if isinstance(body, dict):
+                options.update(body)
+            
+            upload = request.files.get('file')
+            stream = upload.stream if upload is not None else None
+            if stream is None and request.mimetype == 'text/csv':
+                stream = request.stream
+            
+            result = job_controller.submit(stream, options.get('path'), options.get('model'),
+                                           options.get('format'))
+            if not result.get('valid'):
+                return JobView.render_error(result)
+            return JobView.render(result)
+        
+        @app.route('/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id):
+            """Job status and progress"""
+            result = job_controller.status(job_id)
+            if not result.get('valid'):
+                return JobView.render_error(result)
+            return JobView.render(result)
+        
+        @app.route('/jobs/<job_id>/events', methods=['GET'])
+        def job_events(job_id):
+            """Job progress as server-sent events"""
+            result = job_controller.events(job_id)
+            if not result.get('valid'):
+                return JobView.render_error(result)
+            return JobView.render_events(result)
+        
+        @app.route('/jobs/<job_id>/result', methods=['GET'])
+        def get_job_result(job_id):
+            """Download the result file of a succeeded job"""
+            result = job_controller.result(job_id)
+            if not result.get('valid'):
+                return JobView.render_error(result)
+            return JobView.render_result(result)
     
     # ========================================================================
     # RESULTS ROUTES
@@ -73,26 +314,26 @@ def register_routes(app, model_manager, results_manager, viz_manager):
     @app.route('/api/results', methods=['GET'])
     def get_results():
         """Get complete results"""
-        result = results_controller.get_all_results()
+        result = results_controller.get_all_results(request.args.get('fields'))
         if 'error' in result:
             return ResultsView.render_error(result)
-        return ResultsView.render_success(result['data'])
+        return ResultsView.render_rendered(result['rendered'], results_max_age)
     
     @app.route('/api/results/summary', methods=['GET'])
     def get_results_summary():
         """Get results summary"""
-        result = results_controller.get_summary()
+        result = results_controller.get_summary(request.args.get('fields'))
         if 'error' in result:
             return ResultsView.render_error(result)
-        return ResultsView.render_success(result['data'])
+        return ResultsView.render_rendered(result['rendered'], results_max_age)
     
     @app.route('/api/results/model/<model_type>', methods=['GET'])
     def get_model_results(model_type):
         """Get specific model results"""
-        result = results_controller.get_model_results(model_type)
+        result = results_controller.get_model_results(model_type, request.args.get('fields'))
         if 'error' in result:
             return ResultsView.render_error(result)
-        return ResultsView.render_success(result['data'])
+        return ResultsView.render_rendered(result['rendered'], results_max_age)
     
     # ========================================================================
     # VISUALIZATION ROUTES
@@ -109,7 +350,66 @@ def register_routes(app, model_manager, results_manager, viz_manager):
     @app.route('/api/visualizations/<category>/<filename>', methods=['GET'])
     def get_visualization(category, filename):
         """Get visualization image"""
-        result = viz_controller.get_image(category, filename)
+        result = viz_controller.get_image(category, filename, request.args.get('w'),
+                                          request.args.get('format'))
+        if 'error' in result:
+            return VisualizationView.render_error(result)
+        return VisualizationView.render_image(result)
+    
+    @app.route('/api/assets/<hashed_name>', methods=['GET'])
+    def get_asset(hashed_name):
+        """Get visualization image by content-hashed name (cacheable forever)"""
+        result = viz_controller.get_hashed_image(hashed_name, request.args.get('w'),
+                                                 request.args.get('format'))
         if 'error' in result:
             return VisualizationView.render_error(result)
-        return VisualizationView.render_image(result['path'])
+        return VisualizationView.render_image(result, immutable=True)
+    
+    # ========================================================================
+    # ADMIN ROUTES (require X-Admin-Token; disabled when ADMIN_TOKEN is unset)
+    # ========================================================================
+    
+    @app.route('/admin/reload', methods=['POST'])
+    def reload_model():
+        """Hot reload MODEL_PATH in every worker (?wait=true blocks until swapped here)"""
+        wait = request.args.get('wait', 'false').lower() == 'true'
+        result = admin_controller.reload_model(request.headers.get('X-Admin-Token'), wait)
+        if not result.get('valid'):
+            return AdminView.render_error(result)
+        return AdminView.render(result)
+    
+    @app.route('/admin/reload', methods=['GET'])
+    def reload_status():
+        """Hot reload status of the worker answering the request"""
+        result = admin_controller.get_reload_status(request.headers.get('X-Admin-Token'))
+        if not result.get('valid'):
+            return AdminView.render_error(result)
+        return AdminView.render(result)
+    
+    @app.route('/admin/profile', methods=['POST'])
+    def start_profile():
+        """Sample this worker's stacks (?seconds=5&interval_ms=10&idle=false&wait=false)"""
+        result = admin_controller.start_profile(
+            request.headers.get('X-Admin-Token'),
+            seconds=request.args.get('seconds', '5'),
+            interval_ms=request.args.get('interval_ms', '10'),
+            include_idle=request.args.get('idle', 'false').lower() == 'true',
+            wait=request.args.get('wait', 'false').lower() == 'true'
+        )
+        if not result.get('valid'):
+            return AdminView.render_error(result)
+        if 'profile' in result:
+            return AdminView.render_profile(result)
+        return AdminView.render(result)
+    
+    @app.route('/admin/profile/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        """Finished profile (?format=json|collapsed)"""
+        result = admin_controller.get_profile(
+            request.headers.get('X-Admin-Token'),
+            profile_id,
+            request.args.get('format', 'json')
+        )
+        if not result.get('valid'):
+            return AdminView.render_error(result)
+        return AdminView.render_profile(result)
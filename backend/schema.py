@@ -0,0 +1,245 @@
+"""
+Schema Layer - Compiled request schema: type coercion and value checks before model work
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class FieldRule:
+    """Accepted values of one feature
+
+    ``kind`` is 'category' (string levels), 'integer' or 'number'. Numeric
+    rules either list their ``levels`` (rating scales) or accept any value
+    within ``[low, high]`` (None = unbounded).
+    """
+
+    def __init__(self, name, kind, levels=None, low=None, high=None):
+        self.name = name
+        self.kind = kind
+        self.levels = list(levels) if levels is not None else None
+        self.low = low
+        self.high = high
+        if kind == 'category':
+            # Case/whitespace-insensitive lookup used to coerce near misses
+            self._canonical = {str(level).strip().casefold(): level for level in self.levels}
+            self._level_set = set(self.levels)
+            self.message = f"must be one of: {', '.join(map(str, self.levels))}"
+        elif self.levels is not None:
+            self._level_set = set(self.levels)
+            self.message = f"must be one of: {', '.join(map(str, self.levels))}"
+        else:
+            self.message = self._range_message()
+
+    def _range_message(self):
+        if self.low is not None and self.high is not None:
+            return f'must be between {self._format(self.low)} and {self._format(self.high)}'
+        if self.low is not None:
+            return f'must be at least {self._format(self.low)}'
+        if self.high is not None:
+            return f'must be at most {self._format(self.high)}'
+        return None
+
+    def _format(self, bound):
+        return int(bound) if self.kind == 'integer' or float(bound).is_integer() else round(bound, 4)
+
+    def coerce(self, value):
+        """Coerced value of a single input; returns (value, error message or None)"""
+        if self.kind == 'category':
+            if isinstance(value, str):
+                if value in self._level_set:
+                    return value, None
+                level = self._canonical.get(value.strip().casefold())
+                if level is not None:
+                    return level, None
+            return None, self.message
+
+        number = self._number(value)
+        if number is None:
+            return None, 'must be a number'
+        if self.levels is not None:
+            if number not in self._level_set:
+                return None, self.message
+        elif (self.low is not None and number < self.low) or (self.high is not None and number > self.high):
+            return None, self.message
+        if self.kind == 'integer' and number.is_integer():
+            return int(number), None
+        return number, None
+
+    @staticmethod
+    def _number(value):
+        """Finite float from a JSON number or numeric string (None otherwise)"""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, str):
+            value = value.strip()
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return number if math.isfinite(number) else None
+
+    def coerce_column(self, column):
+        """Vectorized ``coerce`` over a Series; returns (coerced Series, error messages or None per row)"""
+        if self.kind == 'category':
+            matched = column.isin(self.levels).to_numpy()
+            if matched.all():
+                return column, None
+            coerced = column.astype(object).copy()
+            for position in (~matched).nonzero()[0]:
+                coerced.iat[position] = self.coerce(column.iat[position])[0]
+            failed = coerced.isna().to_numpy()
+            return coerced, self._messages(failed, self.message)
+
+        if pd.api.types.is_bool_dtype(column):
+            return column, self._messages(np.ones(len(column), dtype=bool), 'must be a number')
+        if pd.api.types.is_numeric_dtype(column):
+            numbers = column.astype(np.float64)
+        elif column.dtype == object:
+            # Mixed JSON values: lists, dicts and booleans are not numbers even
+            # where pandas could convert them
+            values = column.map(
+                lambda value: value.strip() if isinstance(value, str)
+                else value if pd.api.types.is_scalar(value) and not isinstance(value, bool)
+                else None
+            )
+            numbers = pd.to_numeric(values, errors='coerce').astype(np.float64)
+        else:
+            # String columns (CSV uploads)
+            numbers = pd.to_numeric(column.str.strip(), errors='coerce').astype(np.float64)
+
+        array = numbers.to_numpy()
+        not_number = ~np.isfinite(array)
+        if self.levels is not None:
+            out_of_range = ~not_number & ~np.isin(array, self.levels)
+        else:
+            out_of_range = np.zeros(len(array), dtype=bool)
+            if self.low is not None:
+                out_of_range |= array < self.low
+            if self.high is not None:
+                out_of_range |= array > self.high
+            out_of_range &= ~not_number
+
+        errors = None
+        if not_number.any() or out_of_range.any():
+            errors = np.full(len(array), None, dtype=object)
+            errors[not_number] = 'must be a number'
+            errors[out_of_range] = self.message
+        return numbers, errors
+
+    @staticmethod
+    def _messages(failed, message):
+        """Per-row message array (None where the value passed)"""
+        if not failed.any():
+            return None
+        messages = np.full(len(failed), None, dtype=object)
+        messages[failed] = message
+        return messages
+
+    def describe(self):
+        """JSON-serializable rule (for /features)"""
+        description = {'type': self.kind}
+        if self.levels is not None:
+            description['levels'] = self.levels
+        if self.low is not None:
+            description['min'] = self._format(self.low)
+        if self.high is not None:
+            description['max'] = self._format(self.high)
+        return description
+
+
+class FeatureSchema:
+    """Request schema compiled from the training feature metadata
+
+    ``feature_schema.json`` (written by ``model/model.py``) records every
+    feature's dtype, categorical levels and the range observed in the
+    training CSV. Numeric features accept that range widened by
+    ``range_margin`` times its span on both sides (never below 0 when no
+    negative value was observed), so plausible values the data never saw
+    still score while typos such as ``Age: 350`` are rejected; a negative
+    margin disables range checks. Rating scales accept only their levels.
+
+    ``validate_record`` checks one feature dict with plain Python;
+    ``validate_frame`` checks whole columns of a batch at once. Both coerce
+    numeric strings to numbers and near-miss categories (``"yes"``,
+    ``" No "``) to their training spelling, and report every failing field.
+    """
+
+    def __init__(self, rules):
+        self.rules = {rule.name: rule for rule in rules}
+
+    @classmethod
+    def from_dict(cls, data, range_margin=1.0):
+        """Compile from the ``feature_schema.json`` structure"""
+        rules = []
+        for name, spec in data['features'].items():
+            kind = spec.get('type', 'number')
+            low, high = spec.get('min'), spec.get('max')
+            if kind != 'category' and 'levels' not in spec and low is not None and high is not None:
+                if range_margin < 0:
+                    low = high = None
+                else:
+                    slack = (high - low) * range_margin
+                    low, high = (low - slack if low < 0 else max(low - slack, 0)), high + slack
+            rules.append(FieldRule(name, kind, spec.get('levels'), low, high))
+        return cls(rules)
+
+    @classmethod
+    def from_levels(cls, categorical_levels, features):
+        """Fallback without metadata: model categories, unbounded numbers for the rest"""
+        return cls([
+            FieldRule(feature, 'category', categorical_levels[feature]) if feature in categorical_levels
+            else FieldRule(feature, 'number')
+            for feature in features
+        ])
+
+    @classmethod
+    def load(cls, path, range_margin=1.0):
+        """Load ``feature_schema.json``; None when the file is missing"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), range_margin)
+
+    def covers(self, features):
+        return all(feature in self.rules for feature in features)
+
+    def validate_record(self, record, features):
+        """Coerce one feature dict; returns (values, {feature: message})"""
+        values = {}
+        errors = {}
+        for feature in features:
+            value = record[feature]
+            rule = self.rules.get(feature)
+            if rule is None:
+                values[feature] = value
+                continue
+            coerced, error = rule.coerce(value)
+            if error is None:
+                values[feature] = coerced
+            else:
+                errors[feature] = error
+        return values, errors
+
+    def validate_frame(self, df, features):
+        """Coerce batch columns; returns (coerced DataFrame, {row position: {feature: message}})"""
+        columns = {}
+        row_errors = {}
+        for feature in features:
+            rule = self.rules.get(feature)
+            if rule is None:
+                columns[feature] = df[feature]
+                continue
+            columns[feature], messages = rule.coerce_column(df[feature])
+            if messages is None:
+                continue
+            for position in np.flatnonzero(pd.notna(messages)):
+                row_errors.setdefault(int(position), {})[feature] = messages[position]
+        return pd.DataFrame(columns, index=df.index), row_errors
+
+    def describe(self, features):
+        return {feature: self.rules[feature].describe() for feature in features if feature in self.rules}
@@ -0,0 +1,72 @@
+"""
+Shared test fixtures: the shipped model artifacts and a fully wired app
+
+Apps are built from the memory-mapped .forest artifacts in model/ with every
+shared directory (jobs, profiles, derivatives, reload generation) moved into
+the test's tmp_path.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.normpath(os.path.join(BACKEND_DIR, '..', 'model'))
+
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config  # noqa: E402
+
+# A valid request for the minimal (default) model
+EMPLOYEE = {
+    'OverTime': 'Yes',
+    'MonthlyIncome': 3000,
+    'Age': 30,
+    'TotalWorkingYears': 5,
+    'DistanceFromHome': 10,
+    'StockOptionLevel': 0,
+    'EnvironmentSatisfaction': 2
+}
+
+
+def artifact(variant, extension='.forest'):
+    """Path of a shipped model artifact (skips the test when it is missing)"""
+    path = os.path.join(MODEL_DIR, f'attrition_pipeline_{variant}{extension}')
+    if not os.path.exists(path):
+        pytest.skip(f'{os.path.basename(path)} not found (run model/model.py)')
+    return path
+
+
+@pytest.fixture
+def make_app(monkeypatch, tmp_path):
+    """Build the app with ``Config`` overrides, e.g. ``make_app(MICRO_BATCHING=True)``"""
+    def make(**overrides):
+        settings = {
+            'MODEL_PATH': artifact('minimal'),
+            'MODEL_DIR': MODEL_DIR,
+            'INFERENCE_BACKEND': 'numpy',
+            'MODEL_WATCH_INTERVAL': 0,
+            'MODEL_GENERATION_PATH': str(tmp_path / 'model.generation'),
+            'MODEL_GENERATION_INTERVAL': 0,
+            'ADMIN_TOKEN': '',
+            'JOB_DIR': str(tmp_path / 'jobs'),
+            'PROFILE_DIR': str(tmp_path / 'profiles'),
+            'DERIVATIVE_DIR': str(tmp_path / 'derivatives')
+        }
+        settings.update(overrides)
+        for name, value in settings.items():
+            monkeypatch.setattr(Config, name, value)
+
+        from app_mvc import build_app
+        with contextlib.redirect_stdout(io.StringIO()):
+            return build_app()
+    return make
+
+
+@pytest.fixture
+def client(make_app):
+    """Test client of an app with the default configuration"""
+    return make_app().test_client()
@@ -0,0 +1,107 @@
+"""
+Visualizations: in-memory index, content-hashed asset URLs and conditional requests
+"""
+
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from conftest import MODEL_DIR
+from models import VisualizationManager
+
+IMG_DIR = os.path.join(MODEL_DIR, 'img')
+
+
+@pytest.fixture
+def img_dir(tmp_path):
+    """Three listed images, two of them with the same content"""
+    sources = {
+        'comparison/summary_dashboard.png': 'comparison/summary_dashboard.png',
+        'minimal/confusion_matrix.png': 'minimal/confusion_matrix.png',
+        'full/confusion_copy.png': 'minimal/confusion_matrix.png'
+    }
+    for target, source in sources.items():
+        if not os.path.exists(os.path.join(IMG_DIR, source)):
+            pytest.skip(f'{source} not found (run model/model.py)')
+        os.makedirs(tmp_path / os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(IMG_DIR, source), tmp_path / target)
+    return tmp_path
+
+
+@pytest.fixture
+def viz_client(make_app, img_dir):
+    return make_app(IMG_BASE_PATH=str(img_dir)).test_client()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_identical_files_share_one_blob(img_dir):
+    manager = VisualizationManager(str(img_dir))
+    assert manager.build_index() == 3
+
+    assert manager.stats()['unique_files'] == 2
+    minimal = manager.get_asset('minimal', 'confusion_matrix.png')
+    copy = manager.get_asset('full', 'confusion_copy.png')
+    assert minimal.digest == copy.digest
+    assert manager.read(minimal) is manager.read(copy)
+    assert (minimal.width, minimal.height) > (0, 0)
+
+
+def test_list_returns_hashed_names(viz_client, img_dir):
+    body = viz_client.get('/api/visualizations/list').get_json()
+    data = read(img_dir / 'comparison' / 'summary_dashboard.png')
+    digest = hashlib.sha256(data).hexdigest()[:VisualizationManager.DIGEST_LENGTH]
+
+    assert body['visualizations']['comparison'] == ['summary_dashboard.png']
+    assert body['assets']['comparison'] == {'summary_dashboard.png': f'summary_dashboard.{digest}.png'}
+    assert body['assets_url'] == '/api/assets'
+
+
+def test_hashed_asset_is_immutable(viz_client, img_dir):
+    hashed = viz_client.get('/api/visualizations/list').get_json()['assets']['minimal']['confusion_matrix.png']
+    # Served from memory: the file may go away after indexing
+    os.remove(img_dir / 'minimal' / 'confusion_matrix.png')
+    response = viz_client.get(f'/api/assets/{hashed}')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.get_data() == read(img_dir / 'full' / 'confusion_copy.png')
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+@pytest.mark.parametrize('name', ['summary_dashboard.0000000000000000.png', 'summary_dashboard.png'])
+def test_unknown_or_stale_hash_is_404(viz_client, name):
+    assert viz_client.get(f'/api/assets/{name}').status_code == 404
+
+
+def test_wrong_extension_is_404(viz_client):
+    hashed = viz_client.get('/api/visualizations/list').get_json()['assets']['comparison']['summary_dashboard.png']
+    assert viz_client.get('/api/assets/' + hashed.replace('.png', '.gif')).status_code == 404
+
+
+def test_named_url_is_revalidated(viz_client):
+    url = '/api/visualizations/comparison/summary_dashboard.png'
+    response = viz_client.get(url)
+
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+    assert viz_client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert viz_client.get(url, headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    assert viz_client.get('/api/visualizations/comparison/missing.png').status_code == 404
+    assert viz_client.get('/api/visualizations/other/summary_dashboard.png').status_code == 400
+
+
+def test_range_requests(viz_client, img_dir):
+    url = '/api/visualizations/comparison/summary_dashboard.png'
+    data = read(img_dir / 'comparison' / 'summary_dashboard.png')
+
+    partial = viz_client.get(url, headers={'Range': 'bytes=0-7'})
+    assert partial.status_code == 206
+    assert partial.get_data() == data[:8]
+    assert partial.headers['Content-Range'] == f'bytes 0-7/{len(data)}'
+
+    assert viz_client.get(url, headers={'Range': f'bytes={len(data)}-'}).status_code == 416
@@ -0,0 +1,147 @@
+"""
+MicroBatcher: coalescing, timeout cancellation and failure isolation
+"""
+
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+from conftest import EMPLOYEE
+
+
+class Model:
+    """predict_fn that records every call; records listed in ``hold`` block until released"""
+
+    def __init__(self, hold=()):
+        self.hold = set(hold)
+        self.release = threading.Event()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, records):
+        with self.lock:
+            self.calls.append(list(records))
+        if self.hold.intersection(records):
+            assert self.release.wait(5)
+        if 'bad' in records:
+            raise ValueError('bad record')
+        return [f'scored {record}' for record in records]
+
+    def scored(self, record):
+        return sum(call.count(record) for call in self.calls)
+
+
+class Caller(threading.Thread):
+    def __init__(self, batcher, record):
+        super().__init__()
+        self.batcher = batcher
+        self.record = record
+        self.result = self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            self.result = self.batcher.submit(self.record)
+        except Exception as e:
+            self.error = e
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def queued(batcher, count):
+    return lambda: batcher._queue.qsize() == count
+
+
+def test_queued_requests_are_scored_in_one_batch():
+    model = Model(hold=['a'])
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50, timeout_ms=5000)
+
+    first = Caller(batcher, 'a')
+    wait_until(lambda: model.calls)
+    others = [Caller(batcher, record) for record in 'bcd']
+    wait_until(queued(batcher, 3))
+    model.release.set()
+    for caller in [first] + others:
+        caller.join()
+
+    assert model.calls == [['a'], ['b', 'c', 'd']]
+    assert [caller.result for caller in others] == ['scored b', 'scored c', 'scored d']
+    stats = batcher.stats()
+    assert (stats['batches'], stats['rows'], stats['timeouts']) == (2, 4, 0)
+    assert stats['batch_size_histogram']['4'] == 1
+
+
+def test_timed_out_queued_request_is_scored_once_by_its_caller():
+    model = Model(hold=['a'])
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=1, timeout_ms=20)
+
+    first = Caller(batcher, 'a')
+    wait_until(lambda: model.calls)
+    late = Caller(batcher, 'b')
+    late.join(5)
+    # Scored by the caller while the batcher is still busy with 'a'
+    assert late.result == 'scored b'
+    assert batcher.stats()['timeouts'] == 1
+
+    model.release.set()
+    first.join()
+    # The batcher drops the cancelled request instead of scoring it again
+    wait_until(queued(batcher, 0))
+    time.sleep(0.05)
+    assert model.scored('b') == 1
+    assert first.result == 'scored a'
+
+
+def test_claimed_request_is_waited_for_past_the_timeout():
+    model = Model(hold=['a'])
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=1, timeout_ms=20)
+
+    caller = Caller(batcher, 'a')
+    wait_until(lambda: model.calls)
+    time.sleep(0.05)
+    assert caller.is_alive()
+    model.release.set()
+    caller.join()
+
+    assert caller.result == 'scored a'
+    assert model.scored('a') == 1
+    assert batcher.stats()['timeouts'] == 0
+
+
+def test_failed_batch_is_retried_row_by_row():
+    model = Model(hold=['a'])
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50, timeout_ms=5000)
+
+    first = Caller(batcher, 'a')
+    wait_until(lambda: model.calls)
+    good, bad = Caller(batcher, 'good'), Caller(batcher, 'bad')
+    wait_until(queued(batcher, 2))
+    model.release.set()
+    for caller in (first, good, bad):
+        caller.join()
+
+    assert model.calls[1:] == [['good', 'bad'], ['good'], ['bad']]
+    assert good.result == 'scored good'
+    assert isinstance(bad.error, ValueError)
+
+
+@pytest.mark.parametrize('micro_batching', [False, True])
+def test_predict_with_micro_batching(make_app, micro_batching):
+    client = make_app(MICRO_BATCHING=micro_batching, PREDICTION_CACHE_SIZE=0).test_client()
+
+    response = client.post('/predict', json=EMPLOYEE)
+    assert response.status_code == 200
+    assert response.get_json()['prediction'] in ('Yes', 'No')
+
+    stats = client.get('/health').get_json()['micro_batching']
+    if micro_batching:
+        assert (stats['batches'], stats['rows']) == (1, 1)
+    else:
+        assert stats is None
@@ -0,0 +1,146 @@
+"""
+PredictionCache: TTL expiry, LRU eviction, single-flight and generations
+"""
+
+import threading
+import time
+import types
+
+import pytest
+
+import cache as cache_module
+from cache import PredictionCache
+from conftest import EMPLOYEE
+
+
+class Clock:
+    """Stands in for time.monotonic inside cache.py"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl=5)
+    cache.put('a', 1)
+
+    clock.now += 4.9
+    assert cache.get('a') == 1
+    clock.now += 0.1
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 0)
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = PredictionCache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = PredictionCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+               for _ in range(5)]
+    threads[0].start()
+    wait_until(lambda: calls)
+    for thread in threads[1:]:
+        thread.start()
+    wait_until(lambda: cache.stats()['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    assert cache.get('k') == 'value'
+
+
+def test_failed_computation_is_raised_to_every_waiter():
+    cache = PredictionCache()
+    release = threading.Event()
+    errors = []
+
+    def compute():
+        release.wait(5)
+        raise ValueError('boom')
+
+    def call():
+        try:
+            cache.get_or_compute('k', compute)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    wait_until(lambda: 'k' in cache._inflight)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_until(lambda: cache.stats()['coalesced'] == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert cache.get('k') is None
+
+
+def test_clear_keeps_in_flight_result_out_of_the_cache():
+    cache = PredictionCache()
+    release = threading.Event()
+    result = []
+
+    thread = threading.Thread(target=lambda: result.append(
+        cache.get_or_compute('k', lambda: release.wait(5) and 'stale')))
+    thread.start()
+    wait_until(lambda: 'k' in cache._inflight)
+    cache.clear()
+    release.set()
+    thread.join()
+
+    assert result == ['stale']
+    assert cache.get('k') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_repeated_predict_is_served_from_cache(client):
+    first = client.post('/predict', json=EMPLOYEE).get_json()
+    second = client.post('/predict', json=EMPLOYEE).get_json()
+
+    assert first == second
+    stats = client.get('/health').get_json()['cache']
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
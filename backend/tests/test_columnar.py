@@ -0,0 +1,157 @@
+"""
+/predict/batch with binary column arrays: .npy, MessagePack and Arrow IPC
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import columnar
+from conftest import EMPLOYEE, MODEL_DIR
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+FEATURES = list(EMPLOYEE)
+
+
+@pytest.fixture(scope='module')
+def roster():
+    """8 rows with one out-of-range Age (row 3)"""
+    frame = pd.read_csv(DATASET, nrows=8)[FEATURES]
+    frame.loc[3, 'Age'] = 350
+    return frame
+
+
+@pytest.fixture
+def reference(client, roster):
+    """P(yes) per row from the regular JSON batch endpoint (NaN for the invalid row)"""
+    results = client.post('/predict/batch', json={'records': roster.to_dict('records')}).get_json()['results']
+    return np.array([result['probabilities']['Yes'] / 100 if 'probabilities' in result else np.nan
+                     for result in results])
+
+
+def post(client, body, media_type, accept=None):
+    headers = {'Accept': accept} if accept else {}
+    return client.post('/predict/batch', data=body, content_type=media_type, headers=headers)
+
+
+def to_npy(frame, byte_strings=False):
+    dtype = [(name, '<i8') if pd.api.types.is_numeric_dtype(frame[name]) else (name, 'S3' if byte_strings else 'U3')
+             for name in frame.columns]
+    array = np.array(list(frame.itertuples(index=False)), dtype=dtype)
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def to_msgpack(frame, wrapped=False):
+    msgpack = pytest.importorskip('msgpack')
+    columns = {name: frame[name].tolist() for name in frame.columns}
+    return msgpack.packb({'columns': columns} if wrapped else columns)
+
+
+def to_arrow(frame):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+
+    table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def assert_scores(actual, reference):
+    # The JSON endpoint rounds to percent with two decimals
+    np.testing.assert_allclose(actual, reference, atol=1e-4)
+    assert np.isnan(actual[3])
+
+
+@pytest.mark.parametrize('byte_strings', [False, True])
+def test_npy_round_trip(client, roster, reference, byte_strings):
+    response = post(client, to_npy(roster, byte_strings), 'application/x-npy')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-npy'
+    assert (response.headers['X-Rows'], response.headers['X-Failed-Rows']) == ('8', '1')
+    assert_scores(np.load(io.BytesIO(response.get_data()), allow_pickle=False), reference)
+
+
+@pytest.mark.parametrize('wrapped', [False, True])
+def test_msgpack_round_trip(client, roster, reference, wrapped):
+    import msgpack
+
+    response = post(client, to_msgpack(roster, wrapped), 'application/x-msgpack')
+    body = msgpack.unpackb(response.get_data())
+
+    assert response.status_code == 200
+    assert (body['count'], body['failed']) == (8, 1)
+    assert body['errors'] == [{'index': 3, 'field_errors': {'Age': 'must be between 0 and 102'}}]
+    assert_scores(np.array(body['probability_yes']), reference)
+
+
+def test_arrow_round_trip(client, roster, reference):
+    import pyarrow.ipc
+
+    response = post(client, to_arrow(roster), 'application/vnd.apache.arrow.stream')
+    table = pyarrow.ipc.open_stream(response.get_data()).read_all()
+
+    assert response.status_code == 200
+    assert table.column_names == ['probability_yes', 'error']
+    assert table.column('error').to_pylist()[3] == 'Age: must be between 0 and 102'
+    assert table.column('probability_yes').null_count == 1
+    assert_scores(table.column('probability_yes').to_numpy(zero_copy_only=False), reference)
+
+
+def test_accept_header_picks_the_response_format(client, roster, reference):
+    response = post(client, to_npy(roster), 'application/x-npy', accept='application/json')
+    body = response.get_json()
+
+    assert response.mimetype == 'application/json'
+    assert body['probability_yes'][3] is None
+    assert_scores(np.array(body['probability_yes'], dtype=float), reference)
+
+
+@pytest.mark.parametrize('body, media_type, error', [
+    (b'not an array', 'application/x-npy', 'Malformed .npy body'),
+    (b'\xc1', 'application/x-msgpack', 'Malformed MessagePack body'),
+    (b'\x00\x01', 'application/vnd.apache.arrow.stream', 'Malformed Arrow IPC stream')
+])
+def test_malformed_bodies_are_rejected(client, body, media_type, error):
+    response = post(client, body, media_type)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith(error)
+
+
+def test_column_problems_are_rejected(client, roster):
+    missing = post(client, to_npy(roster.drop(columns=['Age'])), 'application/x-npy')
+    assert (missing.status_code, missing.get_json()['details']['missing']) == (400, ['Age'])
+
+    msgpack = pytest.importorskip('msgpack')
+    columns = {name: roster[name].tolist() for name in FEATURES}
+    columns['Age'] = columns['Age'][:-1]
+    uneven = post(client, msgpack.packb(columns), 'application/x-msgpack')
+    assert uneven.get_json()['message'] == 'Columns must all have the same length'
+
+    not_columns = post(client, msgpack.packb([1, 2, 3]), 'application/x-msgpack')
+    assert not_columns.get_json()['message'] == 'Expected a map of column name to array'
+
+
+def test_unavailable_codec_is_415(client, monkeypatch):
+    monkeypatch.setattr(columnar, 'msgpack', None)
+    response = post(client, b'\x80', 'application/x-msgpack')
+
+    assert response.status_code == 415
+    assert response.get_json()['details']['missing_package'] == 'msgpack'
+
+
+def test_negotiate_ignores_wildcards():
+    npy = columnar.CODECS['application/x-npy']
+
+    assert columnar.negotiate([('*/*', 1)], npy) is npy
+    assert columnar.negotiate([('application/json', 1), ('application/x-npy', 0.5)], npy) is None
+    assert columnar.codec_for('application/x-msgpack; charset=binary').name == 'msgpack'
+    assert columnar.codec_for('application/json') is None
@@ -0,0 +1,132 @@
+"""
+POST /predict/csv: chunked streaming with per-line results and errors
+"""
+
+import csv
+import io
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import MODEL_DIR
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+COLUMNS = ['EmployeeNumber', 'OverTime', 'MonthlyIncome', 'Age', 'TotalWorkingYears',
+           'DistanceFromHome', 'StockOptionLevel', 'EnvironmentSatisfaction']
+
+
+@pytest.fixture
+def csv_client(make_app):
+    # Small chunks so a few rows already span several of them
+    return make_app(CSV_CHUNK_ROWS=4, PREDICTION_CACHE_SIZE=0).test_client()
+
+
+@pytest.fixture(scope='module')
+def roster():
+    """12 valid rows; line 1 is the header, so row i is on line i + 2"""
+    return pd.read_csv(DATASET, nrows=12)[COLUMNS]
+
+
+def to_csv(frame):
+    return frame.to_csv(index=False, lineterminator='\n')
+
+
+def post(client, body, **params):
+    response = client.post('/predict/csv', data=body, content_type='text/csv', query_string=params)
+    try:
+        return response.status_code, response.get_data(as_text=True)
+    finally:
+        response.close()
+
+
+def ndjson(text):
+    lines = [json.loads(line) for line in text.splitlines()]
+    return lines[:-1], lines[-1]['summary']
+
+
+def test_rows_are_scored_with_their_line_numbers(csv_client, roster):
+    status, text = post(csv_client, to_csv(roster))
+    results, summary = ndjson(text)
+
+    assert status == 200
+    assert summary == {'rows': 12, 'succeeded': 12, 'failed': 0}
+    assert [result['line'] for result in results] == list(range(2, 14))
+    assert [result['input']['EmployeeNumber'] for result in results] == [str(n) for n in roster['EmployeeNumber']]
+
+
+def test_results_match_predict(csv_client, roster):
+    _, text = post(csv_client, to_csv(roster.head(3)))
+    results, _ = ndjson(text)
+
+    for record, result in zip(roster.head(3)[COLUMNS[1:]].to_dict('records'), results):
+        expected = csv_client.post('/predict', json=record).get_json()
+        assert result['prediction'] == expected['prediction']
+        assert result['probabilities'] == expected['probabilities']
+
+
+def test_bad_rows_are_reported_by_line(csv_client, roster):
+    lines = to_csv(roster.head(6)).splitlines()
+    lines[2] = '1,Yes,3000'                                  # line 3: too few fields
+    lines[4] = lines[4].replace(',No,', ',Maybe,').replace(',Yes,', ',Maybe,')  # line 5: bad category
+    lines.insert(6, '')                                       # blank line 7 is skipped
+    status, text = post(csv_client, '\n'.join(lines) + '\n')
+    results, summary = ndjson(text)
+
+    assert status == 200
+    assert summary == {'rows': 6, 'succeeded': 4, 'failed': 2}
+    errors = {result['line']: result['error'] for result in results if 'error' in result}
+    assert set(errors) == {3, 5}
+    assert errors[3] == 'Expected 8 fields, got 3'
+    assert [result['line'] for result in results] == [2, 3, 4, 5, 6, 8]
+
+
+def test_csv_output_appends_result_columns(csv_client, roster):
+    status, text = post(csv_client, to_csv(roster.head(5)), format='csv')
+    rows = list(csv.reader(io.StringIO(text)))
+
+    assert status == 200
+    assert rows[0] == COLUMNS + ['line', 'prediction', 'confidence', 'probability_no', 'probability_yes', 'error']
+    assert len(rows) == 6
+    assert [row[len(COLUMNS)] for row in rows[1:]] == ['2', '3', '4', '5', '6']
+    assert all(row[-1] == '' and row[len(COLUMNS) + 1] in ('Yes', 'No') for row in rows[1:])
+
+
+def test_multipart_upload(csv_client, roster):
+    response = csv_client.post('/predict/csv', data={'file': (io.BytesIO(to_csv(roster).encode()), 'roster.csv')},
+                               content_type='multipart/form-data')
+    _, summary = ndjson(response.get_data(as_text=True))
+    response.close()
+
+    assert summary['succeeded'] == 12
+
+
+def test_missing_columns_are_rejected_up_front(csv_client, roster):
+    response = csv_client.post('/predict/csv', data=to_csv(roster.drop(columns=['Age'])), content_type='text/csv')
+
+    assert response.status_code == 400
+    assert response.get_json()['details']['missing'] == ['Age']
+
+
+@pytest.mark.parametrize('body, error', [
+    ('', 'Empty CSV'),
+    ('a,b\n', 'Missing required columns')
+])
+def test_unusable_bodies(csv_client, body, error):
+    response = csv_client.post('/predict/csv', data=body, content_type='text/csv')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
+
+
+def test_undecodable_body_stops_with_an_error_line(csv_client, roster):
+    # Past the text decoder's first block, so scoring has already started
+    rows = to_csv(pd.concat([roster] * 50)).encode()
+    status, text = post(csv_client, rows + b'\xff\xfe,broken\n')
+    results, summary = ndjson(text)
+
+    assert status == 200
+    assert results[-1]['error'].startswith('Malformed CSV, stopped reading')
+    assert summary['succeeded'] > 0
+    assert summary['failed'] == 1
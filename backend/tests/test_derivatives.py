@@ -0,0 +1,159 @@
+"""
+DerivativeStore: width snapping, no upscaling and the on-disk derivative cache
+"""
+
+import io
+import os
+import threading
+
+import pytest
+
+import derivatives
+from derivatives import DerivativeStore
+from models import VisualizationManager
+
+Image = pytest.importorskip('PIL.Image')
+
+WIDTHS = (320, 640, 960, 1280)
+
+
+@pytest.fixture
+def img_dir(tmp_path):
+    """One 1000x500 chart under minimal/"""
+    os.makedirs(tmp_path / 'img' / 'minimal')
+    Image.new('RGB', (1000, 500), (30, 120, 200)).save(tmp_path / 'img' / 'minimal' / 'chart.png')
+    return tmp_path / 'img'
+
+
+@pytest.fixture
+def viz_manager(img_dir):
+    manager = VisualizationManager(str(img_dir))
+    manager.build_index()
+    return manager
+
+
+@pytest.fixture
+def asset(viz_manager):
+    return viz_manager.get_asset('minimal', 'chart.png')
+
+
+@pytest.fixture
+def store(viz_manager, tmp_path):
+    return DerivativeStore(viz_manager, str(tmp_path / 'derivatives'), WIDTHS)
+
+
+def size_of(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.format, image.size
+
+
+@pytest.mark.parametrize('requested, snapped', [(1, 320), (320, 320), (321, 640), (961, 1280), (5000, 1280)])
+def test_width_snaps_up_to_a_configured_width(store, requested, snapped):
+    assert store.snap_width(requested) == snapped
+
+
+def test_downscaled_derivative_is_cached_on_disk(store, asset):
+    data, mimetype, etag = store.get(asset, 500, 'png')
+
+    assert (mimetype, etag) == ('image/png', f'{asset.digest}-640.png')
+    assert size_of(data) == ('PNG', (640, 320))
+    assert os.listdir(store.cache_dir) == [etag]
+
+    # Served from disk afterwards, also by another store (worker) sharing the directory
+    other = DerivativeStore(store.viz_manager, store.cache_dir, WIDTHS)
+    assert other.get(asset, 600, 'png')[0] == data
+    assert (store.generated, other.generated) == (1, 0)
+
+
+def test_never_upscales(store, asset):
+    # 1000 snaps to 1280, wider than the source: the original is served
+    assert store.get(asset, 1000, 'png') == (store.viz_manager.read(asset), 'image/png', asset.digest)
+
+    data, mimetype, etag = store.get(asset, 1000, 'webp')
+    assert (mimetype, etag) == ('image/webp', f'{asset.digest}-orig.webp')
+    assert size_of(data) == ('WEBP', (1000, 500))
+
+
+def test_webp_derivative(store, asset):
+    if 'webp' not in store.formats:
+        pytest.skip('Pillow built without WebP')
+    data, mimetype, _ = store.get(asset, 320, 'webp')
+
+    assert mimetype == 'image/webp'
+    assert size_of(data) == ('WEBP', (320, 160))
+
+
+def test_least_recently_used_derivatives_are_evicted(store, asset):
+    small, large = (os.path.join(store.cache_dir, f'{asset.digest}-{width}.png') for width in (320, 640))
+    store.get(asset, 320, 'png')
+    store.get(asset, 640, 'png')
+    os.utime(small, (0, 0))
+    os.utime(large, (10, 10))
+
+    # Reading a derivative marks it as recently used
+    store.get(asset, 320, 'png')
+    store.max_bytes = os.path.getsize(small)
+    store._evict()
+    assert os.listdir(store.cache_dir) == [os.path.basename(small)]
+
+
+def test_concurrent_misses_render_once(store, asset, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    render = store._render
+    calls = []
+
+    def slow_render(*args):
+        calls.append(args[1:])
+        started.set()
+        assert release.wait(5)
+        return render(*args)
+    monkeypatch.setattr(store, '_render', slow_render)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get(asset, 320, 'png'))) for _ in range(3)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [(320, 'png')]
+    assert len({data for data, _, _ in results}) == 1
+    assert store.generated == 1
+
+
+def test_without_pillow_the_original_is_served(store, asset, monkeypatch):
+    monkeypatch.setattr(derivatives, 'Image', None)
+
+    assert store.get(asset, 320, 'webp') == (store.viz_manager.read(asset), 'image/png', asset.digest)
+
+
+def test_image_routes_accept_width_and_format(make_app, img_dir):
+    client = make_app(IMG_BASE_PATH=str(img_dir), DERIVATIVE_WIDTHS=list(WIDTHS)).test_client()
+    hashed = client.get('/api/visualizations/list').get_json()['assets']['minimal']['chart.png']
+
+    response = client.get(f'/api/assets/{hashed}?w=300&format=webp')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert size_of(response.get_data()) == ('WEBP', (320, 160))
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    named = client.get('/api/visualizations/minimal/chart.png?w=640')
+    assert size_of(named.get_data()) == ('PNG', (640, 320))
+    assert client.get('/api/visualizations/minimal/chart.png?w=640',
+                      headers={'If-None-Match': named.headers['ETag']}).status_code == 304
+
+
+@pytest.mark.parametrize('query, error', [
+    ('w=abc', 'w must be a positive integer (pixels)'),
+    ('w=-5', 'w must be a positive integer (pixels)'),
+    ('format=gif', 'Invalid format. Use: png or webp')
+])
+def test_bad_parameters_are_rejected(make_app, img_dir, query, error):
+    client = make_app(IMG_BASE_PATH=str(img_dir)).test_client()
+    response = client.get(f'/api/visualizations/minimal/chart.png?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
@@ -0,0 +1,103 @@
+"""
+?explain=true: decision-path contributions that add up to P(yes)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import EMPLOYEE, MODEL_DIR, artifact
+from models import ModelManager
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return pd.read_csv(DATASET, nrows=60)[list(EMPLOYEE)]
+
+
+def load(path, **options):
+    manager = ModelManager(path, **options)
+    assert manager.load_model()
+    return manager
+
+
+def totals(results):
+    """(base value + contributions, P(yes)) per result"""
+    explained = [result['explanation']['base_value'] + sum(result['explanation']['contributions'].values())
+                 for result in results]
+    return np.array(explained), np.array([result['probabilities']['yes'] for result in results])
+
+
+@pytest.mark.parametrize('variant', ['minimal', 'full'])
+def test_contributions_add_up_to_the_probability(variant):
+    manager = load(artifact(variant))
+    rows = pd.read_csv(DATASET, nrows=60)[manager.feature_names]
+    results = manager.explain_batch(rows)
+
+    explained, probability_yes = totals(results)
+    np.testing.assert_allclose(explained, probability_yes, atol=1e-9)
+    assert set(results[0]['explanation']['contributions']) == set(manager.feature_names)
+    # Explaining does not change the prediction
+    np.testing.assert_allclose(probability_yes, manager.predict_probabilities(rows)[:, 1], atol=1e-12)
+
+
+def test_sklearn_leaves_give_the_same_explanation(rows):
+    compiled = load(artifact('minimal', '.pkl'))
+    via_apply = load(artifact('minimal', '.pkl'), numpy_max_rows=0)
+
+    for left, right in zip(compiled.explain_batch(rows), via_apply.explain_batch(rows)):
+        assert left['prediction'] == right['prediction']
+        assert left['probabilities'] == pytest.approx(right['probabilities'], abs=1e-12)
+        assert left['explanation']['contributions'] == pytest.approx(right['explanation']['contributions'], abs=1e-12)
+    explained, _ = totals(via_apply.explain_batch(rows))
+    np.testing.assert_allclose(explained, via_apply.model.predict_proba(rows)[:, 1], atol=1e-9)
+
+
+def test_records_and_frames_are_explained_alike(rows):
+    manager = load(artifact('minimal'))
+    records = rows.head(5).to_dict('records')
+
+    for left, right in zip(manager.explain_records(records), manager.explain_batch(rows.head(5))):
+        assert left['explanation']['base_value'] == right['explanation']['base_value']
+        assert left['explanation']['contributions'] == pytest.approx(right['explanation']['contributions'])
+
+
+def test_base_value_is_the_same_for_every_row(rows):
+    results = load(artifact('minimal')).explain_batch(rows)
+
+    assert len({result['explanation']['base_value'] for result in results}) == 1
+    assert 0 < results[0]['explanation']['base_value'] < 1
+
+
+def test_predict_with_explain(client):
+    plain = client.post('/predict', json=EMPLOYEE).get_json()
+    explained = client.post('/predict?explain=true', json=EMPLOYEE).get_json()
+
+    assert 'explanation' not in plain
+    assert explained['probabilities'] == plain['probabilities']
+    explanation = explained['explanation']
+    # Percentages rounded to two decimals: the sum is off by at most one rounding step per term
+    total = explanation['base_value'] + sum(explanation['contributions'].values())
+    assert total == pytest.approx(explained['probabilities']['Yes'], abs=0.005 * (len(EMPLOYEE) + 2))
+
+
+def test_explain_bypasses_the_prediction_cache(client):
+    client.post('/predict', json=EMPLOYEE)
+    before = client.get('/health').get_json()['cache']
+
+    client.post('/predict?explain=true', json=EMPLOYEE)
+
+    after = client.get('/health').get_json()['cache']
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+
+
+def test_batch_and_variant_endpoints_explain(client, rows):
+    body = client.post('/predict/batch?explain=true', json={'records': rows.head(3).to_dict('records')}).get_json()
+    assert all('explanation' in result for result in body['results'])
+
+    explained = client.post('/predict/minimal?explain=true', json=EMPLOYEE).get_json()
+    assert set(explained['explanation']['contributions']) == set(EMPLOYEE)
@@ -0,0 +1,91 @@
+"""
+Equivalence of the compiled NumPy inference path with the sklearn pipelines
+
+Runs FeatureEncoder.encode_frame and CompiledForest.predict_proba_matrix on
+the full training CSV for every model variant and requires bit-exact
+agreement with the pipeline's own transform / predict_proba.
+
+Run from backend/:
+    python -m pytest tests
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BACKEND_DIR, '..', 'model')
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+
+sys.path.insert(0, BACKEND_DIR)
+
+from inference import CompiledForest, FeatureEncoder  # noqa: E402
+
+VARIANTS = ['full', 'reduced', 'minimal']
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return pd.read_csv(DATASET)
+
+
+def load_pipeline(variant):
+    path = os.path.join(MODEL_DIR, f'attrition_pipeline_{variant}.pkl')
+    if not os.path.exists(path):
+        pytest.skip(f'{os.path.basename(path)} not found (run model/model.py)')
+    with open(path, 'rb') as f:
+        pipeline = pickle.load(f)
+    # Single-threaded: same summation order as the compiled forest
+    pipeline.named_steps['classifier'].n_jobs = 1
+    return pipeline
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_encoder_matches_preprocessor(variant, dataset):
+    pipeline = load_pipeline(variant)
+    preprocessor = pipeline.named_steps['preprocessor']
+    data = dataset[list(preprocessor.feature_names_in_)]
+
+    encoder = FeatureEncoder.from_preprocessor(preprocessor)
+    expected = np.asarray(preprocessor.transform(data), dtype=np.float32)
+
+    np.testing.assert_array_equal(encoder.encode_frame(data), expected)
+    np.testing.assert_array_equal(encoder.encode_many(data.to_dict('records')), expected)
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_compiled_forest_matches_predict_proba(variant, dataset):
+    pipeline = load_pipeline(variant)
+    data = dataset[list(pipeline.feature_names_in_)]
+    engine = CompiledForest.from_pipeline(pipeline)
+
+    X = engine.encoder.encode_frame(data)
+    np.testing.assert_array_equal(engine.predict_proba_matrix(X), pipeline.predict_proba(data))
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_forest_artifact_matches_predict_proba(variant, dataset, tmp_path):
+    pipeline = load_pipeline(variant)
+    data = dataset[list(pipeline.feature_names_in_)]
+    path = str(tmp_path / f'{variant}.forest')
+    CompiledForest.from_pipeline(pipeline).save(path)
+    engine = CompiledForest.load(path)
+
+    np.testing.assert_array_equal(engine.predict_proba_matrix(engine.transform(data)),
+                                  pipeline.predict_proba(data))
+
+
+def test_unknown_category_is_rejected(dataset):
+    pipeline = load_pipeline('minimal')
+    encoder = FeatureEncoder.from_preprocessor(pipeline.named_steps['preprocessor'])
+    data = dataset[list(pipeline.feature_names_in_)].head(3).copy()
+    data['OverTime'] = ['Yes', 'Maybe', 'No']
+
+    with pytest.raises(ValueError):
+        encoder.encode_frame(data)
+    with pytest.raises(ValueError):
+        pipeline.named_steps['preprocessor'].transform(data)
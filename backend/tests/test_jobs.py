@@ -0,0 +1,212 @@
+"""
+/jobs: filesystem job queue, scoring run and the runner's bookkeeping
+"""
+
+import csv
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import MODEL_DIR
+from jobs import JobQueue, JobRunner, run_job
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+COLUMNS = ['EmployeeNumber', 'OverTime', 'MonthlyIncome', 'Age', 'TotalWorkingYears',
+           'DistanceFromHome', 'StockOptionLevel', 'EnvironmentSatisfaction']
+
+
+@pytest.fixture(scope='module')
+def roster_csv():
+    """10 valid rows and one with an unknown OverTime value (line 12)"""
+    frame = pd.read_csv(DATASET, nrows=11)[COLUMNS].astype({'OverTime': object})
+    frame.loc[10, 'OverTime'] = 'Maybe'
+    return frame.to_csv(index=False, lineterminator='\n')
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    os.makedirs(tmp_path / 'datasets')
+    return make_app(JOB_INPUT_DIR=str(tmp_path / 'datasets'), JOB_EVENTS_MAX_SECONDS=5)
+
+
+@pytest.fixture
+def job_client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs'))
+
+
+def submit(client, body, **options):
+    return client.post('/jobs', data=body, content_type='text/csv', query_string=options)
+
+
+def run(job_dir, job_id):
+    """Score a queued job in this process, as a runner's pool process would"""
+    job_path = os.path.join(job_dir, job_id)
+    with open(os.path.join(job_path, JobQueue.SPEC_FILE), encoding='utf-8') as f:
+        run_job(job_path, json.load(f))
+
+
+def test_submit_queues_the_job(job_client, roster_csv, tmp_path):
+    response = submit(job_client, roster_csv)
+    job = response.get_json()
+
+    assert response.status_code == 202
+    assert (job['status'], job['model'], job['format'], job['source']) == ('queued', 'minimal', 'csv', 'upload')
+    assert job['bytes_total'] == len(roster_csv)
+    assert os.listdir(tmp_path / 'jobs' / JobQueue.QUEUE_DIR) == [job['id']]
+
+    assert job_client.get(job['status_url']).get_json()['status'] == 'queued'
+    pending = job_client.get(job['result_url'])
+    assert (pending.status_code, pending.get_json()['message']) == (409, 'Job not finished')
+
+
+def test_job_runs_to_a_downloadable_result(job_client, roster_csv, tmp_path):
+    job = submit(job_client, roster_csv).get_json()
+    run(str(tmp_path / 'jobs'), job['id'])
+
+    state = job_client.get(job['status_url']).get_json()
+    assert (state['status'], state['progress'], state['error']) == ('succeeded', 1.0, None)
+    assert (state['rows'], state['succeeded'], state['failed']) == (11, 10, 1)
+
+    response = job_client.get(job['result_url'])
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    response.close()
+    assert response.headers['Content-Disposition'] == f'attachment; filename=predictions-{job["id"]}.csv'
+    assert [row['line'] for row in rows] == [str(line) for line in range(2, 13)]
+    assert rows[-1]['error'] and not rows[0]['error']
+
+
+def test_ndjson_results_match_the_csv_endpoint(job_client, roster_csv, tmp_path):
+    job = submit(job_client, roster_csv, format='ndjson').get_json()
+    run(str(tmp_path / 'jobs'), job['id'])
+
+    response = job_client.get(job['result_url'])
+    from_job = response.get_data(as_text=True)
+    response.close()
+    streamed = job_client.post('/predict/csv', data=roster_csv, content_type='text/csv')
+    assert from_job == streamed.get_data(as_text=True)
+    streamed.close()
+
+
+def test_events_stream_ends_with_done(job_client, roster_csv, tmp_path):
+    job = submit(job_client, roster_csv).get_json()
+    run(str(tmp_path / 'jobs'), job['id'])
+
+    response = job_client.get(job['events_url'])
+    events = response.get_data(as_text=True).split('\n\n')
+    response.close()
+
+    assert response.mimetype == 'text/event-stream'
+    assert events[0] == 'retry: 2000'
+    assert events[-2].startswith('event: done\ndata: ')
+    assert json.loads(events[-2].split('data: ', 1)[1])['status'] == 'succeeded'
+
+
+def test_server_side_path_stays_inside_the_input_dir(job_client, roster_csv, tmp_path):
+    with open(tmp_path / 'datasets' / 'roster.csv', 'w', encoding='utf-8') as f:
+        f.write(roster_csv)
+
+    response = job_client.post('/jobs', json={'path': 'roster.csv', 'format': 'ndjson'})
+    assert response.status_code == 202
+    assert response.get_json()['source'] == 'roster.csv'
+
+    assert job_client.post('/jobs', json={'path': '../jobs/runner.json'}).status_code == 404
+    assert job_client.post('/jobs', json={'path': 'missing.csv'}).status_code == 404
+
+
+def test_server_side_paths_are_disabled_by_default(client):
+    assert client.post('/jobs', json={'path': 'roster.csv'}).status_code == 403
+
+
+@pytest.mark.parametrize('body, options, error', [
+    ('a,b\n1,2\n', {}, 'Missing required columns'),
+    ('', {}, 'Empty CSV'),
+    (None, {}, 'No dataset provided'),
+    ('Age\n30\n', {'format': 'xlsx'}, 'Invalid output format'),
+    ('Age\n30\n', {'model': 'huge'}, 'Unknown model type: huge')
+])
+def test_invalid_submissions_are_rejected(job_client, tmp_path, body, options, error):
+    response = submit(job_client, body, **options) if body is not None else job_client.post('/jobs')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
+    # Nothing is left behind for the runner
+    assert JobQueue(str(tmp_path / 'jobs')).job_ids() == []
+
+
+def test_unknown_job_is_404(job_client):
+    assert job_client.get('/jobs/' + '0' * 32).status_code == 404
+    assert job_client.get('/jobs/not-a-job-id/result').status_code == 404
+
+
+def test_failed_job_reports_its_error(job_client, roster_csv, tmp_path):
+    job = submit(job_client, roster_csv).get_json()
+    spec_path = os.path.join(tmp_path, 'jobs', job['id'], JobQueue.SPEC_FILE)
+    with open(spec_path, encoding='utf-8') as f:
+        spec = json.load(f)
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump({**spec, 'model_path': str(tmp_path / 'missing.forest')}, f)
+    run(str(tmp_path / 'jobs'), job['id'])
+
+    state = job_client.get(job['status_url']).get_json()
+    assert (state['status'], state['error']) == ('failed', 'Could not load model missing.forest')
+    response = job_client.get(job['result_url'])
+    assert (response.status_code, response.get_json()['message']) == (409, 'Job failed')
+    assert not any(name.endswith('.part') for name in os.listdir(os.path.join(tmp_path, 'jobs', job['id'])))
+
+
+def test_runner_recovers_jobs_left_by_a_previous_runner(job_queue, tmp_path):
+    running, queued = job_queue.create(), job_queue.create()
+    for job_id in (running, queued):
+        with open(job_queue.path(job_id, JobQueue.INPUT_FILE), 'w', encoding='utf-8') as f:
+            f.write('Age\n30\n')
+        job_queue.submit(job_id, {'format': 'csv', 'source': 'upload',
+                                  'input': job_queue.path(job_id, JobQueue.INPUT_FILE)})
+        os.remove(os.path.join(job_queue.job_dir, JobQueue.QUEUE_DIR, job_id))
+    state = job_queue.get(running)
+    state['status'] = 'running'
+    with open(job_queue.path(running), 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+    JobRunner(job_queue)._recover()
+
+    assert job_queue.get(running)['status'] == 'failed'
+    assert job_queue.get(running)['error'] == 'Scoring process exited unexpectedly'
+    assert os.listdir(os.path.join(job_queue.job_dir, JobQueue.QUEUE_DIR)) == [queued]
+
+
+def test_runner_scores_queued_jobs_in_its_pool(app, roster_csv, tmp_path):
+    client = app.test_client()
+    job = submit(client, roster_csv).get_json()
+    runner = JobRunner(JobQueue(str(tmp_path / 'jobs'), workers=1))
+
+    runner._dispatch()
+    assert os.listdir(runner.queue_dir) == []
+    deadline = time.monotonic() + 60
+    while runner._running and time.monotonic() < deadline:
+        runner._reap()
+        time.sleep(0.05)
+    runner._executor.shutdown()
+
+    assert client.get(job['status_url']).get_json()['status'] == 'succeeded'
+
+
+def test_cleanup_removes_only_old_finished_jobs(job_queue):
+    old_done, old_queued, recent_done = (job_queue.create() for _ in range(3))
+    for job_id, status in ((old_done, 'succeeded'), (old_queued, 'queued'), (recent_done, 'failed')):
+        with open(job_queue.path(job_id), 'w', encoding='utf-8') as f:
+            json.dump({'id': job_id, 'status': status}, f)
+    for job_id in (old_done, old_queued):
+        os.utime(job_queue.path(job_id), (0, 0))
+
+    job_queue.cleanup()
+
+    assert sorted(job_queue.job_ids()) == sorted([old_queued, recent_done])
@@ -0,0 +1,109 @@
+"""
+/metrics: request counts, per-stage timings and merging across workers
+"""
+
+import os
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from conftest import BACKEND_DIR, EMPLOYEE
+
+STAGES = ['validation', 'encoding', 'inference', 'serialization']
+
+
+def sample(name, **labels):
+    """Current value of one sample in this process (metrics are global, so compare deltas)"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def requests(route, status, method='POST'):
+    return sample('http_requests_total', method=method, route=route, status=status)
+
+
+def stage_count(route, stage):
+    return sample('predict_stage_duration_seconds_count', route=route, stage=stage)
+
+
+def call(send, *args, **kwargs):
+    """Send a request and close its body, which is when the middleware records it"""
+    response = send(*args, **kwargs)
+    response.close()
+    return response.status_code
+
+
+def test_predict_is_counted_and_timed_per_stage(make_app):
+    client = make_app(PREDICTION_CACHE_SIZE=0).test_client()
+    before = requests('/predict', '200'), requests('/predict', '400'), \
+        [stage_count('/predict', stage) for stage in STAGES]
+
+    assert call(client.post, '/predict', json=EMPLOYEE) == 200
+    assert call(client.post, '/predict', json={}) == 400
+
+    assert requests('/predict', '200') == before[0] + 1
+    assert requests('/predict', '400') == before[1] + 1
+    # The rejected request stops after validation
+    assert [stage_count('/predict', stage) - count for stage, count in zip(STAGES, before[2])] == [2, 1, 1, 1]
+
+
+def test_route_label_is_the_url_rule(make_app):
+    client = make_app().test_client()
+    before = requests('/predict/<model_type>', '404'), requests('unmatched', '404', method='GET')
+
+    call(client.post, '/predict/huge', json=EMPLOYEE)
+    call(client.get, '/no/such/page')
+
+    assert requests('/predict/<model_type>', '404') == before[0] + 1
+    assert requests('unmatched', '404', method='GET') == before[1] + 1
+
+
+def test_micro_batched_inference_keeps_the_request_route(make_app):
+    client = make_app(MICRO_BATCHING=True, PREDICTION_CACHE_SIZE=0).test_client()
+    before = stage_count('/predict', 'inference')
+
+    assert client.post('/predict', json=EMPLOYEE).status_code == 200
+    assert stage_count('/predict', 'inference') == before + 1
+
+
+def test_streamed_response_is_recorded_when_the_body_closes(make_app):
+    client = make_app().test_client()
+    body = ','.join(EMPLOYEE) + '\n' + ','.join(str(value) for value in EMPLOYEE.values()) + '\n'
+    before = requests('/predict/csv', '200')
+
+    response = client.post('/predict/csv', data=body, content_type='text/csv', buffered=False)
+    assert response.status_code == 200
+    assert requests('/predict/csv', '200') == before
+    response.get_data()
+    response.close()
+    assert requests('/predict/csv', '200') == before + 1
+
+
+def test_metrics_endpoint(client):
+    client.post('/predict', json=EMPLOYEE)
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    names = {family.name for family in text_string_to_metric_families(response.get_data(as_text=True))}
+    assert {'http_requests', 'predict_stage_duration_seconds', 'model_load_duration_seconds'} <= names
+
+
+def test_samples_are_merged_across_processes(tmp_path):
+    env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(tmp_path)}
+    prelude = f'import sys; sys.path.insert(0, {BACKEND_DIR!r}); import metrics; '
+
+    def run(code):
+        return subprocess.run([sys.executable, '-c', prelude + code], env=env, check=True,
+                              capture_output=True, text=True).stdout
+
+    # Two "workers" serve one request each; a third renders /metrics
+    for _ in range(2):
+        run("metrics.REQUESTS.labels('POST', '/predict', '200').inc()")
+    text = run('sys.stdout.write(metrics.render()[0].decode())')
+
+    values = {sample.name: sample.value
+              for family in text_string_to_metric_families(text) for sample in family.samples
+              if sample.labels.get('route') == '/predict'}
+    assert values['http_requests_total'] == 2
@@ -0,0 +1,47 @@
+"""
+/ready: 503 until the model of this process is loaded and warmed up
+"""
+
+from app_mvc import warm_up
+from conftest import EMPLOYEE
+
+
+def test_ready_only_after_warm_up(make_app):
+    app = make_app()
+    client = app.test_client()
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['warmed_up'] is False
+    # /health reports the process, not readiness
+    assert client.get('/health').status_code == 200
+
+    warm_up(app)
+
+    response = client.get('/ready')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['ready'], body['model_loaded'], body['warmed_up']) == (True, True, True)
+    assert body['backend'] == 'numpy'
+
+
+def test_failed_warm_up_stays_unready(make_app, monkeypatch):
+    app = make_app()
+    model_manager = app.extensions['model_manager']
+
+    def fail(state, rows):
+        raise RuntimeError('broken model')
+    monkeypatch.setattr(model_manager, '_warm_up', fail)
+    assert model_manager.warm_up(8) is False
+
+    assert app.test_client().get('/ready').status_code == 503
+
+
+def test_warm_up_does_not_fill_the_prediction_cache(make_app):
+    app = make_app()
+    warm_up(app)
+    client = app.test_client()
+
+    assert client.get('/health').get_json()['cache']['size'] == 0
+    assert client.post('/predict', json=EMPLOYEE).status_code == 200
+    assert client.get('/health').get_json()['cache']['misses'] == 1
@@ -0,0 +1,102 @@
+"""
+ModelRegistry: lazy variant loading and least-recently-used eviction
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import EMPLOYEE, MODEL_DIR, artifact
+from models import ModelManager, ModelRegistry
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+VARIANTS = ['minimal', 'full', 'reduced']
+
+
+@pytest.fixture(scope='module')
+def sizes():
+    """Memory held by each loaded variant, in MB"""
+    sizes = {}
+    for name in VARIANTS:
+        manager = ModelManager(artifact(name))
+        assert manager.load_model()
+        sizes[name] = manager.memory_bytes / 1024 / 1024
+    return sizes
+
+
+def make_registry(budget_mb):
+    registry = ModelRegistry(budget_mb)
+    default = ModelManager(artifact('minimal'))
+    default.load_model()
+    registry.register('minimal', default, default.feature_names, pinned=True)
+    for name in VARIANTS[1:]:
+        registry.register(name, ModelManager(artifact(name)), [])
+    return registry
+
+
+def loaded(registry):
+    return sorted(name for name, variant in registry.stats()['variants'].items() if variant['loaded'])
+
+
+def test_variants_load_on_first_use():
+    registry = make_registry(budget_mb=1024)
+    assert loaded(registry) == ['minimal']
+
+    with registry.use('full') as manager:
+        assert manager.loaded
+    assert loaded(registry) == ['full', 'minimal']
+    assert (registry.loads, registry.evictions) == (1, 0)
+
+
+def test_least_recently_used_variant_is_evicted(sizes):
+    # Room for the default model and one more variant, not both
+    registry = make_registry(budget_mb=sum(sizes.values()) - 0.01)
+
+    with registry.use('full'):
+        pass
+    with registry.use('reduced'):
+        pass
+    assert loaded(registry) == ['minimal', 'reduced']
+
+    with registry.use('full'):
+        pass
+    assert loaded(registry) == ['full', 'minimal']
+    assert (registry.loads, registry.evictions) == (3, 2)
+
+
+def test_pinned_and_busy_variants_are_kept():
+    registry = make_registry(budget_mb=0)
+
+    with registry.use('full'):
+        with registry.use('reduced'):
+            pass
+        # 'reduced' went as soon as it was released; 'full' is still serving
+        assert loaded(registry) == ['full', 'minimal']
+    assert loaded(registry) == ['minimal']
+
+
+def test_discover_prefers_the_forest_artifact():
+    registry = ModelRegistry()
+    registry.discover({'full': [], 'reduced': []}, MODEL_DIR, ModelManager, (ModelManager.ARTIFACT_EXTENSION, '.pkl'))
+
+    assert registry.names == ['full', 'reduced']
+    assert registry.manager('full').model_path.endswith('attrition_pipeline_full.forest')
+
+
+def test_variant_endpoint_and_eviction_stats(make_app):
+    client = make_app(MODEL_MEMORY_BUDGET_MB=0).test_client()
+    features = client.get('/features?model=full').get_json()['required_features']
+    record = pd.read_csv(DATASET, nrows=1)[features].to_dict('records')[0]
+
+    response = client.post('/predict/full', json=record)
+    assert response.status_code == 200
+    model_info = response.get_json()['model_info']
+    assert (model_info['type'], model_info['features_used']) == ('full', 31)
+    assert client.post('/predict/minimal', json=EMPLOYEE).status_code == 200
+    assert client.post('/predict/huge', json=EMPLOYEE).status_code == 404
+
+    stats = client.get('/models').get_json()
+    assert stats['models']['full']['loaded'] is False
+    assert stats['models']['minimal']['pinned'] is True
+    assert client.get('/health').get_json()['models']['evictions'] == 1
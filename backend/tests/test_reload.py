@@ -0,0 +1,143 @@
+"""
+Hot reload: golden-set validation and workers following the generation file
+
+Each ModelReloader stands for one gunicorn worker: its own ModelManager on a
+shared MODEL_PATH, all publishing to one generation file.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from config import Config
+from conftest import EMPLOYEE, artifact
+from models import ModelManager
+from reloader import ModelReloader
+
+
+@pytest.fixture(scope='module')
+def golden_set():
+    golden_set = ModelReloader.load_golden_set(Config.GOLDEN_SET_PATH)
+    if golden_set is None:
+        pytest.skip('golden_set.json not found (run model/model.py)')
+    return golden_set
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / 'model.forest')
+    deploy(artifact('minimal'), path)
+    return path
+
+
+@pytest.fixture
+def make_worker(tmp_path, model_path, golden_set):
+    def make(golden=golden_set):
+        manager = ModelManager(model_path)
+        assert manager.load_model()
+        return ModelReloader(manager, golden_set=golden, min_auc=0.7,
+                             generation_path=str(tmp_path / 'model.generation'))
+    return make
+
+
+def deploy(source, path):
+    """Replace the model file the way a deploy should (atomic rename)"""
+    shutil.copyfile(source, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def version(worker):
+    return worker.model_manager.model_info()['version']
+
+
+def test_reload_is_followed_by_other_workers(make_worker, model_path):
+    first, second = make_worker(), make_worker()
+    deploy(artifact('minimal'), model_path)
+
+    assert first.request_reload(wait=True)
+    assert (version(first), first.status()['last_error']) == (2, None)
+
+    second._follow()
+    assert (version(second), second.followed) == (2, 1)
+    # Already up to date: a second poll does nothing
+    second._follow()
+    assert second.status()['attempts'] == 1
+
+
+def test_model_failing_the_golden_set_is_rejected_everywhere(make_worker, model_path, golden_set):
+    inverted = {**golden_set, 'labels': [1 - label for label in golden_set['labels']]}
+    first, second = make_worker(golden=inverted), make_worker()
+    deploy(artifact('minimal'), model_path)
+
+    assert not first.request_reload(wait=True)
+    status = first.status()
+    assert status['last_error'].startswith('Golden set ROC AUC')
+    assert (status['failures'], version(first)) == (1, 1)
+
+    # The other worker adopts the rejection instead of trying the same file
+    second._follow()
+    second._check_file()
+    second._check_file()
+    assert second.status()['attempts'] == 0
+    assert version(second) == 1
+
+
+def test_feature_mismatch_is_rejected(make_worker, model_path):
+    worker = make_worker()
+    deploy(artifact('reduced'), model_path)
+
+    assert not worker.request_reload(wait=True)
+    assert worker.status()['last_error'].startswith('Feature mismatch')
+    assert worker.model_manager.feature_names == list(EMPLOYEE)
+
+
+def test_forced_reload_of_an_unchanged_file_is_followed(make_worker):
+    first, second = make_worker(), make_worker()
+
+    assert first.request_reload(wait=True)
+    second._follow()
+    assert (version(second), second.followed) == (2, 1)
+
+
+def test_forked_worker_catches_up_once(make_worker, model_path):
+    first = make_worker()
+    forked = make_worker()
+    deploy(artifact('minimal'), model_path)
+    assert first.request_reload(wait=True)
+
+    assert forked.catch_up()
+    forked._follow()
+    assert (version(forked), forked.status()['attempts']) == (2, 1)
+
+
+def test_forked_worker_skips_a_rejected_file(make_worker, model_path, golden_set):
+    inverted = {**golden_set, 'labels': [1 - label for label in golden_set['labels']]}
+    first = make_worker(golden=inverted)
+    forked = make_worker()
+    deploy(artifact('minimal'), model_path)
+    assert not first.request_reload(wait=True)
+
+    assert not forked.catch_up()
+    assert forked.status()['attempts'] == 0
+
+
+def test_admin_reload_endpoint(make_app, model_path):
+    client = make_app(MODEL_PATH=model_path, ADMIN_TOKEN='secret').test_client()
+    client.post('/predict', json=EMPLOYEE)
+
+    assert client.post('/admin/reload').status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    response = client.post('/admin/reload?wait=true', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert response.get_json()['model']['version'] == 2
+    # Predictions cached for the old model are dropped
+    assert client.get('/health').get_json()['cache']['size'] == 0
+
+    status = client.get('/admin/reload', headers={'X-Admin-Token': 'secret'}).get_json()
+    assert (status['attempts'], status['failures']) == (1, 0)
+
+
+def test_admin_endpoints_are_off_without_a_token(client):
+    assert client.post('/admin/reload', headers={'X-Admin-Token': ''}).status_code == 404
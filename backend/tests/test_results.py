@@ -0,0 +1,79 @@
+"""
+/api/results*: pre-rendered documents with ETags, compression and ?fields=
+"""
+
+import gzip
+import json
+
+import pytest
+
+from config import Config
+
+ROUTES = ['/api/results', '/api/results/summary', '/api/results/model/minimal']
+
+
+@pytest.fixture(scope='module')
+def results():
+    with open(Config.RESULTS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_etag_and_not_modified(client, route):
+    response = client.get(route)
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == f'public, max-age={Config.RESULTS_CACHE_MAX_AGE}'
+    assert client.get(route).headers['ETag'] == etag
+
+    cached = client.get(route, headers={'If-None-Match': etag})
+    assert (cached.status_code, cached.get_data()) == (304, b'')
+    assert cached.headers['ETag'] == etag
+    assert client.get(route, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_documents_match_hasil_json(client, results):
+    assert client.get('/api/results').get_json() == results
+    assert client.get('/api/results/model/full').get_json() == results['models']['full']
+    assert client.get('/api/results/model/huge').status_code == 400
+
+
+def test_gzip_is_served_to_clients_that_accept_it(client):
+    plain = client.get('/api/results')
+    compressed = client.get('/api/results', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert len(compressed.get_data()) < len(plain.get_data())
+    # Each representation has its own strong ETag
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    assert client.get('/api/results', headers={'Accept-Encoding': 'gzip',
+                                               'If-None-Match': compressed.headers['ETag']}).status_code == 304
+
+
+def test_fields_projects_dotted_paths(client, results):
+    response = client.get('/api/results?fields=best_model, models.minimal.test_accuracy')
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'best_model': results['best_model'],
+        'models': {'minimal': {'test_accuracy': results['models']['minimal']['test_accuracy']}}
+    }
+    # Projections are rendered once and reused
+    again = client.get('/api/results?fields=best_model, models.minimal.test_accuracy')
+    assert again.headers['ETag'] == response.headers['ETag']
+
+
+@pytest.mark.parametrize('fields, error', [
+    ('models.huge', 'Unknown field: models.huge'),
+    ('best_model.name', 'Unknown field: best_model.name'),
+    (' , ', 'fields must list at least one field')
+])
+def test_bad_fields_are_rejected(client, fields, error):
+    response = client.get('/api/results', query_string={'fields': fields})
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
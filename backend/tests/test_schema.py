@@ -0,0 +1,131 @@
+"""
+FeatureSchema: type coercion and range/level checks before the model is called
+"""
+
+import pandas as pd
+import pytest
+
+from config import Config
+from conftest import EMPLOYEE
+from schema import FeatureSchema, FieldRule
+
+FEATURES = list(EMPLOYEE)
+
+
+@pytest.fixture(scope='module')
+def schema():
+    schema = FeatureSchema.load(Config.FEATURE_SCHEMA_PATH, Config.SCHEMA_RANGE_MARGIN)
+    if schema is None:
+        pytest.skip('feature_schema.json not found (run model/model.py)')
+    return schema
+
+
+@pytest.mark.parametrize('field, value, coerced', [
+    ('Age', '30', 30),
+    ('Age', ' 30.0 ', 30),
+    ('MonthlyIncome', 3000.0, 3000),
+    ('OverTime', 'yes', 'Yes'),
+    ('OverTime', ' NO ', 'No'),
+    ('EnvironmentSatisfaction', '4', 4)
+])
+def test_values_are_coerced(schema, field, value, coerced):
+    values, errors = schema.validate_record({**EMPLOYEE, field: value}, FEATURES)
+
+    assert errors == {}
+    assert values[field] == coerced
+    assert type(values[field]) is type(coerced)
+
+
+@pytest.mark.parametrize('field, value, error', [
+    ('Age', 350, 'must be between 0 and 102'),
+    ('Age', -1, 'must be between 0 and 102'),
+    ('Age', True, 'must be a number'),
+    ('Age', 'thirty', 'must be a number'),
+    ('Age', 'nan', 'must be a number'),
+    ('MonthlyIncome', [3000], 'must be a number'),
+    ('EnvironmentSatisfaction', 2.5, 'must be one of: 1, 2, 3, 4'),
+    ('OverTime', 'Sometimes', 'must be one of: No, Yes'),
+    ('OverTime', 1, 'must be one of: No, Yes')
+])
+def test_invalid_values_are_reported(schema, field, value, error):
+    _, errors = schema.validate_record({**EMPLOYEE, field: value}, FEATURES)
+
+    assert errors == {field: error}
+
+
+def test_range_is_widened_by_the_margin():
+    data = {'features': {'Age': {'type': 'integer', 'min': 18, 'max': 60},
+                         'Delta': {'type': 'number', 'min': -1.0, 'max': 1.0}}}
+
+    assert FeatureSchema.from_dict(data).describe(['Age', 'Delta']) == {
+        'Age': {'type': 'integer', 'min': 0, 'max': 102},
+        'Delta': {'type': 'number', 'min': -3, 'max': 3}
+    }
+    assert FeatureSchema.from_dict(data, range_margin=0).rules['Age'].coerce(17) == (None, 'must be between 18 and 60')
+    assert FeatureSchema.from_dict(data, range_margin=-1).rules['Age'].coerce(350) == (350, None)
+
+
+def test_frame_matches_record_validation(schema):
+    rows = [
+        EMPLOYEE,
+        {**EMPLOYEE, 'Age': 350, 'OverTime': 'maybe'},
+        {**EMPLOYEE, 'OverTime': 'yes', 'MonthlyIncome': '4200'},
+        {**EMPLOYEE, 'EnvironmentSatisfaction': 7}
+    ]
+    frame, row_errors = schema.validate_frame(pd.DataFrame(rows), FEATURES)
+
+    for position, row in enumerate(rows):
+        values, errors = schema.validate_record(row, FEATURES)
+        assert row_errors.get(position, {}) == errors
+        if not errors:
+            assert frame.iloc[position].to_dict() == values
+
+
+def test_csv_string_columns_are_coerced(schema):
+    frame = pd.DataFrame({'Age': pd.array([' 41', '2x', '55'], dtype='string')})
+    coerced, row_errors = schema.validate_frame(frame, ['Age'])
+
+    assert coerced['Age'].tolist()[::2] == [41.0, 55.0]
+    assert row_errors == {1: {'Age': 'must be a number'}}
+
+
+def test_fallback_schema_only_checks_categories():
+    schema = FeatureSchema.from_levels({'OverTime': ['No', 'Yes']}, ['OverTime', 'Age'])
+
+    assert schema.validate_record({'OverTime': 'yes', 'Age': 350}, ['OverTime', 'Age']) == \
+        ({'OverTime': 'Yes', 'Age': 350}, {})
+    assert FieldRule('Age', 'number').describe() == {'type': 'number'}
+
+
+def test_predict_rejects_every_failing_field(client):
+    response = client.post('/predict', json={**EMPLOYEE, 'Age': 350, 'MonthlyIncome': 'abc', 'OverTime': ' yes '})
+    body = response.get_json()
+
+    assert response.status_code == 400
+    assert body['message'] == 'Invalid feature values'
+    assert body['details']['field_errors'] == {'Age': 'must be between 0 and 102', 'MonthlyIncome': 'must be a number'}
+
+
+def test_predict_scores_coerced_values_like_clean_ones(client):
+    clean = client.post('/predict', json=EMPLOYEE).get_json()
+    messy = client.post('/predict', json={**EMPLOYEE, 'Age': '30', 'OverTime': 'yes', 'MonthlyIncome': 3000.0})
+
+    assert messy.status_code == 200
+    assert messy.get_json()['probabilities'] == clean['probabilities']
+
+
+def test_batch_reports_invalid_records_by_index(client):
+    records = [EMPLOYEE, {**EMPLOYEE, 'Age': 350}, {**EMPLOYEE, 'EnvironmentSatisfaction': 7}, {**EMPLOYEE, 'OverTime': 'YES '}]
+    body = client.post('/predict/batch', json={'records': records}).get_json()
+
+    assert (body['succeeded'], body['failed']) == (2, 2)
+    assert body['results'][1]['field_errors'] == {'Age': 'must be between 0 and 102'}
+    assert body['results'][2]['field_errors'] == {'EnvironmentSatisfaction': 'must be one of: 1, 2, 3, 4'}
+    assert body['results'][3]['probabilities'] == body['results'][0]['probabilities']
+
+
+def test_features_describes_the_schema(client):
+    schema = client.get('/features').get_json()['schema']
+
+    assert schema['OverTime'] == {'type': 'category', 'levels': ['No', 'Yes']}
+    assert schema['Age'] == {'type': 'integer', 'min': 0, 'max': 102}
@@ -0,0 +1,110 @@
+"""
+SplitBinner: cache keys by forest split interval
+
+Records with the same key must get bit-identical probabilities, and values
+on either side of a split threshold must not share a key.
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import EMPLOYEE, MODEL_DIR, artifact
+from inference import CompiledForest, SplitBinner
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+
+
+@pytest.fixture(scope='module')
+def forest():
+    return CompiledForest.load(artifact('minimal'))
+
+
+@pytest.fixture(scope='module')
+def binner(forest):
+    return SplitBinner.from_forest(forest)
+
+
+def probabilities(forest, records):
+    return forest.predict_proba_matrix(forest.encoder.encode_many(records))
+
+
+def test_values_in_one_interval_share_key_and_probabilities(forest, binner):
+    cuts = binner.thresholds['MonthlyIncome']
+    low, high = cuts[10], cuts[11]
+    records = [{**EMPLOYEE, 'MonthlyIncome': value}
+               for value in (low + 0.01, (low + high) / 2, high)]
+
+    assert len({binner.key(record) for record in records}) == 1
+    result = probabilities(forest, records)
+    assert np.array_equal(result, np.repeat(result[:1], len(records), axis=0))
+
+
+def test_threshold_separates_intervals(binner):
+    cut = binner.thresholds['MonthlyIncome'][10]
+    at_cut = binner.key({**EMPLOYEE, 'MonthlyIncome': cut})
+    above = binner.key({**EMPLOYEE, 'MonthlyIncome': cut + 1})
+
+    assert at_cut != above
+
+
+def test_dense_table_matches_bisect(binner):
+    assert binner.dense, 'no integer feature got a dense table'
+    for feature, table in binner.dense.items():
+        for value, interval in table.items():
+            assert interval == binner.interval(feature, value + 0.0), (feature, value)
+
+
+@pytest.mark.parametrize('change', [
+    {'OverTime': 'Maybe'},
+    {'OverTime': 1},
+    {'Age': float('nan')},
+    {'Age': True},
+    {'Age': '30'},
+    {'Age': None}
+])
+def test_unbinnable_records_have_no_key(binner, change):
+    assert binner.key({**EMPLOYEE, **change}) is None
+
+
+def test_pipeline_and_artifact_agree(binner):
+    with open(artifact('minimal', '.pkl'), 'rb') as f:
+        pickle_binner = SplitBinner.from_pipeline(pickle.load(f))
+
+    assert pickle_binner.thresholds == binner.thresholds
+    assert pickle_binner.categorical == binner.categorical
+
+
+def midpoint(cuts, interval):
+    """A value well inside split interval ``interval``"""
+    if interval == 0:
+        return cuts[0] - 1
+    if interval == len(cuts):
+        return cuts[-1] + 1
+    return (cuts[interval - 1] + cuts[interval]) / 2
+
+
+def test_interval_midpoints_score_like_training_rows(forest, binner):
+    records = pd.read_csv(DATASET)[forest.encoder.feature_names].to_dict('records')
+    twins = [
+        {
+            feature: midpoint(binner.thresholds[feature], binner.interval(feature, value))
+            if feature in binner.thresholds else value
+            for feature, value in record.items()
+        }
+        for record in records
+    ]
+
+    assert [binner.key(twin) for twin in twins] == [binner.key(record) for record in records]
+    np.testing.assert_array_equal(probabilities(forest, twins), probabilities(forest, records))
+
+
+def test_nearby_requests_hit_one_cache_entry(client):
+    first = client.post('/predict', json={**EMPLOYEE, 'MonthlyIncome': 3000}).get_json()
+    second = client.post('/predict', json={**EMPLOYEE, 'MonthlyIncome': 3000.25}).get_json()
+
+    assert first == second
+    assert client.get('/health').get_json()['cache']['hits'] == 1
@@ -0,0 +1,123 @@
+"""
+/predict/sweep: what-if grids scored once per split interval
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import EMPLOYEE, MODEL_DIR
+
+DATASET = os.path.join(MODEL_DIR, 'WA_Fn-UseC_-HR-Employee-Attrition.csv')
+
+
+@pytest.fixture
+def sweep_client(make_app):
+    return make_app(SWEEP_MAX_POINTS=400).test_client()
+
+
+def sweep(client, *specs, base=EMPLOYEE, route='/predict/sweep'):
+    return client.post(route, json={'base': base, 'sweep': list(specs)})
+
+
+def probability_yes(client, **changes):
+    return client.post('/predict', json={**EMPLOYEE, **changes}).get_json()['probabilities']['Yes']
+
+
+def test_curve_matches_single_predictions(sweep_client):
+    response = sweep(sweep_client, {'feature': 'MonthlyIncome', 'min': 3000, 'max': 3100, 'steps': 51})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    incomes = body['axes']['MonthlyIncome']
+    assert (len(incomes), body['points'], body['features']) == (51, 51, ['MonthlyIncome'])
+    assert (incomes[0], incomes[1], incomes[-1]) == (3000, 3002, 3100)
+    # Incomes in the same split interval of every tree are scored once
+    assert body['evaluated'] < body['points']
+    assert body['probability_yes'] == [probability_yes(sweep_client, MonthlyIncome=income) for income in incomes]
+
+
+def test_surface_rows_follow_the_first_feature(sweep_client):
+    body = sweep(sweep_client, {'feature': 'Age', 'values': [25, 40, 55]}, {'feature': 'OverTime'}).get_json()
+
+    assert body['axes'] == {'Age': [25, 40, 55], 'OverTime': ['No', 'Yes']}
+    assert body['probability_yes'] == [
+        [probability_yes(sweep_client, Age=age, OverTime=overtime) for overtime in ('No', 'Yes')]
+        for age in (25, 40, 55)
+    ]
+
+
+@pytest.mark.parametrize('spec, values', [
+    ({'feature': 'Age', 'values': [30, 30.0, '30', ' 31 ']}, [30, 31]),
+    ({'feature': 'OverTime', 'values': ['yes', 'Yes', 'NO']}, ['Yes', 'No']),
+    ({'feature': 'Age', 'min': 20, 'max': 22, 'steps': 9}, [20, 21, 22]),
+    ({'feature': 'EnvironmentSatisfaction'}, [1, 2, 3, 4])
+])
+def test_axis_values_are_coerced_and_deduplicated(sweep_client, spec, values):
+    body = sweep(sweep_client, spec).get_json()
+
+    assert body['axes'][spec['feature']] == values
+    assert len(body['probability_yes']) == body['points'] == len(values)
+
+
+def test_base_is_coerced(sweep_client):
+    body = sweep(sweep_client, {'feature': 'OverTime'}, base={**EMPLOYEE, 'Age': '30', 'OverTime': 'no'}).get_json()
+
+    assert body['base']['Age'] == 30
+    assert body['probability_yes'] == [probability_yes(sweep_client, OverTime=level) for level in ('No', 'Yes')]
+
+
+def test_grid_larger_than_the_limit_is_413(sweep_client):
+    response = sweep(sweep_client, {'feature': 'Age', 'min': 18, 'max': 60, 'steps': 40},
+                     {'feature': 'MonthlyIncome', 'min': 1000, 'max': 20000, 'steps': 40})
+    body = response.get_json()
+
+    assert response.status_code == 413
+    assert body['details']['points'] > 400
+    assert body['details']['max_points'] == 400
+
+
+@pytest.mark.parametrize('specs, error', [
+    ([], 'sweep must list one or two features'),
+    ([{'feature': 'Age'}] * 3, 'sweep must list one or two features'),
+    ([{'feature': 'Salary', 'values': [1]}], 'Unknown sweep features'),
+    ([{'feature': 'OverTime'}, {'feature': 'OverTime'}], 'Sweep features must be different')
+])
+def test_bad_sweep_lists_are_rejected(sweep_client, specs, error):
+    response = sweep(sweep_client, *specs)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
+
+
+@pytest.mark.parametrize('spec, field_error', [
+    ({'feature': 'Age', 'min': 40, 'max': 20}, 'min and max must be numbers with min <= max'),
+    ({'feature': 'Age', 'min': 20, 'max': 40, 'steps': 1}, 'steps must be an integer between 2 and 400'),
+    ({'feature': 'Age', 'min': 20, 'max': 40, 'steps': 401}, 'steps must be an integer between 2 and 400'),
+    ({'feature': 'Age'}, 'min and max (or values) are required for numeric features'),
+    ({'feature': 'Age', 'values': []}, 'values must be a non-empty list'),
+    ({'feature': 'Age', 'values': [30, 350]}, 'sweep value must be between 0 and 102')
+])
+def test_bad_axes_are_reported_per_feature(sweep_client, spec, field_error):
+    response = sweep(sweep_client, spec)
+
+    assert response.status_code == 400
+    assert response.get_json()['details']['field_errors'] == {'Age': field_error}
+
+
+def test_missing_base_is_rejected(sweep_client):
+    response = sweep_client.post('/predict/sweep', json={'sweep': [{'feature': 'OverTime'}]})
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'No base employee provided'
+
+
+def test_variant_sweep(sweep_client):
+    features = sweep_client.get('/features?model=reduced').get_json()['required_features']
+    base = pd.read_csv(DATASET, nrows=1)[features].to_dict('records')[0]
+
+    response = sweep(sweep_client, {'feature': 'OverTime'}, base=base, route='/predict/reduced/sweep')
+    assert response.status_code == 200
+    assert response.get_json()['model_info']['type'] == 'reduced'
+    assert sweep(sweep_client, {'feature': 'OverTime'}, route='/predict/huge/sweep').status_code == 404
@@ -0,0 +1,57 @@
+"""
+Threading Layer - Intra-op thread budget for model calls
+"""
+
+import joblib
+
+
+class ThreadBudget:
+    """Number of threads one sklearn forest call may use in this worker
+
+    The pickled forest is saved with ``n_jobs=-1``: every ``predict_proba``
+    fans out to one joblib thread per core. With ``workers`` gunicorn
+    processes serving ``threads_per_worker`` requests each, a busy server
+    would run workers x threads x cores threads on ``cores`` CPUs. The
+    default budget instead splits the cores evenly between concurrent
+    requests (at least one thread each).
+
+    Batches of ``large_batch_rows`` or more may use up to ``max_threads``,
+    and callers can ask for a specific count (capped at ``max_threads``).
+    Only the sklearn path is affected; the compiled numpy forest is
+    single-threaded. Native pools (BLAS, OpenMP) are sized from the same
+    formula by gunicorn.conf.py.
+    """
+
+    def __init__(self, workers=1, threads_per_worker=1, threads=0, max_threads=0,
+                 large_batch_rows=5000, cores=None):
+        # joblib honours CPU affinity and cgroup quotas (containers), unlike os.cpu_count()
+        self.cores = cores or joblib.cpu_count()
+        self.workers = max(workers, 1)
+        self.threads_per_worker = max(threads_per_worker, 1)
+        self.default = threads or self.auto(self.cores, self.workers, self.threads_per_worker)
+        self.max_threads = max(max_threads or self.cores, self.default)
+        self.large_batch_rows = large_batch_rows
+
+    @staticmethod
+    def auto(cores, workers, threads_per_worker=1):
+        """Fair share of the cores for one in-flight request"""
+        return max(cores // (workers * threads_per_worker), 1)
+
+    def for_rows(self, n_rows, requested=None):
+        """Threads for a model call on ``n_rows`` rows"""
+        if requested is not None:
+            return min(max(requested, 1), self.max_threads)
+        if n_rows >= self.large_batch_rows:
+            return self.max_threads
+        return self.default
+
+    def stats(self):
+        """Budget and the layout it was sized for"""
+        return {
+            'cores': self.cores,
+            'workers': self.workers,
+            'threads_per_worker': self.threads_per_worker,
+            'default_threads': self.default,
+            'max_threads': self.max_threads,
+            'large_batch_rows': self.large_batch_rows
+        }
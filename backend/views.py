@@ -2,7 +2,7 @@
 View Layer - Response formatting and API routes
 """
 
-from flask import jsonify, send_file
+from flask import Response, jsonify, request, send_file, stream_with_context
 
 
 class APIResponse:
@@ -25,9 +25,9 @@ class APIResponse:
         return jsonify(response), code
     
     @staticmethod
-    def image(file_path):
-        """Send image file"""
-        return send_file(file_path, mimetype='image/png')
+    def stream(generator, mimetype):
+        """Stream a generator of text chunks (keeps the request context alive)"""
+        return Response(stream_with_context(generator), mimetype=mimetype)
 
 
 class HealthView:
@@ -37,6 +37,24 @@ class HealthView:
     def render(health_data):
         """Render health check response"""
         return APIResponse.success(health_data)
+    
+    @staticmethod
+    def render_readiness(readiness_data):
+        """Render readiness probe response (503 until warmed up)"""
+        code = readiness_data.pop('code', 200)
+        return APIResponse.success(readiness_data, code)
+    
+    @staticmethod
+    def render_models(models_data):
+        """Render available model variants"""
+        if 'error' in models_data:
+            return APIResponse.error(models_data['error'], models_data.get('code', 404))
+        return APIResponse.success({
+            'status': 'success',
+            'models': models_data['models'],
+            'memory_budget_mb': models_data['memory_budget_mb'],
+            'memory_used_mb': models_data['memory_used_mb']
+        })
 
 
 class FeaturesView:
@@ -47,6 +65,13 @@ class FeaturesView:
         """Render features response"""
         features_data['accuracy'] = f"{accuracy:.2f}%" if accuracy else 'N/A'
         return APIResponse.success(features_data)
+    
+    @staticmethod
+    def render_error(error_data):
+        """Render features error"""
+        code = error_data.pop('code', 404)
+        error_msg = error_data.pop('error', 'Features not available')
+        return APIResponse.error(error_msg, code, error_data)
 
 
 class PredictionView:
@@ -61,8 +86,69 @@ class PredictionView:
             'probabilities': prediction_result['probabilities'],
             'model_info': model_info
         }
+        if 'explanation' in prediction_result:
+            response['explanation'] = prediction_result['explanation']
         return APIResponse.success(response)
     
+    @staticmethod
+    def render_sweep(sweep_result, model_info):
+        """Render a what-if sweep (probability curve or surface)"""
+        response = {
+            'base': sweep_result['base'],
+            'features': sweep_result['features'],
+            'axes': sweep_result['axes'],
+            'probability_yes': sweep_result['probability_yes'],
+            'points': sweep_result['points'],
+            'evaluated': sweep_result['evaluated'],
+            'model_info': model_info
+        }
+        return APIResponse.success(response)
+    
+    @staticmethod
+    def render_batch(batch_result, model_info):
+        """Render batch prediction results"""
+        response = {
+            'status': 'success',
+            'count': batch_result['count'],
+            'succeeded': batch_result['succeeded'],
+            'failed': batch_result['failed'],
+            'results': batch_result['results'],
+            'model_info': model_info
+        }
+        return APIResponse.success(response)
+    
+    @staticmethod
+    def render_columns(columns_result, codec, model_info):
+        """Render columnar scores in the negotiated format (codec None = JSON)"""
+        if codec is None:
+            probability_yes = columns_result['probability_yes']
+            response = {
+                'status': 'success',
+                'count': columns_result['count'],
+                'succeeded': columns_result['succeeded'],
+                'failed': columns_result['failed'],
+                'probability_yes': [None if p != p else p for p in probability_yes.tolist()],
+                'errors': [
+                    {'index': index, 'field_errors': fields}
+                    for index, fields in sorted(columns_result['errors'].items())
+                ],
+                'model_info': model_info
+            }
+            return APIResponse.success(response)
+        
+        headers = {
+            'X-Rows': str(columns_result['count']),
+            'X-Failed-Rows': str(columns_result['failed']),
+            'Vary': 'Accept'
+        }
+        body = codec.encode(columns_result['probability_yes'], columns_result['errors'])
+        return Response(body, mimetype=codec.media_type, headers=headers)
+    
+    @staticmethod
+    def render_stream(stream_result):
+        """Render streamed CSV scoring results"""
+        return APIResponse.stream(stream_result['stream'], stream_result['mimetype'])
+    
     @staticmethod
     def render_error(error_data):
         """Render prediction error"""
@@ -75,9 +161,33 @@ class ResultsView:
     """Results view"""
     
     @staticmethod
-    def render_success(data):
-        """Render successful results"""
-        return APIResponse.success(data)
+    def render_rendered(rendered, max_age=300):
+        """Send a pre-rendered results document
+        
+        Picks the smallest encoding the client accepts, answers a matching
+        ``If-None-Match`` with 304 and lets caches revalidate after ``max_age``.
+        """
+        accepted = request.accept_encodings
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in rendered.bodies and accepted[candidate]:
+                encoding = candidate
+                break
+        
+        headers = {
+            'ETag': f'"{rendered.etag_for(encoding)}"',
+            'Cache-Control': f'public, max-age={max_age}',
+            'Vary': 'Accept-Encoding'
+        }
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        
+        if_none_match = request.if_none_match
+        if if_none_match and (if_none_match.star_tag
+                              or any(tag in if_none_match for tag in rendered.etags)):
+            return Response(status=304, headers=headers)
+        
+        return Response(rendered.bodies[encoding], mimetype='application/json', headers=headers)
     
     @staticmethod
     def render_error(error_data):
@@ -90,19 +200,35 @@ class ResultsView:
 class VisualizationView:
     """Visualization view"""
     
+    # Hashed URLs change whenever the content does, so they never go stale
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    # Named URLs may point to new content after a retrain: always revalidate
+    REVALIDATE = 'public, no-cache'
+    
     @staticmethod
     def render_list(viz_data):
         """Render visualization list"""
         return APIResponse.success({
             'status': 'success',
             'visualizations': viz_data['visualizations'],
-            'base_url': viz_data['base_url']
+            'assets': viz_data['assets'],
+            'base_url': viz_data['base_url'],
+            'assets_url': viz_data['assets_url']
         })
     
     @staticmethod
-    def render_image(img_path):
-        """Render image file"""
-        return APIResponse.image(img_path)
+    def render_image(viz_data, immutable=False):
+        """Render an indexed image (conditional and range requests supported)"""
+        asset = viz_data['asset']
+        response = Response(viz_data['data'], mimetype=viz_data['mimetype'])
+        response.set_etag(viz_data['etag'])
+        response.last_modified = asset.modified
+        response.headers['Cache-Control'] = (
+            VisualizationView.IMMUTABLE if immutable else VisualizationView.REVALIDATE
+        )
+        # 304 for If-None-Match / If-Modified-Since, 206/416 for Range
+        return response.make_conditional(request, accept_ranges=True,
+                                         complete_length=len(viz_data['data']))
     
     @staticmethod
     def render_error(error_data):
@@ -110,3 +236,60 @@ class VisualizationView:
         code = error_data.get('code', 404)
         message = error_data.get('error', 'Visualization not found')
         return APIResponse.error(message, code)
+
+
+class JobView:
+    """Batch scoring job view"""
+    
+    @staticmethod
+    def render(job_data):
+        """Render a job's state"""
+        return APIResponse.success(job_data['job'], job_data.get('code', 200))
+    
+    @staticmethod
+    def render_events(events_data):
+        """Stream job progress as server-sent events"""
+        response = APIResponse.stream(events_data['stream'], 'text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies (nginx) from buffering the event stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @staticmethod
+    def render_result(result_data):
+        """Send a job's result file"""
+        return send_file(result_data['path'], mimetype=result_data['mimetype'], as_attachment=True,
+                         download_name=result_data['filename'], conditional=True)
+    
+    @staticmethod
+    def render_error(error_data):
+        """Render job error"""
+        code = error_data.pop('code', 400)
+        error_msg = error_data.pop('error', 'Job request failed')
+        error_data.pop('valid', None)
+        return APIResponse.error(error_msg, code, error_data)
+
+
+class AdminView:
+    """Admin operations view"""
+    
+    @staticmethod
+    def render(admin_data):
+        """Render admin operation result"""
+        code = admin_data.pop('code', 200)
+        admin_data.pop('valid', None)
+        return APIResponse.success(admin_data, code)
+    
+    @staticmethod
+    def render_profile(profile_data):
+        """Render a profile as JSON or as collapsed stacks for flamegraph tools"""
+        if profile_data.get('format') == 'collapsed':
+            return Response(profile_data['profile']['collapsed'] + '\n', mimetype='text/plain')
+        return APIResponse.success(profile_data['profile'], profile_data.get('code', 200))
+    
+    @staticmethod
+    def render_error(error_data):
+        """Render admin error"""
+        code = error_data.get('code', 400)
+        message = error_data.get('error', 'Admin request failed')
+        return APIResponse.error(message, code, error_data.get('details'))
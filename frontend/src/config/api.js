@@ -6,6 +6,10 @@ export const API_ENDPOINTS = {
   health: `${API_URL}/health`,
   features: `${API_URL}/features`,
   predict: `${API_URL}/predict`,
+  predictBatch: `${API_URL}/predict/batch`,
+  predictCSV: `${API_URL}/predict/csv`,
+  predictSweep: `${API_URL}/predict/sweep`,
+  jobs: `${API_URL}/jobs`,
   results: `${API_URL}/api/results`,
   resultsSummary: `${API_URL}/api/results/summary`,
   visualizationsList: `${API_URL}/api/visualizations/list`,
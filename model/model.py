@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pickle
 import os
+import sys
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import OneHotEncoder
@@ -436,6 +437,17 @@ for key in ['full', 'reduced', 'minimal']:
     file_size = os.path.getsize(filename) / 1024 / 1024
     print(f"✅ Saved: {filename} ({file_size:.2f} MB)")
 
+# Export memory-mappable forest artifacts (node arrays + encoder metadata)
+# The backend maps these with mmap instead of unpickling sklearn objects
+sys.path.insert(0, os.path.join('..', 'backend'))
+from inference import CompiledForest
+
+for key in ['full', 'reduced', 'minimal']:
+    filename = f'attrition_pipeline_{key}.forest'
+    CompiledForest.from_pipeline(results[key]['pipeline']).save(filename)
+    file_size = os.path.getsize(filename) / 1024 / 1024
+    print(f"✅ Saved: {filename} ({file_size:.2f} MB)")
+
 # Save feature importance for minimal model
 feature_imp_df.to_csv('feature_importance_minimal.csv', index=False)
 print("✅ Saved: feature_importance_minimal.csv")
@@ -526,6 +538,45 @@ with open('hasil.json', 'w') as f:
 
 print("✅ Saved: hasil.json")
 
+# Save golden set (test split + labels) used by the backend to validate hot-reloaded models
+golden_set = {
+    "features": FULL_FEATURES,
+    "records": json.loads(X_test[FULL_FEATURES].to_json(orient='records')),
+    "labels": [int(label) for label in y_test]
+}
+with open('golden_set.json', 'w') as f:
+    json.dump(golden_set, f)
+
+print(f"✅ Saved: golden_set.json ({len(golden_set['records'])} records)")
+
+# Save feature schema (dtype, levels, observed range per feature) used by the backend
+# to validate and coerce request values before they reach the model
+def describe_feature(series):
+    """Value rules of one feature as observed in the dataset"""
+    if not pd.api.types.is_numeric_dtype(series):
+        return {"type": "category", "levels": sorted(series.unique().tolist())}
+    integer = pd.api.types.is_integer_dtype(series)
+    cast = int if integer else float
+    spec = {
+        "type": "integer" if integer else "number",
+        "min": cast(series.min()),
+        "max": cast(series.max())
+    }
+    # Rating scales and levels (1-4, 1-5, 0-3) are enumerations, not ranges
+    if integer and series.nunique() <= 5:
+        spec["levels"] = sorted(int(value) for value in series.unique())
+    return spec
+
+feature_schema = {
+    "source": "WA_Fn-UseC_-HR-Employee-Attrition.csv",
+    "rows": int(X.shape[0]),
+    "features": {feat: describe_feature(X[feat]) for feat in FULL_FEATURES}
+}
+with open('feature_schema.json', 'w') as f:
+    json.dump(feature_schema, f, indent=2)
+
+print(f"✅ Saved: feature_schema.json ({len(feature_schema['features'])} features)")
+
 # Print detailed classification report
 print("\n" + "="*80)
 print(f"CLASSIFICATION REPORT - {best_model['model_name']}")
@@ -0,0 +1,237 @@
+"""
+OFFLINE BATCH SCORING - Score a roster CSV with a trained pipeline, in parallel
+
+Reads the input CSV in chunks of raw lines and fans them out to a pool of
+worker processes. The pipeline is loaded once in the parent and inherited by
+forked workers (copy-on-write, never re-pickled per task); without fork
+(Windows / macOS spawn) every worker loads it once at start-up. Workers parse,
+validate and score their chunk and return it ready to write, so the parent only
+splits lines and writes results, in the original row order.
+
+Output columns: the input columns (or --keep), then prediction (Yes/No),
+probability_no and probability_yes. Rows are validated with the API's feature
+schema (feature_schema.json: categories, rating levels, value ranges), so a row
+the API would reject with 400 is kept here with an empty prediction and counted
+as failed. Parquet output needs pyarrow. Quoted fields must not contain line breaks.
+
+Usage (from model/):
+    python score.py roster.csv -o predictions.csv [--model minimal] [--workers N]
+        [--chunk-rows 20000] [--keep EmployeeNumber,Department] [--schema feature_schema.json]
+"""
+
+import argparse
+import csv
+import gc
+import io
+import itertools
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: Parquet output
+    pyarrow = None
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same request schema as the API (/predict/csv, /jobs)
+sys.path.insert(0, os.path.join(MODEL_DIR, '..', 'backend'))
+from schema import FeatureSchema  # noqa: E402
+
+# Set in the parent before the pool forks, or by _init_worker
+_pipeline = None
+_task = None
+
+
+def load_pipeline(model):
+    """Pipeline from a variant name (full / reduced / minimal) or a .pkl path"""
+    path = model if model.endswith('.pkl') else os.path.join(MODEL_DIR, f'attrition_pipeline_{model}.pkl')
+    with open(path, 'rb') as f:
+        pipeline = pickle.load(f)
+    # One core per worker: parallelism comes from the pool, not the forest
+    pipeline.named_steps['classifier'].set_params(n_jobs=1)
+    return pipeline
+
+
+def describe(pipeline):
+    """Feature names and the categorical levels the encoder accepts"""
+    levels = {}
+    for name, encoder, columns in pipeline.named_steps['preprocessor'].transformers_:
+        if name == 'cat':
+            for column, categories in zip(columns, encoder.categories_):
+                levels[column] = list(categories)
+    return list(pipeline.feature_names_in_), levels
+
+
+def _init_worker(model, task):
+    global _pipeline, _task
+    if _pipeline is None:
+        _pipeline = load_pipeline(model)
+    _task = task
+
+
+def score_chunk(lines):
+    """Parse, validate and score one chunk of CSV lines (runs in a worker)"""
+    features, schema, keep, output = _task['features'], _task['schema'], _task['keep'], _task['output']
+    df = pd.read_csv(io.BytesIO(_task['header'] + lines), dtype=_task['dtypes'], low_memory=False)
+
+    X, row_errors = schema.validate_frame(df[features], features)
+    valid = np.ones(len(df), dtype=bool)
+    valid[list(row_errors)] = False
+
+    probabilities = np.full((len(df), 2), np.nan)
+    labels = np.full(len(df), None, dtype=object)
+    if valid.any():
+        probabilities[valid] = _pipeline.predict_proba(X[valid])
+        # Class with the highest probability, as ModelManager does (classes_ is [0, 1])
+        predicted = _pipeline.classes_.take(probabilities[valid].argmax(axis=1))
+        labels[valid] = np.where(predicted == 1, 'Yes', 'No')
+
+    result = df[keep].copy() if keep is not None else df
+    result['prediction'] = labels
+    result['probability_no'] = probabilities[:, 0].round(6)
+    result['probability_yes'] = probabilities[:, 1].round(6)
+
+    failed = int((~valid).sum())
+    if output == 'csv':
+        return len(df), failed, result.to_csv(header=False, index=False)
+    return len(df), failed, result
+
+
+def read_chunks(source, chunk_rows):
+    """Raw bytes of ``chunk_rows`` lines at a time"""
+    while True:
+        lines = list(itertools.islice(source, chunk_rows))
+        if not lines:
+            return
+        yield b''.join(lines)
+
+
+class Writer:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path, output):
+        self.path = path
+        self.output = output
+        self._file = None
+        self._parquet = None
+
+    def write(self, chunk, columns):
+        if self.output == 'csv':
+            if self._file is None:
+                self._file = open(self.path, 'w', encoding='utf-8', newline='')
+                # Quoted like the rows (to_csv), in case a column name holds a comma
+                csv.writer(self._file, lineterminator='\n').writerow(columns)
+            self._file.write(chunk)
+            return
+        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table.cast(self._parquet.schema))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('input', help='roster CSV (header row required)')
+    parser.add_argument('-o', '--output', required=True, help='.csv or .parquet')
+    parser.add_argument('--model', default='minimal', help='full, reduced, minimal or a .pkl path')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-rows', type=int, default=20000)
+    parser.add_argument('--keep', help='comma-separated input columns to copy to the output (default: all)')
+    parser.add_argument('--schema', default=os.path.join(MODEL_DIR, 'feature_schema.json'),
+                        help='feature schema written by model.py (default: model/feature_schema.json)')
+    parser.add_argument('--range-margin', type=float, default=1.0,
+                        help='as SCHEMA_RANGE_MARGIN in the API (negative disables range checks)')
+    args = parser.parse_args()
+
+    output = 'parquet' if args.output.endswith('.parquet') else 'csv'
+    if output == 'parquet' and pyarrow is None:
+        sys.exit('❌ Parquet output needs pyarrow (pip install pyarrow)')
+
+    global _pipeline
+    started = time.perf_counter()
+    print(f"🔄 Loading model {args.model}...", file=sys.stderr)
+    _pipeline = load_pipeline(args.model)
+    features, levels = describe(_pipeline)
+    schema = FeatureSchema.load(args.schema, args.range_margin)
+    if schema is None or not schema.covers(features):
+        # No feature metadata: only the model's categories are checked, as in the API
+        print(f"⚠️  No feature schema for these features at {args.schema}, only categories are validated",
+              file=sys.stderr)
+        schema = FeatureSchema.from_levels(levels, features)
+
+    with open(args.input, 'rb') as source:
+        header = source.readline()
+        sample = pd.read_csv(args.input, nrows=1000)
+        missing = [feature for feature in features if feature not in sample.columns]
+        if missing:
+            sys.exit(f"❌ Missing columns: {', '.join(missing)}")
+        keep = [column.strip() for column in args.keep.split(',')] if args.keep else None
+        unknown = [column for column in keep or [] if column not in sample.columns]
+        if unknown:
+            sys.exit(f"❌ Unknown --keep columns: {', '.join(unknown)}")
+        columns = (keep or list(sample.columns)) + ['prediction', 'probability_no', 'probability_yes']
+        # Fixed dtypes so every chunk (and Parquet row group) agrees: copied
+        # columns stay text for CSV; numeric features are coerced per row
+        dtypes = {feature: str for feature in levels}
+        for column in sample.columns:
+            if column in features:
+                continue
+            if output == 'csv' or not pd.api.types.is_numeric_dtype(sample[column]):
+                dtypes[column] = str
+            else:
+                dtypes[column] = 'Int64' if pd.api.types.is_integer_dtype(sample[column]) else np.float64
+
+        task = {'header': header, 'features': features, 'schema': schema, 'keep': keep,
+                'dtypes': dtypes, 'output': output}
+        fork = 'fork' in multiprocessing.get_all_start_methods()
+        if fork:
+            gc.freeze()  # keep the inherited model pages shared
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context('fork' if fork else 'spawn'),
+            initializer=_init_worker,
+            initargs=(args.model, task)
+        )
+
+        rows = failed = 0
+        writer = Writer(args.output, output)
+        # Bounded window of chunks in flight, written strictly in submission order
+        pending = deque()
+        try:
+            for chunk in read_chunks(source, args.chunk_rows):
+                pending.append(executor.submit(score_chunk, chunk))
+                if len(pending) >= args.workers * 2:
+                    count, errors, result = pending.popleft().result()
+                    writer.write(result, columns)
+                    rows, failed = rows + count, failed + errors
+            while pending:
+                count, errors, result = pending.popleft().result()
+                writer.write(result, columns)
+                rows, failed = rows + count, failed + errors
+        finally:
+            writer.close()
+            executor.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    print(f"✅ Scored {rows:,} rows ({failed:,} failed) in {seconds:.2f}s with {args.workers} workers: "
+          f"{rows / seconds:,.0f} rows/s → {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()